@@ -0,0 +1,375 @@
+import asyncio
+import struct
+
+from .simple import MQTTException, ticks_diff, ticks_ms
+
+
+def _encode_len(buf, pos, sz):
+    # MQTT variable length integer, returns the position after it
+    while sz > 0x7F:
+        buf[pos] = (sz & 0x7F) | 0x80
+        sz >>= 7
+        pos += 1
+    buf[pos] = sz
+    return pos + 1
+
+
+def _packet(op, *parts):
+    # Single buffer: fixed header + all parts, written with one write()
+    sz = 0
+    for p in parts:
+        sz += len(p)
+    buf = bytearray(5 + sz)
+    buf[0] = op
+    pos = _encode_len(buf, 1, sz)
+    for p in parts:
+        buf[pos : pos + len(p)] = p
+        pos += len(p)
+    return memoryview(buf)[:pos]
+
+
+def _str(s):
+    if isinstance(s, str):
+        s = s.encode()
+    return struct.pack("!H", len(s)) + s
+
+
+class MQTTAsyncClient:
+    """
+    MQTT 3.1.1 client built on asyncio streams.
+
+    Same surface as MQTTClient (set_callback, connect, publish, subscribe,
+    ping, disconnect) but every network operation is a coroutine, and
+    incoming packets are read by a background task as soon as they arrive,
+    so subscribed messages reach the callback without polling.
+
+    QoS 1 and 2 publishes follow MQTTClient: each publish() waits for its
+    acknowledgement, retransmitting with the DUP flag every `retry_ms`,
+    and what is still unacknowledged is resent after reconnecting to a
+    persistent session. Publishes from concurrent tasks overlap their
+    round trips, up to `window` of them at once.
+    """
+
+    def __init__(
+        self,
+        client_id,
+        server,
+        port=0,
+        user=None,
+        password=None,
+        keepalive=0,
+        ssl=None,
+        ssl_params={},
+    ):
+        if port == 0:
+            port = 8883 if ssl else 1883
+        self.client_id = client_id
+        self.server = server
+        self.port = port
+        self.ssl = ssl
+        self.user = user
+        self.pswd = password
+        self.keepalive = keepalive
+        self.cb = None
+        self.pid = 0
+        self.reader = None
+        self.writer = None
+        self._read_task = None
+        self._write_lock = asyncio.Lock()
+        self._pending = {}  # pid -> [Event, result] waiting for an ack
+        # Unacknowledged QoS 1/2 publishes:
+        # pid -> [expected ack op, ticks_ms sent, packet]
+        self._inflight = {}
+        self._rx_qos2 = set()  # Incoming QoS 2 pids delivered, awaiting PUBREL
+        self.window = 8
+        self.retry_ms = 5000
+        self.retransmits = 0
+        self._waiting = 0  # publish() calls waiting for their ack
+        self._window_free = asyncio.Event()
+        self.last_rx = 0  # ticks_ms of the last packet received
+        self._topics = {}  # str topic -> encoded bytes, encoded once
+        # PUBLISH packets are built here, under the write lock: the stream
+        # copies what it cannot send at once, so the buffer is free again
+        # when write() returns
+        self._buf = bytearray(256)
+        self._mv = memoryview(self._buf)
+
+    def set_callback(self, f):
+        self.cb = f
+
+    def is_connected(self):
+        return self._read_task is not None
+
+    def _topic_bytes(self, topic):
+        if isinstance(topic, str):
+            b = self._topics.get(topic)
+            if b is None:
+                b = self._topics[topic] = topic.encode()
+            return b
+        return topic
+
+    def _publish_packet(self, op, topic, msg, pid):
+        tl = len(topic)
+        ml = len(msg)
+        sz = 2 + tl + ml + (2 if pid else 0)
+        if len(self._buf) < sz + 5:
+            self._buf = bytearray(sz + 5)
+            self._mv = memoryview(self._buf)
+        buf = self._buf
+        mv = self._mv
+        buf[0] = op
+        pos = _encode_len(buf, 1, sz)
+        buf[pos] = tl >> 8
+        buf[pos + 1] = tl & 0xFF
+        pos += 2
+        mv[pos : pos + tl] = topic
+        pos += tl
+        if pid:
+            buf[pos] = pid >> 8
+            buf[pos + 1] = pid & 0xFF
+            pos += 2
+        mv[pos : pos + ml] = msg
+        return mv[: pos + ml]
+
+    def _next_pid(self):
+        self.pid = self.pid % 0xFFFF + 1
+        return self.pid
+
+    async def _send(self, pkt):
+        if self.writer is None:
+            raise OSError(-1)
+        async with self._write_lock:
+            self.writer.write(pkt)
+            await self.writer.drain()
+
+    async def _read_len(self):
+        n = 0
+        sh = 0
+        while 1:
+            b = (await self.reader.readexactly(1))[0]
+            n |= (b & 0x7F) << sh
+            if not b & 0x80:
+                return n
+            sh += 7
+
+    async def connect(self, clean_session=True, timeout=10):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.server, self.port, ssl=self.ssl), timeout
+        )
+        flags = clean_session << 1
+        payload = _str(self.client_id)
+        if self.user:
+            flags |= 0xC0
+            payload += _str(self.user) + _str(self.pswd)
+        assert self.keepalive < 65536
+        var = b"\x00\x04MQTT\x04" + struct.pack("!BH", flags, self.keepalive)
+        await self._send(_packet(0x10, var, payload))
+
+        resp = await asyncio.wait_for(self.reader.readexactly(4), timeout)
+        if resp[0] != 0x20 or resp[1] != 0x02:
+            raise MQTTException("Unexpected CONNACK")
+        if resp[3] != 0:
+            raise MQTTException(resp[3])
+        self.last_rx = ticks_ms()
+        self._read_task = asyncio.create_task(self._read_loop())
+        if clean_session:
+            self._inflight.clear()
+            self._rx_qos2.clear()
+        else:
+            # The session survived: redeliver everything still unacknowledged
+            for pid in list(self._inflight):
+                await self._resend(pid)
+        return resp[2] & 1
+
+    async def disconnect(self):
+        try:
+            await self._send(b"\xe0\0")
+        finally:
+            self.close()
+
+    def close(self):
+        """Drop the connection without DISCONNECT, e.g. once the link is gone."""
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        for pid in self._pending:
+            self._pending[pid][1] = OSError(-1)
+            self._pending[pid][0].set()
+
+    async def ping(self):
+        await self._send(b"\xc0\0")
+
+    async def _wait_ack(self, pid, timeout):
+        entry = self._pending[pid]
+        try:
+            await asyncio.wait_for(entry[0].wait(), timeout)
+        finally:
+            del self._pending[pid]
+        if isinstance(entry[1], Exception):
+            raise entry[1]
+        return entry[1]
+
+    def inflight(self):
+        return len(self._inflight)
+
+    async def publish(self, topic, msg, retain=False, qos=0, timeout=10):
+        """
+        Send a message. With QoS 1 or 2, return once it is acknowledged
+        (PUBACK, or PUBCOMP); raise OSError if the connection is lost
+        first and asyncio.TimeoutError after `timeout` seconds.
+        """
+        assert 0 <= qos <= 2
+        if isinstance(msg, str):
+            msg = msg.encode()
+        topic = self._topic_bytes(topic)
+        op = 0x30 | qos << 1 | retain
+        if qos == 0:
+            await self._write_publish(op, topic, msg, 0)
+            return
+        while self._waiting >= self.window:
+            self._window_free.clear()
+            await self._window_free.wait()
+        self._waiting += 1
+        try:
+            pid = self._next_pid()
+            self._pending[pid] = [asyncio.Event(), None]
+            try:
+                await self._write_publish(op, topic, msg, pid)
+            except Exception:
+                del self._pending[pid]
+                raise
+            await self._wait_delivery(pid, timeout)
+        finally:
+            self._waiting -= 1
+            self._window_free.set()
+
+    async def _write_publish(self, op, topic, msg, pid):
+        if self.writer is None:
+            raise OSError(-1)
+        async with self._write_lock:
+            if self.writer is None:  # Closed while waiting for the lock
+                raise OSError(-1)
+            pkt = self._publish_packet(op, topic, msg, pid)
+            if pid:
+                # A copy is kept for retransmission: QoS 1 waits for PUBACK,
+                # QoS 2 for PUBREC and then PUBCOMP
+                ack = 0x40 if op & 0x06 == 0x02 else 0x50
+                self._inflight[pid] = [ack, ticks_ms(), bytearray(pkt)]
+            self.writer.write(pkt)
+            await self.writer.drain()
+
+    async def _wait_delivery(self, pid, timeout):
+        entry = self._pending[pid]
+        start = ticks_ms()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(entry[0].wait(), self.retry_ms / 1000)
+                    break
+                except asyncio.TimeoutError:  # noqa: UP041 (own class on MicroPython)
+                    if ticks_diff(ticks_ms(), start) >= timeout * 1000:
+                        self._inflight.pop(pid, None)
+                        raise
+                    await self._resend(pid)
+        finally:
+            del self._pending[pid]
+        if isinstance(entry[1], Exception):
+            raise entry[1]
+
+    async def _resend(self, pid):
+        entry = self._inflight.get(pid)
+        if entry is None or self.writer is None:
+            return
+        pkt = entry[2]
+        if pkt[0] & 0xF0 == 0x30:
+            pkt[0] |= 0x08  # DUP: the broker may have seen it already
+        entry[1] = ticks_ms()
+        self.retransmits += 1
+        await self._send(pkt)
+
+    async def _handle_ack(self, op, pid):
+        # PUBACK, PUBREC and PUBCOMP of our QoS 1/2 publishes
+        entry = self._inflight.get(pid)
+        if entry is None:
+            return
+        if op == 0x50 and entry[0] != 0x40:
+            # Also answers a repeated PUBREC with the PUBREL again
+            entry[0] = 0x70
+            entry[1] = ticks_ms()
+            entry[2] = bytearray((0x62, 2, pid >> 8, pid & 0xFF))
+            await self._send(entry[2])
+        elif op == entry[0]:
+            del self._inflight[pid]
+            self._ack(pid, 0)
+
+    async def subscribe(self, topic, qos=0, timeout=10):
+        assert self.cb is not None, "Subscribe callback is not set"
+        pid = self._next_pid()
+        self._pending[pid] = [asyncio.Event(), None]
+        pkt = _packet(0x82, struct.pack("!H", pid), _str(topic), bytes((qos,)))
+        await self._send(pkt)
+        if await self._wait_ack(pid, timeout) == 0x80:
+            raise MQTTException(0x80)
+
+    async def unsubscribe(self, topic, timeout=10):
+        pid = self._next_pid()
+        self._pending[pid] = [asyncio.Event(), None]
+        await self._send(_packet(0xA2, struct.pack("!H", pid), _str(topic)))
+        await self._wait_ack(pid, timeout)
+
+    def _ack(self, pid, result):
+        entry = self._pending.get(pid)
+        if entry is not None:
+            entry[1] = result
+            entry[0].set()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                op = (await self.reader.readexactly(1))[0]
+                self.last_rx = ticks_ms()
+                sz = await self._read_len()
+                body = await self.reader.readexactly(sz) if sz else b""
+                kind = op & 0xF0
+                if kind == 0x30:
+                    await self._handle_publish(op, body)
+                elif kind in (0x40, 0x50, 0x70):  # PUBACK, PUBREC, PUBCOMP
+                    await self._handle_ack(kind, body[0] << 8 | body[1])
+                elif kind == 0x60:  # PUBREL of an incoming QoS 2 message
+                    pid = body[0] << 8 | body[1]
+                    self._rx_qos2.discard(pid)
+                    await self._send(struct.pack("!BBH", 0x70, 2, pid))
+                elif kind == 0xB0:  # UNSUBACK
+                    self._ack(body[0] << 8 | body[1], 0)
+                elif kind == 0x90:  # SUBACK
+                    self._ack(body[0] << 8 | body[1], body[2])
+                # PINGRESP and anything else needs no handling
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"MQTT connection lost: {e}")
+            self._read_task = None
+            self.close()
+
+    async def _handle_publish(self, op, body):
+        topic_len = body[0] << 8 | body[1]
+        topic = bytes(body[2 : 2 + topic_len])
+        pos = 2 + topic_len
+        qos = op >> 1 & 3
+        if qos:
+            pid = body[pos] << 8 | body[pos + 1]
+            pos += 2
+        if qos == 2:
+            # Exactly once: a retransmitted PUBLISH is not delivered again
+            # until the broker has released the pid with PUBREL
+            if pid not in self._rx_qos2:
+                self._rx_qos2.add(pid)
+                self.cb(topic, bytes(body[pos:]))
+            await self._send(struct.pack("!BBH", 0x50, 2, pid))
+            return
+        self.cb(topic, bytes(body[pos:]))
+        if qos == 1:
+            await self._send(struct.pack("!BBH", 0x40, 2, pid))
@@ -1,6 +1,21 @@
 import socket
 import struct
 
+try:
+    from time import sleep_ms, ticks_diff, ticks_ms
+except ImportError:  # CPython, for tests and host tools
+    import time
+
+    def ticks_ms():
+        return time.monotonic_ns() // 1_000_000
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
+    def sleep_ms(ms):
+        time.sleep(ms / 1000)
+
+
 
 class MQTTException(Exception):
     pass
@@ -35,11 +50,53 @@ class MQTTClient:
         self.lw_msg = None
         self.lw_qos = 0
         self.lw_retain = False
+        # Reusable packet buffer: publish() encodes the whole packet here and
+        # issues a single write. It only grows when a bigger packet is sent.
+        self._buf = bytearray(256)
+        self._mv = memoryview(self._buf)
+        self._topics = {}  # str topic -> encoded bytes, encoded once
+        # QoS 1/2 publishes awaiting acknowledgement, up to `window` of them:
+        # pid -> [expected ack op, ticks_ms sent, packet]. With the default
+        # window of 1, publish() returns only once its message is acknowledged.
+        self.window = 1
+        self.retry_ms = 5000
+        self.retransmits = 0
+        self._inflight = {}
+        self._rx_qos2 = set()  # Incoming QoS 2 pids delivered, awaiting PUBREL
+        self._ack = bytearray(b"\0\x02\0\0")
+        self.last_rx = 0  # ticks_ms of the last packet received
 
     def _send_str(self, s):
-        self.sock.write(struct.pack("!H", len(s)))
+        buf = self._buf
+        n = len(s)
+        buf[0] = n >> 8
+        buf[1] = n & 0xFF
+        self.sock.write(buf, 2)
         self.sock.write(s)
 
+    def _reserve(self, size):
+        if len(self._buf) < size:
+            self._buf = bytearray(size)
+            self._mv = memoryview(self._buf)
+
+    def _put_len(self, pos, sz):
+        # MQTT variable length integer, written in place
+        buf = self._buf
+        while sz > 0x7F:
+            buf[pos] = (sz & 0x7F) | 0x80
+            sz >>= 7
+            pos += 1
+        buf[pos] = sz
+        return pos + 1
+
+    def _topic_bytes(self, topic):
+        if isinstance(topic, str):
+            b = self._topics.get(topic)
+            if b is None:
+                b = self._topics[topic] = topic.encode()
+            return b
+        return topic
+
     def _recv_len(self):
         n = 0
         sh = 0
@@ -111,54 +168,133 @@ class MQTTClient:
         assert resp[0] == 0x20 and resp[1] == 0x02
         if resp[3] != 0:
             raise MQTTException(resp[3])
+        self.last_rx = ticks_ms()
+        if clean_session:
+            self._inflight.clear()
+            self._rx_qos2.clear()
+        else:
+            # The session survived: redeliver everything still unacknowledged
+            now = ticks_ms()
+            for entry in self._inflight.values():
+                self._resend(entry, now)
         return resp[2] & 1
 
     def disconnect(self):
         self.sock.write(b"\xe0\0")
         self.sock.close()
 
+    def close(self):
+        # Drop the socket without DISCONNECT, e.g. once the link is gone
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
     def ping(self):
         self.sock.write(b"\xc0\0")
 
     def publish(self, topic, msg, retain=False, qos=0):
-        pkt = bytearray(b"\x30\0\0\0")
-        pkt[0] |= qos << 1 | retain
-        sz = 2 + len(topic) + len(msg)
+        topic = self._topic_bytes(topic)
+        if isinstance(msg, str):
+            msg = msg.encode()
+        tl = len(topic)
+        ml = len(msg)
+        sz = 2 + tl + ml
         if qos > 0:
             sz += 2
         assert sz < 2097152
-        i = 1
-        while sz > 0x7F:
-            pkt[i] = (sz & 0x7F) | 0x80
-            sz >>= 7
-            i += 1
-        pkt[i] = sz
-        # print(hex(len(pkt)), hexlify(pkt, ":"))
-        self.sock.write(pkt, i + 1)
-        self._send_str(topic)
+        self._reserve(sz + 5)
+        buf = self._buf
+        mv = self._mv
+        buf[0] = 0x30 | qos << 1 | retain
+        pos = self._put_len(1, sz)
+        buf[pos] = tl >> 8
+        buf[pos + 1] = tl & 0xFF
+        pos += 2
+        mv[pos : pos + tl] = topic
+        pos += tl
         if qos > 0:
-            self.pid += 1
+            # Wait for a free slot in the in-flight window
+            self._drain(self.window - 1)
+            self.pid = self.pid % 0xFFFF + 1
             pid = self.pid
-            struct.pack_into("!H", pkt, 0, pid)
-            self.sock.write(pkt, 2)
-        self.sock.write(msg)
-        if qos == 1:
-            while 1:
-                op = self.wait_msg()
-                if op == 0x40:
-                    sz = self.sock.read(1)
-                    assert sz == b"\x02"
-                    rcv_pid = self.sock.read(2)
-                    rcv_pid = rcv_pid[0] << 8 | rcv_pid[1]
-                    if pid == rcv_pid:
-                        return
-        elif qos == 2:
-            assert 0
+            buf[pos] = pid >> 8
+            buf[pos + 1] = pid & 0xFF
+            pos += 2
+        mv[pos : pos + ml] = msg
+        pos += ml
+        # One write per packet: one TCP segment / TLS record in most cases
+        self.sock.write(buf, pos)
+        if qos > 0:
+            # Keep a copy for retransmission; QoS 1 waits for PUBACK,
+            # QoS 2 for PUBREC and then PUBCOMP
+            ack = 0x40 if qos == 1 else 0x50
+            self._inflight[pid] = [ack, ticks_ms(), buf[:pos]]
+            if self.window == 1:
+                self._drain(0)
+            return pid
+
+    def inflight(self):
+        return len(self._inflight)
+
+    def flush(self):
+        """Block until every QoS 1/2 publish has been acknowledged."""
+        self._drain(0)
+
+    def _drain(self, limit):
+        # Process incoming packets, retransmitting overdue messages,
+        # until at most `limit` publishes are in flight
+        while len(self._inflight) > limit:
+            if self.check_msg() is None:
+                self._retransmit()
+                sleep_ms(5)
+
+    def _retransmit(self):
+        now = ticks_ms()
+        for entry in self._inflight.values():
+            if ticks_diff(now, entry[1]) >= self.retry_ms:
+                self._resend(entry, now)
+
+    def _resend(self, entry, now):
+        pkt = entry[2]
+        if pkt[0] & 0xF0 == 0x30:
+            pkt[0] |= 0x08  # DUP: the broker may have seen it already
+        self.sock.write(pkt)
+        entry[1] = now
+        self.retransmits += 1
+
+    def _send_ack(self, op, pid):
+        ack = self._ack
+        ack[0] = op
+        ack[2] = pid >> 8
+        ack[3] = pid & 0xFF
+        self.sock.write(ack)
+
+    def _handle_ack(self, op):
+        # PUBACK, PUBREC, PUBCOMP for our publishes; PUBREL for incoming QoS 2
+        sz = self.sock.read(1)
+        assert sz == b"\x02"
+        pid = self.sock.read(2)
+        pid = pid[0] << 8 | pid[1]
+        if op == 0x62:
+            self._rx_qos2.discard(pid)
+            self._send_ack(0x70, pid)
+            return
+        entry = self._inflight.get(pid)
+        if entry is None:
+            return
+        if op == 0x50 and entry[0] != 0x40:
+            # Also answers a repeated PUBREC with the PUBREL again
+            entry[0] = 0x70
+            entry[1] = ticks_ms()
+            entry[2] = bytearray((0x62, 2, pid >> 8, pid & 0xFF))
+            self._send_ack(0x62, pid)
+        elif op == entry[0]:
+            del self._inflight[pid]
 
     def subscribe(self, topic, qos=0):
         assert self.cb is not None, "Subscribe callback is not set"
         pkt = bytearray(b"\x82\0\0\0")
-        self.pid += 1
+        self.pid = self.pid % 0xFFFF + 1
         struct.pack_into("!BH", pkt, 1, 2 + 2 + len(topic) + 1, self.pid)
         # print(hex(len(pkt)), hexlify(pkt, ":"))
         self.sock.write(pkt)
@@ -176,7 +312,7 @@ class MQTTClient:
 
     def unsubscribe(self, topic):
         pkt = bytearray(b"\xa2\0\0\0")
-        self.pid += 1
+        self.pid = self.pid % 0xFFFF + 1
         struct.pack_into("!BH", pkt, 1, 2 + 2 + len(topic), self.pid)
         self.sock.write(pkt)
         self._send_str(topic)
@@ -198,12 +334,15 @@ class MQTTClient:
             return None
         if res == b"":
             raise OSError(-1)
+        self.last_rx = ticks_ms()
         if res == b"\xd0":  # PINGRESP
             sz = self.sock.read(1)[0]
             assert sz == 0
             return None
         op = res[0]
         if op & 0xF0 != 0x30:
+            if op in (0x40, 0x50, 0x62, 0x70):
+                self._handle_ack(op)
             return op
         sz = self._recv_len()
         topic_len = self.sock.read(2)
@@ -215,13 +354,17 @@ class MQTTClient:
             pid = pid[0] << 8 | pid[1]
             sz -= 2
         msg = self.sock.read(sz)
-        self.cb(topic, msg)
-        if op & 6 == 2:
-            pkt = bytearray(b"\x40\x02\0\0")
-            struct.pack_into("!H", pkt, 2, pid)
-            self.sock.write(pkt)
-        elif op & 6 == 4:
-            assert 0
+        if op & 6 == 4:
+            # Exactly once: a retransmitted PUBLISH is not delivered again
+            # until the broker has released the pid with PUBREL
+            if pid not in self._rx_qos2:
+                self._rx_qos2.add(pid)
+                self.cb(topic, msg)
+            self._send_ack(0x50, pid)
+        else:
+            self.cb(topic, msg)
+            if op & 6 == 2:
+                self._send_ack(0x40, pid)
         return op
 
     # Checks whether a pending message from server is available.
@@ -1,5 +1,6 @@
 import asyncio
 import json
+import time
 
 try:
     from secrets import secrets
@@ -9,9 +10,39 @@ except ImportError:
 
 from constants import ALLOWED_ACTUATOR_ACTIONS, STATE_MAP
 from src.actuators import Actuator, ManualButton
+from src.boot_report import BootReport
+from src.clock import sync_epoch, ticks_diff, ticks_ms
+from src.codec import make_codec
+from src.config_update import (
+    RESTART_SECTIONS,
+    changed_sections,
+    diff_items,
+    merge_config,
+    needs_new_driver,
+    parse_update,
+    save_config,
+)
+from src.heap import HeapMonitor
+from src.metrics import LoopMetrics, periodic, timed
 from src.mqtt_manager import MqttManager
 from src.network_manager import NetworkManager
-from src.sensors.sensor_classes import SENSOR_CLASSES
+from src.router import CommandRouter
+from src.sampler import Sampler
+from src.sensors.sensor_classes import build_sensor
+from src.supervisor import ConnectionSupervisor
+from src.telemetry_buffer import (
+    DeadbandFilter,
+    TelemetryBatcher,
+    TelemetryFrame,
+    build_fields,
+)
+from src.validation import validate_config
+
+# Boot phases are timed from here; its start_ms covers reset to this point
+boot = BootReport()
+
+
+CONFIG_PATH = "config.json"
 
 
 def load_config(file_path):
@@ -20,156 +51,593 @@ def load_config(file_path):
         return json.load(f)
 
 
-config = load_config("config.json")
+config = load_config(CONFIG_PATH)
 CLIENT_ID = config["client_id"]
+TELEMETRY = config.get("telemetry", {})
+TELEMETRY_INTERVAL = TELEMETRY.get("interval", 10)
+BACKLOG = config.get("backlog")
+SAMPLING_PERIOD = config.get("sampling", {}).get("period", 3)
+# 0: silent, 1: errors, 2: every inbound message
+LOG_VERBOSITY = config.get("logging", {}).get("verbosity", 1)
+METRICS = config.get("metrics", {})
+CONNECTION = config.get("connection", {})
+MEMORY = config.get("memory", {})
+TELEMETRY_TOPIC = f"{CLIENT_ID}/telemetry"
+
+
+async def publish_sensor_reading(sensor_id):
+    """Answer a remote read command with a recent reading."""
+    reading = await sampler.read(sensor_id, max_age=SAMPLING_PERIOD)
+    await mqtt_mgr.publish(f"{CLIENT_ID}/data", {"sensor": sensor_id, "data": reading})
+
+
+# Built by setup() once config.json has been validated
+wifi_mgr = None
+mqtt_mgr = None
+sampler = None
+router = None
+codec = None
+batcher = None
+frame = None
+backlog = None
+metrics = None
+heap = None
+supervisor = None
+control = None
+control_task = None
+button_handler = None
+sensors = {}
+actuators = {}
+buttons = {}
+button_tasks = {}  # button_id -> task running the button
+started = False  # Button and control tasks running: config updates can apply
+pending_configs = []  # Config updates received before that, oldest first
+# Held by a telemetry step, and by a reload while it swaps the pipeline
+telemetry_lock = asyncio.Lock()
+config_lock = asyncio.Lock()
+
+
+def on_actuator_changed(actuator_id, actuator):
+    """Report the new state after a remote command or a control rule."""
+    # Control rules also switch actuators while the broker is unreachable
+    if not mqtt_mgr.connected:
+        return
+    state = STATE_MAP[actuator.is_on()]
+    asyncio.create_task(
+        mqtt_mgr.publish(
+            f"{CLIENT_ID}/data", {"actuator": actuator_id, "data": {"state": state}}
+        )
+    )
 
 
-def on_message_received(topic, msg):
+def on_sensor_read(sensor_id):
+    """Answer a remote read command in the background."""
+    # Served from the sampler cache: a burst of read commands
+    # costs no extra hardware measurement
+    asyncio.create_task(publish_sensor_reading(sensor_id))
+
+
+def build_button(item):
+    return ManualButton(
+        item["pin"],
+        item["id"],
+        item["target"],
+        debounce_ms=item.get("debounce_ms", 30),
+        long_press_ms=item.get("long_press_ms", 800),
+        double_press_ms=item.get("double_press_ms", 300),
+        actions=item.get("actions"),
+    )
+
+
+def build_control(config, sensors, actuators):
+    """Control engine for the "control" section, None without rules."""
+    settings = config.get("control", {})
+    if not settings.get("rules"):
+        return None
+    from src.config_culture import CULTURES
+    from src.control import ControlEngine
+
+    return ControlEngine(
+        settings["rules"],
+        sensors,
+        actuators,
+        bands=CULTURES.get(settings.get("culture")),
+        on_change=on_actuator_changed,
+    )
+
+
+def build_telemetry(config, fields, sensors, actuators):
     """
-    Callback triggered by MqttManager.
-    Topic expected: client_id/category/target_id/action
+    Codec, batcher (None when unbatched) and frame for a field layout.
+    The frame reads the sampler's store, so the sampler must exist.
     """
-    try:
-        topic_str = topic.decode()
-        msg_str = msg.decode()
-        print(
-            f"Received MQTT message on topic: {topic_str} with payload: {msg.decode()}"
+    settings = config.get("telemetry", {})
+    # "json" stays available for debugging, "binary" sends struct-packed records
+    codec = make_codec(settings.get("encoding", "json"), fields)
+
+    # Report-by-exception: with a heartbeat, a metric is only sent when it
+    # moves beyond its sensor's "deadband" or has not been sent for
+    # `heartbeat` seconds
+    deadband = None
+    if settings.get("heartbeat"):
+        deadband = DeadbandFilter(
+            fields,
+            {item["id"]: item.get("deadband", {}) for item in config["sensors"]},
+            settings["heartbeat"],
         )
-        parts = topic_str.split("/")
-        if len(parts) < 4:
-            return
-
-        category = parts[1]
-        target_id = parts[2]
-        action = msg_str
-
-        if category == "actuators":
-            target = actuators.get(target_id)
-            if target and action in ALLOWED_ACTUATOR_ACTIONS:
-                method = getattr(target, action)
-                method()
-                mqtt_mgr.publish(
-                    f"{CLIENT_ID}/data",
-                    {
-                        "actuator": target_id,
-                        "data": {"state": STATE_MAP[target.is_on()]},
-                    },
-                )
-
-        elif category == "sensors" and action == "read":
-            target = sensors.get(target_id)
-            if target:
-                mqtt_mgr.publish(
-                    f"{CLIENT_ID}/data", {"sensor": target_id, "data": target.read()}
-                )
-
-    except Exception as e:
-        print(f"Routing error: {e}")
-
-
-wifi_mgr = NetworkManager(secrets.get("WIFI_SSID"), secrets.get("WIFI_PASSWORD"))
-mqtt_mgr = MqttManager(
-    client_id=CLIENT_ID,
-    broker_ip=secrets.get("MQTT_BROKER"),
-    user=secrets.get("MQTT_USER"),
-    password=secrets.get("MQTT_PASSWORD"),
-)
-mqtt_mgr.set_callback(on_message_received)
 
-sensors = {}
-for item in config["sensors"]:
-    cls = SENSOR_CLASSES.get(item["type"])
-    if cls:
-        args = {"pin_number": item["pin"], "sensor_id": item["id"]}
-        # TODO: Find more elegant way to handle sensor-specific
-        # parameters without hardcoding keys
-        if "calibration" in item:
-            args["calibration"] = item["calibration"]
+    # Batching mode: several samples per publish instead of one. Sparse
+    # samples always go through the batcher (a batch of one is published
+    # right away).
+    batcher = None
+    if settings.get("batch_size", 1) > 1 or deadband is not None:
+        batcher = TelemetryBatcher(
+            fields,
+            batch_size=settings.get("batch_size", 1),
+            flush_interval=settings.get("flush_interval", 60),
+            deadband=deadband,
+        )
+    return codec, batcher, TelemetryFrame(fields, sensors, actuators, sampler)
 
-        sensors[item["id"]] = cls(**args)
 
-actuators = {}
-for item in config["actuators"]:
-    actuators[item["id"]] = Actuator(item["pin"], item["id"])
+def build_backlog(fields):
+    """Store-and-forward: samples that cannot be published go to flash."""
+    if not BACKLOG:
+        return None
+    from src.backlog import FlashBacklog
 
-buttons = []
-for item in config["buttons"]:
-    btn = ManualButton(item["pin"], item["id"], item["target"])
-    buttons.append(btn)
+    return FlashBacklog(
+        fields,
+        directory=BACKLOG.get("directory", "backlog"),
+        segment_records=BACKLOG.get("segment_records", 128),
+        max_segments=BACKLOG.get("max_segments", 8),
+        write_block=BACKLOG.get("write_block", 8),
+    )
 
 
-async def monitor_buttons():
-    """Task to check buttons frequently (non-blocking)."""
-    while True:
-        for btn in buttons:
-            if btn.is_pressed():
-                target = actuators.get(btn.target_id)
-                if target:
-                    target.toggle()
-                    # Debounce: wait until button is released or small delay
-                    await asyncio.sleep(0.3)
-        # Very short sleep to let other tasks run
-        await asyncio.sleep(0.05)
-
-
-async def read_sensors():
-    """Task to read all registered sensors dynamically."""
-    while True:
-        data_payload = {}
-        # Iterate over the instances (values), not the keys (strings)
-        for sensor_instance in sensors.values():
-            # Now sensor_instance is the object, and has the .read() method
-            measurements = sensor_instance.read()
-            data_payload[sensor_instance.sensor_id] = measurements
+def build_routes():
+    """Fill the router from the current actuator and sensor registries."""
+    router.clear()
+    router.add("config", on_config_message)
+    router.add_actuators(actuators, ALLOWED_ACTUATOR_ACTIONS, on_actuator_changed)
+    router.add_sensors(sensors, on_sensor_read)
+
+
+def setup():
+    """Instantiate drivers and services from the validated configuration."""
+    global wifi_mgr, mqtt_mgr, sampler, router, codec, batcher, backlog, metrics
+    global control, supervisor, frame, heap
+
+    wifi_mgr = NetworkManager(secrets.get("WIFI_SSID"), secrets.get("WIFI_PASSWORD"))
+    keepalive = CONNECTION.get("keepalive", 60)
+    mqtt_mgr = MqttManager(
+        client_id=CLIENT_ID,
+        broker_ip=secrets.get("MQTT_BROKER"),
+        user=secrets.get("MQTT_USER"),
+        password=secrets.get("MQTT_PASSWORD"),
+        port=secrets.get("MQTT_PORT", 1883),
+        use_async=config.get("mqtt", {}).get("client", "async") == "async",
+        fallback_ip=secrets.get("MQTT_BROKER_FALLBACK"),
+        keepalive=keepalive,
+    )
+    # Reconnects Wi-Fi and MQTT within about a second of a loss
+    supervisor = ConnectionSupervisor(
+        wifi_mgr,
+        mqtt_mgr,
+        check_ms=CONNECTION.get("check_ms", 1000),
+        keepalive=keepalive,
+        ping_timeout=CONNECTION.get("ping_timeout", 5),
+        backoff_min=CONNECTION.get("backoff_min", 1),
+        backoff_max=CONNECTION.get("backoff_max", 60),
+        failover_after=CONNECTION.get("failover_after", 3),
+        on_connect=publish_schema,
+    )
 
-        print(f"Data Collected: {data_payload}")
-        await asyncio.sleep(3)
+    # Driver modules are imported here, only for the types in use
+    for item in config["sensors"]:
+        sensors[item["id"]] = build_sensor(item)
+    sampler = Sampler(sensors)
 
+    for item in config["actuators"]:
+        actuators[item["id"]] = Actuator(item["pin"], item["id"])
+
+    # Local control: rules act on every new reading, with or without network
+    control = build_control(config, sensors, actuators)
+    if control is not None:
+        sampler.subscribe(control.on_reading)
+
+    # Inbound commands: topic -> handler table, rebuilt on config changes
+    router = CommandRouter(CLIENT_ID, verbosity=LOG_VERBOSITY)
+    build_routes()
+    mqtt_mgr.set_callback(router.dispatch)
+
+    for item in config["buttons"]:
+        buttons[item["id"]] = build_button(item)
+
+    telemetry_fields = build_fields(sensors, actuators)
+    codec, batcher, frame = build_telemetry(
+        config, telemetry_fields, sensors, actuators
+    )
+    backlog = build_backlog(telemetry_fields)
+    heap = HeapMonitor()
+
+    # Event-loop lag and task timing, published on <client_id>/metrics.
+    # When disabled nothing is created and the tasks run uninstrumented.
+    if METRICS.get("enabled"):
+        metrics = LoopMetrics(period_ms=METRICS.get("lag_period_ms", 100))
+
+
+def link_up():
+    """True when telemetry can actually reach the broker."""
+    return wifi_mgr.wlan.isconnected() and mqtt_mgr.connected
 
-async def mqtt_listen_task():
-    """Polls the broker for incoming commands."""
-    while True:
-        if wifi_mgr.wlan.isconnected():
-            mqtt_mgr.check_msg()
-        await asyncio.sleep(0.1)
 
+def on_button_gesture(button, gesture):
+    """Apply the actuator action configured for a button gesture."""
+    action = button.actions.get(gesture)
+    target = actuators.get(button.target_id)
+    if target and action in ALLOWED_ACTUATOR_ACTIONS:
+        getattr(target, action)()
 
-async def telemetry_task():
-    """Reads sensors and publishes to MQTT every 10 seconds."""
+
+def task_histogram(name):
+    """Iteration-time histogram for a task, None when metrics are disabled."""
+    return metrics.task(name) if metrics is not None else None
+
+
+def start_button(button):
+    """Task waiting for the button's gestures (interrupt driven, idle otherwise)."""
+    button_tasks[button.id] = asyncio.create_task(button.run(button_handler))
+
+
+def start_control():
+    global control_task
+    control_task = asyncio.create_task(control.run())
+
+
+def start_tasks():
+    """
+    Start the button and control tasks, then apply the config updates that
+    arrived while booting (e.g. the retained one, delivered on connect).
+    """
+    global button_handler, started
+    button_handler = on_button_gesture
+    if metrics is not None:
+        button_handler = timed(on_button_gesture, metrics.task("buttons"))
+    for button in buttons.values():
+        start_button(button)
+    if control is not None:
+        start_control()
+    started = True
+    for msg in pending_configs:
+        on_config_message(msg)
+    pending_configs.clear()
+
+
+async def publish_schema():
+    """Announce the telemetry layout, also to a broker failed over to."""
+    return await mqtt_mgr.publish(
+        f"{CLIENT_ID}/schema", codec.schema_document(), retain=True
+    )
+
+
+async def mqtt_poll_step():
+    """Polls the broker for incoming commands (blocking client only)."""
+    if link_up():
+        mqtt_mgr.check_msg()
+
+
+async def publish_batch():
+    """Publish the batched samples. Returns False when they were not sent."""
+    if link_up() and await mqtt_mgr.publish(
+        TELEMETRY_TOPIC, codec.encode_ring(batcher.ring)
+    ):
+        if LOG_VERBOSITY >= 2:
+            print(f"Published batch of {len(batcher.ring)} samples")
+        batcher.clear()
+        return True
+    return False
+
+
+async def telemetry_step():
+    """Run every TELEMETRY_INTERVAL; a config reload waits for it to end."""
+    async with telemetry_lock:
+        await publish_telemetry()
+
+
+async def publish_telemetry():
+    """
+    Reads sensors and publishes to MQTT. Values go from the sampler's store
+    to the frame, then to the ring or the codec's buffer: with the binary
+    encoding a cycle builds no payload.
+    """
+    # The sampler only measures stale sensors; checking first saves
+    # a coroutine per fresh sensor
+    for sensor_id in sampler.ids:
+        if not sampler.is_fresh(sensor_id, SAMPLING_PERIOD):
+            await sampler.refresh(sensor_id, max_age=SAMPLING_PERIOD)
+    values = frame.update()
+    stamp = int(time.time())
+
+    if batcher is None:
+        if link_up() and await mqtt_mgr.publish(
+            TELEMETRY_TOPIC, codec.encode_sample(values, stamp)
+        ):
+            if LOG_VERBOSITY >= 2:
+                print(f"Published: {list(values)}")
+        elif backlog is not None:
+            backlog.append_row(stamp, values, 0)
+    else:
+        batcher.add_values(values, 0, stamp)
+        if batcher.due() and not await publish_batch() and backlog is not None:
+            batcher.spill(backlog)
+        # Without a backlog, samples stay in the ring (oldest
+        # overwritten) until the link is up
+
+
+async def backlog_step():
+    """
+    Drains the flash backlog at a limited pace while the link is up.
+    Records are published at QoS 1 and only deleted once the broker has
+    acknowledged them, so a link lost mid-drain does not lose them. If the
+    store moved or was replaced by a config reload while waiting for the
+    ack, they stay and are sent again (at-least-once delivery).
+    """
+    store = backlog
+    if store.pending() and link_up():
+        count, rows, token = store.read_rows(BACKLOG.get("drain_batch", 30))
+        message = codec.encode(rows, count)
+        if await mqtt_mgr.publish(TELEMETRY_TOPIC, message, qos=1):
+            if backlog is store:
+                store.consume(token)
+            print(f"Backlog: sent {count}, {store.pending()} left")
+
+
+async def metrics_task():
+    """Publishes the loop metrics of each interval next to the telemetry."""
+    interval = METRICS.get("interval", 60)
     while True:
-        data_payload = {}
-        # We read our standardized sensors
-        for sensor_id, sensor in sensors.items():
-            data_payload[sensor_id] = sensor.read()
+        await asyncio.sleep(interval)
+        report = metrics.document()
+        report["link"] = supervisor.document()
+        report["heap"] = heap.document()
+        if link_up():
+            await mqtt_mgr.publish(f"{CLIENT_ID}/metrics", report)
 
-        # We also add actuators state
-        actuators_state = {}
-        for act_id, act in actuators.items():
-            actuators_state[act_id] = "ON" if act.is_on() else "OFF"
-        data_payload["actuators"] = actuators_state
 
-        if wifi_mgr.wlan.isconnected():
-            mqtt_mgr.publish(f"{CLIENT_ID}/telemetry", data_payload)
-            print(f"Published: {data_payload}")
+def on_config_message(msg):
+    """
+    Router handler: updates are applied by a task, outside the callback.
+    Until the tasks an update replaces have started, updates are queued.
+    """
+    if not started:
+        pending_configs.append(msg)
+        return True
+    asyncio.create_task(reload_config(msg))
+    return True
 
-        await asyncio.sleep(10)
+
+async def reload_config(msg):
+    """
+    Apply a `<client_id>/config` update and report the outcome on
+    `<client_id>/config/status`. Updates that are not newer than the running
+    configuration (e.g. the retained copy after a reconnect) are ignored.
+    """
+    async with config_lock:
+        start = ticks_ms()
+        version = config.get("version", 0)
+        status = {"version": version, "applied": [], "restart": [], "errors": []}
+        try:
+            update = parse_update(msg, version)
+            if update is None:
+                return
+            new_config = merge_config(config, update)
+            status["version"] = new_config["version"]
+            status["errors"] = validate_config(new_config, ALLOWED_ACTUATOR_ACTIONS)
+            if not status["errors"]:
+                status["applied"], status["restart"] = await apply_config(new_config)
+                save_config(new_config, CONFIG_PATH)
+        except Exception as e:
+            status["errors"].append(str(e))
+        status["ms"] = ticks_diff(ticks_ms(), start)
+        print(f"Config: {status}")
+        if link_up():
+            await mqtt_mgr.publish(f"{CLIENT_ID}/config/status", status)
+
+
+async def apply_config(new_config):
+    """
+    Switch the running system to a validated configuration, touching only
+    what changed. Everything that can fail is built before the first swap,
+    so a failed update leaves the old configuration running. Returns the
+    sections applied and those that need a restart. Must not run before
+    start_tasks().
+    """
+    global config, TELEMETRY, TELEMETRY_INTERVAL, SAMPLING_PERIOD, LOG_VERBOSITY
+    global codec, batcher, frame, backlog, control
+
+    sections = changed_sections(config, new_config)
+    restart = [section for section in sections if section in RESTART_SECTIONS]
+    applied = [section for section in sections if section not in RESTART_SECTIONS]
+
+    # 1. Build: new drivers for changed sensors and actuators, then what
+    # depends on them
+    old_sensors = {item["id"]: item for item in config["sensors"]}
+    changed_sensors, removed_sensors = diff_items(
+        config["sensors"], new_config["sensors"]
+    )
+    drivers, recalibrated = {}, {}
+    for item in new_config["sensors"]:
+        if item["id"] not in changed_sensors:
+            continue
+        if needs_new_driver(old_sensors.get(item["id"]), item):
+            drivers[item["id"]] = build_sensor(item)
+        elif "calibration" in item and hasattr(sensors[item["id"]], "set_calibration"):
+            recalibrated[item["id"]] = item["calibration"]
+    next_sensors = {
+        item["id"]: drivers.get(item["id"], sensors.get(item["id"]))
+        for item in new_config["sensors"]
+    }
+
+    changed_actuators, removed_actuators = diff_items(
+        config["actuators"], new_config["actuators"]
+    )
+    # Built without touching their pin: a running one may still drive it
+    new_actuators = {
+        item["id"]: Actuator(item["pin"], item["id"], claim=False)
+        for item in new_config["actuators"]
+        if item["id"] in changed_actuators
+    }
+    next_actuators = {
+        item["id"]: new_actuators.get(item["id"], actuators.get(item["id"]))
+        for item in new_config["actuators"]
+    }
+
+    # Buttons only claim their pin's interrupt once their task runs, after
+    # the old one is closed
+    changed_buttons, removed_buttons = diff_items(
+        config["buttons"], new_config["buttons"]
+    )
+    new_buttons = {
+        item["id"]: build_button(item)
+        for item in new_config["buttons"]
+        if item["id"] in changed_buttons
+    }
+
+    hardware = "sensors" in sections or "actuators" in sections
+    recontrol = hardware or "control" in sections
+    next_control = None
+    if recontrol:
+        next_control = build_control(new_config, next_sensors, next_actuators)
+    fields = build_fields(next_sensors, next_actuators)
+    relayout = hardware or "telemetry" in sections
+    next_codec = next_batcher = next_frame = None
+    if relayout:
+        next_codec, next_batcher, next_frame = build_telemetry(
+            new_config, fields, next_sensors, next_actuators
+        )
+
+    # 2. Swap, with no telemetry step in flight. Batched samples are sent
+    # with the layout they were recorded in first, and the backlog is
+    # reopened (which can fail) before anything is swapped.
+    async with telemetry_lock:
+        if relayout and batcher is not None and len(batcher.ring):
+            await publish_batch()
+        next_backlog = backlog
+        if relayout and backlog is not None:
+            backlog.flush()
+            # Stored samples are dropped if the field layout changed
+            next_backlog = build_backlog(fields)
+
+        # Nothing below can fail
+        for sensor_id in removed_sensors:
+            sampler.remove(sensor_id)
+        for sensor_id, driver in drivers.items():
+            sampler.replace(sensor_id, driver)
+        for sensor_id, calibration in recalibrated.items():
+            sensors[sensor_id].set_calibration(calibration)
+
+        for actuator_id in removed_actuators + list(new_actuators):
+            if actuator_id in actuators:
+                actuators.pop(actuator_id).off()
+        for actuator in new_actuators.values():
+            actuator.claim()
+        actuators.update(new_actuators)
+
+        for button_id in removed_buttons + changed_buttons:
+            if button_id in buttons:
+                task = button_tasks.pop(button_id, None)
+                if task is not None:
+                    task.cancel()
+                buttons.pop(button_id).close()
+        for button in new_buttons.values():
+            buttons[button.id] = button
+            start_button(button)
+
+        if recontrol:
+            if control is not None:
+                if control_task is not None:
+                    control_task.cancel()
+                control.release()
+                sampler.unsubscribe(control.on_reading)
+            control = next_control
+            if control is not None:
+                sampler.subscribe(control.on_reading)
+                start_control()
+
+        if relayout:
+            codec, batcher, frame = next_codec, next_batcher, next_frame
+            backlog = next_backlog
+
+        TELEMETRY = new_config.get("telemetry", {})
+        TELEMETRY_INTERVAL = TELEMETRY.get("interval", 10)
+        SAMPLING_PERIOD = new_config.get("sampling", {}).get("period", 3)
+        LOG_VERBOSITY = new_config.get("logging", {}).get("verbosity", 1)
+        sampler.period = SAMPLING_PERIOD
+        router.verbosity = LOG_VERBOSITY
+        build_routes()
+        config = new_config
+
+    if relayout and link_up():
+        await publish_schema()
+    return applied, restart
 
 
 async def main():
     """Orchestrator for all asynchronous tasks."""
     print("System Starting...")
-    # 1. Connect Wi-Fi
+    # 1. Check the whole configuration before touching any hardware
+    errors = validate_config(config, ALLOWED_ACTUATOR_ACTIONS)
+    if errors:
+        for error in errors:
+            print(f"Config error: {error}")
+        return
+    boot.mark("validated")
+    setup()
+    # Collections early and short from here on, rather than when full
+    heap.configure()
+    boot.mark("instantiated")
+
+    # 2. Connect Wi-Fi
     if await wifi_mgr.connect():
-        # 2. Connect MQTT
-        await mqtt_mgr.connect()
-
-    # 3. Start all concurrent tasks
-    await asyncio.gather(
-        monitor_buttons(),
-        telemetry_task(),
-        mqtt_listen_task(),
-        wifi_mgr.keep_connected(),
-    )
+        boot.mark("wifi")
+        # Message timestamps stay 0 until the clock is synced
+        if sync_epoch():
+            boot.mark("ntp")
+        # 3. Connect MQTT and announce the telemetry layout to the gateway
+        if await mqtt_mgr.connect():
+            boot.mark("mqtt")
+            if await publish_schema():
+                boot.mark("first_publish")
+
+    report = boot.document()
+    print(f"Boot: {report}")
+    if mqtt_mgr.connected:
+        await mqtt_mgr.publish(f"{CLIENT_ID}/boot", report, retain=True)
+
+    # 4. Start all concurrent tasks. Buttons and the control engine run as
+    # their own tasks, so that a config reload can replace them.
+    start_tasks()
+
+    tasks = [
+        sampler.run(SAMPLING_PERIOD),
+        periodic(
+            telemetry_step,
+            lambda: TELEMETRY_INTERVAL,
+            task_histogram("telemetry"),
+        ),
+        supervisor.run(),
+        periodic(heap.collect, MEMORY.get("gc_interval", 5), task_histogram("gc")),
+    ]
+    if mqtt_mgr.needs_polling:
+        tasks.append(periodic(mqtt_poll_step, 0.1, task_histogram("mqtt_poll")))
+    if backlog is not None:
+        drain_interval = BACKLOG.get("drain_interval", 2)
+        tasks.append(periodic(backlog_step, drain_interval, task_histogram("backlog")))
+    if metrics is not None:
+        tasks.append(metrics.probe())
+        tasks.append(metrics_task())
+    await asyncio.gather(*tasks)
 
 
 # Start the event loop
@@ -4,6 +4,8 @@ secrets = {
     "MQTT_USER": "user_name",
     "MQTT_PASSWORD": "password_here",
     "MQTT_PORT": 1883,
+    # Optional secondary broker, used when the first one stays unreachable
+    "MQTT_BROKER_FALLBACK": "",
     # WIFI Configuration Template
     "WIFI_SSID": "your_wifi_ssid_here",
     "WIFI_PASSWORD": "your_wifi_password_here",
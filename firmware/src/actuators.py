@@ -1,5 +1,30 @@
+import asyncio
+
 from machine import Pin
 
+from .clock import ticks_add, ticks_diff, ticks_ms
+
+try:
+    from asyncio import ThreadSafeFlag
+except ImportError:  # CPython (tests, simulator): same interface on top of Event
+
+    class ThreadSafeFlag:
+        def __init__(self):
+            self._event = asyncio.Event()
+
+        def set(self):
+            self._event.set()
+
+        async def wait(self):
+            await self._event.wait()
+            self._event.clear()
+
+
+# Button gestures, used as keys of the per-button "actions" config
+PRESS = "press"
+LONG_PRESS = "long_press"
+DOUBLE_PRESS = "double_press"
+
 
 class Actuator:
     """Generic ON/OFF device controlled via GPIO."""
@@ -7,10 +32,21 @@ class Actuator:
     # TODO: Add parameters for different actuator types
     # (e.g., PWM for dimmers, etc.) in the future.
 
-    def __init__(self, pin_number, actuator_id):
+    def __init__(self, pin_number, actuator_id, claim=True):
         self.id = actuator_id
-        self.pin = Pin(pin_number, Pin.OUT)
-        self.off()  # Ensure safe state at startup
+        # Checks the pin number only: its mode and level are left as they are
+        self.pin = Pin(pin_number)
+        if claim:
+            self.claim()
+
+    def claim(self):
+        """
+        Drive the pin, off (safe state at startup). A config reload builds
+        the actuator with claim=False and claims the pin once the actuator
+        that used it is switched off.
+        """
+        self.pin.init(Pin.OUT, value=1)
+        self.off()
 
     def on(self):
         """Enable the actuator."""
@@ -34,15 +70,104 @@ class Actuator:
 
 
 class ManualButton:
-    """Input handler for a physical push button."""
+    """
+    Input handler for a physical push button, driven by pin interrupts.
 
-    # TODO: Define button in config with target actuator
-    # and possibly debounce settings in the future.
-    def __init__(self, pin_number, button_id, target_id):
+    The IRQ handler only wakes the button task; debouncing and gesture
+    detection happen in `next_gesture`, so nothing runs while the button
+    is idle. `actions` maps gestures (press, long_press, double_press) to
+    actuator actions. When only `press` is mapped it fires as soon as the
+    contact settles (latency = debounce_ms); otherwise the gesture is known
+    on release, or after long_press_ms while held.
+    """
+
+    def __init__(
+        self,
+        pin_number,
+        button_id,
+        target_id,
+        debounce_ms=30,
+        long_press_ms=800,
+        double_press_ms=300,
+        actions=None,
+    ):
         self.id = button_id
         self.target_id = target_id  # The ID of the actuator it controls
-        self.pin = Pin(pin_number, Pin.IN, Pin.PULL_UP)
+        self.debounce_ms = debounce_ms
+        self.long_press_ms = long_press_ms
+        self.double_press_ms = double_press_ms
+        self.actions = actions or {PRESS: "toggle"}
+        self.edges = 0  # Raw edges seen by the IRQ, bounces included
+        self.flag = ThreadSafeFlag()
+        # Checks the pin number only: the pin may still be in use
+        self.pin = Pin(pin_number)
+
+    def attach(self):
+        """Set up the pin and its IRQ; `run` does it once a replaced one closed."""
+        self.pin.init(Pin.IN, Pin.PULL_UP)
+        self.pin.irq(trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING, handler=self._on_edge)
+
+    def _on_edge(self, pin):
+        # Interrupt context: no allocation, just wake the button task
+        self.edges += 1
+        self.flag.set()
+
+    def close(self):
+        """Detach the interrupt handler, before the button is replaced."""
+        self.pin.irq(handler=None)
 
     def is_pressed(self):
         """Check button state (active low)."""
         return self.pin.value() == 0
+
+    async def _settle(self):
+        """Let the contact stop bouncing before trusting the pin level."""
+        await asyncio.sleep(self.debounce_ms / 1000)
+
+    async def _wait_for(self, pressed, timeout_ms=None):
+        """
+        Wait for edges until the button is (or is not) pressed.
+        Returns False if `timeout_ms` elapsed first.
+        """
+        deadline = None if timeout_ms is None else ticks_add(ticks_ms(), timeout_ms)
+        while self.is_pressed() != pressed:
+            if deadline is None:
+                await self.flag.wait()
+            else:
+                remaining = ticks_diff(deadline, ticks_ms())
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(self.flag.wait(), remaining / 1000)
+                except asyncio.TimeoutError:  # noqa: UP041 (own class on MicroPython)
+                    return False
+            await self._settle()
+        return True
+
+    async def next_gesture(self):
+        """Sleep until the button is pressed and return the gesture."""
+        # A press reported before its release must not count twice
+        await self._wait_for(False)
+        await self._wait_for(True)
+
+        if LONG_PRESS not in self.actions and DOUBLE_PRESS not in self.actions:
+            return PRESS
+
+        if not await self._wait_for(False, self.long_press_ms):
+            await self._wait_for(False)
+            return LONG_PRESS
+
+        if DOUBLE_PRESS in self.actions and await self._wait_for(
+            True, self.double_press_ms
+        ):
+            await self._wait_for(False)
+            return DOUBLE_PRESS
+
+        return PRESS
+
+    async def run(self, on_gesture):
+        """Task calling `on_gesture(button, gesture)` for every gesture."""
+        self.attach()
+        while True:
+            gesture = await self.next_gesture()
+            on_gesture(self, gesture)
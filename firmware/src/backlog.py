@@ -0,0 +1,232 @@
+import json
+import os
+import struct
+import time
+from array import array
+
+from .telemetry_buffer import batch_document, fill_values, sample_row
+
+SEGMENT_PREFIX = "seg_"
+FIELDS_FILE = "fields.json"
+
+
+def _join(directory, name):
+    return directory + "/" + name
+
+
+class FlashBacklog:
+    """
+    Bounded, append-only store of telemetry samples kept on flash while the
+    link is down.
+
+    Samples are fixed-size records (`<I` stamp + one `<f` per field) appended
+    to numbered segment files. A segment holds `segment_records` records; when
+    more than `max_segments` exist the oldest one is deleted, dropping the
+    oldest data. To limit flash wear, records are staged in RAM and written
+    `write_block` at a time, and drained segments are deleted whole instead of
+    rewriting a read cursor. The drain position is only kept in RAM, so after
+    a reboot part of a segment may be sent twice (at-least-once delivery).
+    """
+
+    def __init__(
+        self,
+        fields,
+        directory="backlog",
+        segment_records=128,
+        max_segments=8,
+        write_block=8,
+    ):
+        self.fields = fields
+        self.width = len(fields)
+        self.directory = directory
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.write_block = write_block
+
+        self.format = f"<I{self.width}f"
+        self.record_size = struct.calcsize(self.format)
+        self.staging = bytearray(write_block * self.record_size)
+        self.staged = 0
+        self._scratch = array("f", (0.0 for _ in range(self.width)))
+
+        self.segments = []  # Segment numbers, oldest first
+        self.tail_records = 0  # Records already on flash in the newest segment
+        self.read_offset = 0  # Records drained from the oldest segment
+        self.dropped = 0
+        self.flushes = 0  # Tells staged records read before a flush from new ones
+
+        self._open_directory()
+
+    # --- Setup ---
+
+    def _open_directory(self):
+        try:
+            os.mkdir(self.directory)
+        except OSError:
+            pass  # Already exists
+
+        names = os.listdir(self.directory)
+        segments = sorted(
+            int(name[len(SEGMENT_PREFIX) :])
+            for name in names
+            if name.startswith(SEGMENT_PREFIX)
+        )
+        # Records written with another field layout cannot be decoded anymore
+        if segments and self._stored_fields() != [list(f) for f in self.fields]:
+            print("Backlog field layout changed, discarding stored samples")
+            for number in segments:
+                os.remove(self._segment_path(number))
+            segments = []
+        if not segments:
+            with open(_join(self.directory, FIELDS_FILE), "w") as f:
+                json.dump([list(f) for f in self.fields], f)
+
+        self.segments = segments
+        if segments:
+            self.tail_records = self._records_in(segments[-1])
+
+    def _stored_fields(self):
+        try:
+            with open(_join(self.directory, FIELDS_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _segment_path(self, number):
+        return _join(self.directory, f"{SEGMENT_PREFIX}{number:06d}")
+
+    def _records_in(self, number):
+        return os.stat(self._segment_path(number))[6] // self.record_size
+
+    # --- Writing ---
+
+    def append(self, payload, stamp=None):
+        """Store a telemetry payload ({sensor_id: reading, "actuators": {...}})."""
+        if stamp is None:
+            stamp = int(time.time())
+        fill_values(self.fields, payload, self._scratch, 0)
+        self.append_row(stamp, self._scratch, 0)
+
+    def append_row(self, stamp, values, offset):
+        """Store one sample whose values start at `offset` in `values`."""
+        position = self.staged * self.record_size
+        # One value at a time: unpacking a slice of `values` would allocate
+        struct.pack_into("<I", self.staging, position, stamp)
+        for i in range(self.width):
+            position += 4
+            struct.pack_into("<f", self.staging, position, values[offset + i])
+        self.staged += 1
+        if self.staged == self.write_block:
+            self.flush()
+
+    def flush(self):
+        """Write staged records to flash, rotating segments as they fill up."""
+        written = 0
+        while written < self.staged:
+            if not self.segments or self.tail_records >= self.segment_records:
+                self._rotate()
+            count = min(self.staged - written, self.segment_records - self.tail_records)
+            start = written * self.record_size
+            end = start + count * self.record_size
+            with open(self._segment_path(self.segments[-1]), "ab") as f:
+                f.write(memoryview(self.staging)[start:end])
+            self.tail_records += count
+            written += count
+        if self.staged:
+            self.flushes += 1
+        self.staged = 0
+
+    def _rotate(self):
+        number = self.segments[-1] + 1 if self.segments else 0
+        self.segments.append(number)
+        self.tail_records = 0
+        if len(self.segments) > self.max_segments:
+            oldest = self.segments.pop(0)
+            self.dropped += self.segment_records - self.read_offset
+            self.read_offset = 0
+            os.remove(self._segment_path(oldest))
+
+    # --- Draining ---
+
+    def _oldest_records(self):
+        """Records on flash in the oldest segment (the tail may be partial)."""
+        if len(self.segments) > 1:
+            return self.segment_records
+        return self.tail_records
+
+    def _flash_pending(self):
+        if not self.segments:
+            return 0
+        full = (len(self.segments) - 1) * self.segment_records
+        return full + self.tail_records - self.read_offset
+
+    def pending(self):
+        """Number of samples waiting to be sent."""
+        return self._flash_pending() + self.staged
+
+    def read_rows(self, limit):
+        """
+        Read up to `limit` of the oldest pending samples without removing them.
+        Returns (count, rows, token) where rows yields (stamp, values, offset);
+        the values buffer is reused, so each row must be encoded before the
+        next one is read. Call `consume(token)` once the samples were published.
+        """
+        if self._flash_pending():
+            count = min(limit, self._oldest_records() - self.read_offset)
+            token = (self.segments[0], self.read_offset, count)
+            return count, self._flash_rows(count), token
+        count = min(limit, self.staged)
+        return count, self._staged_rows(count), (None, self.flushes, count)
+
+    def _flash_rows(self, count):
+        record = bytearray(self.record_size)
+        with open(self._segment_path(self.segments[0]), "rb") as f:
+            f.seek(self.read_offset * self.record_size)
+            for _ in range(count):
+                f.readinto(record)
+                yield self._decode(record, 0)
+
+    def _staged_rows(self, count):
+        for i in range(count):
+            yield self._decode(self.staging, i * self.record_size)
+
+    def _decode(self, buffer, position):
+        unpacked = struct.unpack_from(self.format, buffer, position)
+        values = self._scratch
+        for i in range(self.width):
+            values[i] = unpacked[i + 1]
+        return unpacked[0], values, 0
+
+    def read_batch(self, limit):
+        """Build a batched JSON document of the oldest samples, see read_rows."""
+        _, rows, token = self.read_rows(limit)
+        width = self.width
+        samples = [sample_row(stamp, v, offset, width) for stamp, v, offset in rows]
+        return batch_document(self.fields, samples), token
+
+    def consume(self, token):
+        """
+        Forget the samples read with `token` after they were published. If
+        the store moved meanwhile (a rotation dropped the segment they were
+        read from, or staged samples were flushed), nothing is forgotten and
+        they are sent again.
+        """
+        segment, position, count = token
+        if segment is not None:
+            if not self.segments or self.segments[0] != segment:
+                return
+            if self.read_offset != position:
+                return
+            self.read_offset += count
+            if self.read_offset >= self._oldest_records():
+                os.remove(self._segment_path(self.segments.pop(0)))
+                self.read_offset = 0
+                if not self.segments:
+                    self.tail_records = 0
+        elif position == self.flushes:
+            size = self.record_size
+            remaining = self.staged - count
+            self.staging[: remaining * size] = self.staging[
+                count * size : self.staged * size
+            ]
+            self.staged = remaining
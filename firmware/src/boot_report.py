@@ -0,0 +1,29 @@
+import gc
+
+from .clock import ticks_diff, ticks_ms
+
+
+class BootReport:
+    """
+    Timing of the boot phases and heap use once the firmware is running.
+
+    Phases are in milliseconds since the report was created (first thing in
+    main.py); `start_ms` is ticks_ms() at that point, which on MicroPython
+    counts from reset and so includes boot.py and the imports.
+    """
+
+    def __init__(self):
+        self.start = ticks_ms()
+        self.phases = {}
+
+    def mark(self, phase):
+        self.phases[phase] = ticks_diff(ticks_ms(), self.start)
+
+    def document(self):
+        gc.collect()
+        doc = {"start_ms": self.start, "phases": self.phases}
+        # MicroPython only
+        if hasattr(gc, "mem_free"):
+            doc["heap_free"] = gc.mem_free()
+            doc["heap_alloc"] = gc.mem_alloc()
+        return doc
@@ -0,0 +1,56 @@
+"""
+Tick helpers for the firmware.
+MicroPython provides wrapping tick counters in `time`; on the host (tests,
+simulator) we fall back to a monotonic clock with the same interface.
+Wall-clock time is only trusted once `sync_epoch()` has set it from NTP.
+"""
+
+import time
+
+try:
+    from time import ticks_add, ticks_diff, ticks_ms, ticks_us
+except ImportError:
+
+    def ticks_ms():
+        return time.monotonic_ns() // 1_000_000
+
+    def ticks_us():
+        return time.monotonic_ns() // 1_000
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
+
+_synced = False
+
+
+def sync_epoch():
+    """
+    Set the real-time clock from NTP. Returns True on success. On the host
+    the system clock is already synced and is used as it is.
+    """
+    global _synced
+    try:
+        import ntptime
+
+        ntptime.settime()
+    except ImportError:
+        pass
+    except Exception as e:
+        print(f"NTP sync failed: {e}")
+        return False
+    _synced = True
+    return True
+
+
+def epoch_ms():
+    """Milliseconds since 1970 (UTC), or 0 while the clock was never synced."""
+    if not _synced:
+        return 0
+    return time.time_ns() // 1_000_000
+
+
+__all__ = ["epoch_ms", "sync_epoch", "ticks_add", "ticks_diff", "ticks_ms", "ticks_us"]
@@ -0,0 +1,174 @@
+import struct
+import time
+from array import array
+
+from .telemetry_buffer import ACTUATORS_SOURCE, batch_document, fill_values, sample_row
+
+# Binary telemetry header: magic, version, schema_id, sample count, device
+# time, publish sequence number, publish time (epoch ms, 0 when not synced)
+HEADER_FORMAT = "<BBIHIIQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+MAGIC = 0xB7  # Never a valid first byte of a JSON document
+VERSION = 2
+# The sequence number and publish time are written by the MQTT manager
+STAMP_FORMAT = "<IQ"
+STAMP_OFFSET = HEADER_SIZE - struct.calcsize(STAMP_FORMAT)
+
+
+def schema_id(fields):
+    """
+    32-bit FNV-1a hash of the field layout. Both ends compute it from the
+    same (source, metric, unit) list derived from config.json, so a change
+    of sensors or actuators yields a new schema.
+    """
+    h = 0x811C9DC5
+    for source, metric, unit in fields:
+        for byte in f"{source}/{metric}/{unit or ''};".encode():
+            h = ((h ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return h
+
+
+class JsonCodec:
+    """Readable encoding, kept for debugging."""
+
+    name = "json"
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.width = len(fields)
+        self.schema_id = schema_id(fields)
+
+    def schema_document(self):
+        return {"id": self.schema_id, "encoding": self.name, "fields": self.fields}
+
+    def encode_payload(self, payload):
+        """A single sample keeps the nested {sensor_id: {metric: ...}} format."""
+        return payload
+
+    def encode_sample(self, values, stamp=None):
+        """
+        Same document as encode_payload() from the values of a TelemetryFrame.
+        The JSON encoding is for debugging and allocates its documents.
+        """
+        payload = {ACTUATORS_SOURCE: {}}
+        for i, (source, metric, unit) in enumerate(self.fields):
+            value = values[i]
+            if source == ACTUATORS_SOURCE:
+                payload[source][metric] = "ON" if value else "OFF"
+            elif value != value:
+                payload[source] = None  # Failed reading
+            else:
+                reading = payload.setdefault(source, {})
+                reading[metric] = {"value": round(value, 2), "unit": unit}
+        return payload
+
+    def encode(self, rows, count):
+        """Encode (stamp, values, offset) rows as a batched JSON document."""
+        width = self.width
+        samples = [sample_row(stamp, v, offset, width) for stamp, v, offset in rows]
+        return batch_document(self.fields, samples)
+
+    def encode_ring(self, ring):
+        """Encode the samples of a SampleRing, oldest first."""
+        rows = ((stamp, ring.values, offset) for stamp, offset in ring.slots())
+        return self.encode(rows, ring.count)
+
+
+class BinaryCodec(JsonCodec):
+    """
+    Compact encoding: a header followed by fixed-size `<I` stamp + `<f` value
+    records, with NaN for missing readings. Field names are sent once, in the
+    retained schema announcement, instead of in every message.
+
+    encode_sample() and encode_ring() write into buffers preallocated by the
+    codec and return them (a memoryview for batches): the message is only
+    valid until the next call, which is enough to publish it.
+    """
+
+    name = "binary"
+
+    def __init__(self, fields):
+        super().__init__(fields)
+        self.record_format = f"<I{self.width}f"
+        self.record_size = struct.calcsize(self.record_format)
+        self._scratch = array("f", (0.0 for _ in range(self.width)))
+        self._sample = bytearray(HEADER_SIZE + self.record_size)
+        self._batch = bytearray(0)
+        self._views = {}  # Message size -> memoryview of _batch
+
+    def _header(self, buffer, count):
+        struct.pack_into(
+            HEADER_FORMAT,
+            buffer,
+            0,
+            MAGIC,
+            VERSION,
+            self.schema_id,
+            count,
+            int(time.time()),
+            0,
+            0,
+        )
+
+    def _record(self, buffer, position, stamp, values, offset):
+        # One value at a time: unpacking a slice of `values` would allocate
+        struct.pack_into("<I", buffer, position, stamp)
+        for i in range(self.width):
+            position += 4
+            struct.pack_into("<f", buffer, position, values[offset + i])
+
+    def encode_payload(self, payload):
+        fill_values(self.fields, payload, self._scratch, 0)
+        return self.encode([(int(time.time()), self._scratch, 0)], 1)
+
+    def encode_sample(self, values, stamp=None):
+        if stamp is None:
+            stamp = int(time.time())
+        self._header(self._sample, 1)
+        self._record(self._sample, HEADER_SIZE, stamp, values, 0)
+        return self._sample
+
+    def encode(self, rows, count):
+        buffer = bytearray(HEADER_SIZE + count * self.record_size)
+        self._header(buffer, count)
+        position = HEADER_SIZE
+        for stamp, values, offset in rows:
+            self._record(buffer, position, stamp, values, offset)
+            position += self.record_size
+        return buffer
+
+    def encode_ring(self, ring):
+        count = ring.count
+        size = HEADER_SIZE + count * self.record_size
+        message = self._views.get(size)
+        if message is None:
+            if size > len(self._batch):
+                records = max(count, ring.capacity)
+                self._batch = bytearray(HEADER_SIZE + records * self.record_size)
+                self._views = {}
+            message = self._views[size] = memoryview(self._batch)[:size]
+        self._header(message, count)
+        start = (ring.head - count) % ring.capacity
+        position = HEADER_SIZE
+        for i in range(count):
+            slot = (start + i) % ring.capacity
+            self._record(
+                message, position, ring.stamps[slot], ring.values, slot * ring.width
+            )
+            position += self.record_size
+        return message
+
+
+def stamp(message, seq, ts):
+    """Write the sequence number and publish time into a binary message."""
+    struct.pack_into(STAMP_FORMAT, message, STAMP_OFFSET, seq, ts)
+
+
+CODECS = {JsonCodec.name: JsonCodec, BinaryCodec.name: BinaryCodec}
+
+
+def make_codec(name, fields):
+    codec_class = CODECS.get(name)
+    if codec_class is None:
+        raise ValueError(f"Unknown telemetry encoding: {name}")
+    return codec_class(fields)
@@ -0,0 +1,27 @@
+"""
+Growing conditions per culture, used by the control engine.
+
+Each culture maps a metric to the (low, high) band it should be kept in.
+The rules of the "control" section of config.json bind a sensor metric to
+an actuator and take their band from the selected culture, unless the rule
+sets its own "low"/"high".
+"""
+
+# Rule actions: the actuator raises the metric (a pump for soil moisture) or
+# lowers it (a fan for humidity)
+RAISE = "raise"
+LOWER = "lower"
+
+CULTURES = {
+    # Substrate moisture in percent, air humidity in percent, temperature in
+    # degrees Celsius
+    "radish": {"moisture": (55, 75), "humidity": (50, 70), "temperature": (10, 20)},
+    "tomato": {"moisture": (40, 60), "humidity": (60, 80), "temperature": (18, 27)},
+    "lettuce": {"moisture": (50, 70), "humidity": (50, 70), "temperature": (12, 20)},
+    "basil": {"moisture": (45, 65), "humidity": (40, 60), "temperature": (20, 28)},
+    "strawberry": {
+        "moisture": (55, 70),
+        "humidity": (60, 75),
+        "temperature": (15, 24),
+    },
+}
@@ -0,0 +1,115 @@
+import json
+import os
+
+# Sections whose entries are matched by "id" in partial updates
+ITEM_SECTIONS = ("sensors", "actuators", "buttons")
+# Sections only read at boot: saved, then applied by the next restart
+RESTART_SECTIONS = (
+    "client_id",
+    "mqtt",
+    "connection",
+    "backlog",
+    "metrics",
+    "memory",
+)
+# Driver arguments that need a new driver instance when they change
+DRIVER_KEYS = ("type", "pin", "samples", "trim")
+
+
+def parse_update(msg, version):
+    """
+    Decode a `<client_id>/config` message. Returns the update document, or
+    None when it is not newer than `version` (e.g. a retained update that
+    was already applied). Raises ValueError when it cannot be used.
+    """
+    try:
+        update = json.loads(msg)
+    except ValueError as e:
+        raise ValueError(f"Invalid config document: {e}") from e
+    if not isinstance(update, dict):
+        raise ValueError("Config update must be an object")
+    new_version = update.get("version")
+    if not isinstance(new_version, int) or isinstance(new_version, bool):
+        raise ValueError("Config update needs an integer version")
+    if new_version <= version:
+        return None
+    return update
+
+
+def _merge_items(items, changes):
+    merged = {item["id"]: item for item in items}
+    order = [item["id"] for item in items]
+    for change in changes:
+        item_id = change.get("id")
+        if item_id is None:
+            raise ValueError("Config update item without id")
+        if change.get("remove"):
+            if merged.pop(item_id, None) is not None:
+                order.remove(item_id)
+        elif item_id in merged:
+            merged[item_id] = {**merged[item_id], **change}
+        else:
+            merged[item_id] = change
+            order.append(item_id)
+    return [merged[item_id] for item_id in order]
+
+
+def merge_config(config, update):
+    """
+    New configuration from `update`. With "full": true the update replaces
+    the configuration; otherwise each section it contains is merged: items
+    of the sensors, actuators and buttons lists by id ({"id", "remove": true}
+    deletes one), other objects key by key, anything else replaced.
+    `config` is left untouched.
+    """
+    if update.get("full"):
+        merged = {}
+    else:
+        merged = dict(config)
+    for key, value in update.items():
+        if key == "full":
+            continue
+        current = merged.get(key)
+        if key in ITEM_SECTIONS and isinstance(current, list):
+            if not isinstance(value, list):
+                raise ValueError(f"{key}: expected a list")
+            merged[key] = _merge_items(current, value)
+        elif isinstance(value, dict) and isinstance(current, dict):
+            merged[key] = {**current, **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+def diff_items(old_items, new_items):
+    """Ids of the items added or changed, and of those removed."""
+    old = {item["id"]: item for item in old_items}
+    new = {item["id"]: item for item in new_items}
+    changed = [item_id for item_id, item in new.items() if old.get(item_id) != item]
+    removed = [item_id for item_id in old if item_id not in new]
+    return changed, removed
+
+
+def needs_new_driver(old_item, new_item):
+    """False when a sensor change can be applied to the running driver."""
+    if old_item is None:
+        return True
+    for key in DRIVER_KEYS:
+        if old_item.get(key) != new_item.get(key):
+            return True
+    return False
+
+
+def changed_sections(old, new):
+    """Top-level keys whose value differs, version excluded."""
+    keys = [key for key in new if key != "version"]
+    keys += [key for key in old if key not in new and key != "version"]
+    return [key for key in keys if old.get(key) != new.get(key)]
+
+
+def save_config(config, path):
+    """Write the configuration to flash, replacing the file only once written."""
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(config, f)
+    os.rename(temporary, path)
@@ -0,0 +1,149 @@
+import asyncio
+from array import array
+
+from .clock import ticks_diff, ticks_ms
+from .config_culture import RAISE
+
+NAN = float("nan")
+
+
+class ControlEngine:
+    """
+    Local closed-loop control: hysteresis rules evaluated against every new
+    sensor reading, without the gateway or the network.
+
+    A "raise" rule switches its actuator on when the metric falls below the
+    (low, high) band and off when it rises above it; a "lower" rule does the
+    opposite. Inside the band the actuator is left as it is, so a manual or
+    remote command holds until the metric leaves the band. `max_on` seconds
+    bounds a single activation by the engine and `min_off` seconds keeps the
+    actuator off afterwards. A failed reading switches off an actuator the
+    engine turned on.
+
+    The rules are compiled once into a table; readings only update the
+    value slots of their sensor's rules and wake the engine task.
+    """
+
+    def __init__(self, rules, sensors, actuators, bands=None, on_change=None):
+        bands = bands or {}
+        # One tuple per rule:
+        # (sensor_id, metric, actuator_id, raises, low, high, max_on_ms, min_off_ms)
+        self.table = []
+        self.actuators = []
+        self.by_sensor = {}  # sensor_id -> indexes of its rules
+        self.columns = bytearray(len(rules))  # Position of the metric in readings
+        for index, rule in enumerate(rules):
+            sensor_id, metric = rule["sensor"], rule["metric"]
+            sensor = sensors.get(sensor_id)
+            metrics = [m for m, _ in sensor.METRICS] if sensor is not None else []
+            if metric not in metrics:
+                raise ValueError(f"Control rule {index}: no {sensor_id} {metric}")
+            self.columns[index] = metrics.index(metric)
+            low, high = bands.get(metric, (None, None))
+            low = rule.get("low", low)
+            high = rule.get("high", high)
+            if low is None or high is None or low >= high:
+                raise ValueError(f"Control rule {index}: invalid band for {metric}")
+            self.table.append(
+                (
+                    sensor_id,
+                    metric,
+                    rule["actuator"],
+                    rule.get("action", RAISE) == RAISE,
+                    low,
+                    high,
+                    int(rule.get("max_on", 0) * 1000),
+                    int(rule.get("min_off", 0) * 1000),
+                )
+            )
+            self.actuators.append(actuators[rule["actuator"]])
+            self.by_sensor.setdefault(sensor_id, []).append(index)
+
+        count = len(self.table)
+        self.values = array("f", (NAN for _ in range(count)))
+        self.pending = bytearray(count)
+        self.engaged = bytearray(count)  # 1 while the engine holds it on
+        self.since = [None] * count  # ticks_ms of the engine's last switch
+        self.on_change = on_change
+        self.switches = 0
+        self._wake = asyncio.Event()
+
+    def on_reading(self, sensor_id, values, offset):
+        """Sampler subscriber: copy the values the rules need (NaN if failed)."""
+        indexes = self.by_sensor.get(sensor_id)
+        if indexes is None:
+            return
+        for i in indexes:
+            self.values[i] = values[offset + self.columns[i]]
+            self.pending[i] = 1
+        self._wake.set()
+
+    def _switch(self, i, on, now, reason):
+        actuator = self.actuators[i]
+        if on:
+            actuator.on()
+        else:
+            actuator.off()
+        self.engaged[i] = on
+        self.since[i] = now
+        self.switches += 1
+        print(f"Control: {self.table[i][2]} {'ON' if on else 'OFF'} ({reason})")
+        if self.on_change is not None:
+            self.on_change(self.table[i][2], actuator)
+
+    def evaluate(self, now=None):
+        """Apply the rules with a new reading, and the max_on limits."""
+        now = ticks_ms() if now is None else now
+        table = self.table
+        for i in range(len(table)):
+            sensor_id, metric, _, raises, low, high, max_on, min_off = table[i]
+            if self.engaged[i]:
+                if not self.actuators[i].is_on():
+                    # Switched off by a command or a button meanwhile
+                    self.engaged[i] = 0
+                elif max_on and ticks_diff(now, self.since[i]) >= max_on:
+                    self._switch(i, False, now, "max_on reached")
+                    continue
+            if not self.pending[i]:
+                continue
+            self.pending[i] = 0
+
+            value = self.values[i]
+            if value != value:  # NaN: the reading failed
+                if self.engaged[i]:
+                    self._switch(i, False, now, f"no {sensor_id} reading")
+                continue
+            if raises:
+                want_on, want_off = value < low, value > high
+            else:
+                want_on, want_off = value > high, value < low
+
+            is_on = self.actuators[i].is_on()
+            if want_on and not is_on:
+                since = self.since[i]
+                if min_off and since is not None and ticks_diff(now, since) < min_off:
+                    continue
+                self._switch(i, True, now, f"{sensor_id} {metric} {value:.1f}")
+            elif want_off and is_on:
+                self._switch(i, False, now, f"{sensor_id} {metric} {value:.1f}")
+
+    def release(self, now=None):
+        """Switch off what the engine holds on, before it is replaced."""
+        now = ticks_ms() if now is None else now
+        for i in range(len(self.table)):
+            if self.engaged[i] and self.actuators[i].is_on():
+                self._switch(i, False, now, "reconfigured")
+
+    async def run(self, tick=1):
+        """
+        Task evaluating the rules as soon as a reading arrives, so control
+        latency is bounded by the sampling period. `tick` seconds bounds the
+        time to enforce max_on.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), tick)
+            except asyncio.TimeoutError:  # noqa: UP041 (own class on MicroPython)
+                pass
+            self._wake.clear()
+            self.evaluate()
@@ -0,0 +1,77 @@
+import gc
+
+try:
+    from gc import mem_alloc, mem_free
+except ImportError:  # CPython: no MicroPython heap to report on
+    mem_alloc = mem_free = None
+
+
+def largest_free_block(resolution=1024):
+    """
+    Size in bytes of the largest bytearray that can be allocated right now,
+    rounded down to `resolution`. It shrinks below the free heap as the heap
+    fragments. MicroPython has no direct query for it, so it is found by
+    bisection between 0 and mem_free() in steps of `resolution`: about 7
+    trial allocations on a 100 KiB heap, and each one that fails makes the
+    allocator run a full collection first, a few milliseconds apiece on the
+    Pico W (RP2040). It is meant for the periodic metrics report only.
+    """
+    gc.collect()
+    low, high = 0, mem_free() // resolution
+    while low < high:
+        size = (low + high + 1) // 2
+        try:
+            block = bytearray(size * resolution)
+        except MemoryError:
+            high = size - 1
+        else:
+            del block
+            low = size
+    gc.collect()
+    return low * resolution
+
+
+class HeapMonitor:
+    """
+    Garbage collection schedule and heap health.
+
+    By default MicroPython collects when an allocation fails, a pause of
+    several milliseconds at whatever point the heap ran out. configure()
+    sets a threshold so that collections come earlier and stay short, and
+    collect() is run by a periodic task between telemetry cycles. After each
+    scheduled collection the free heap is recorded; its minimum shows how
+    close the device came to running out.
+    """
+
+    def __init__(self, threshold_divisor=4):
+        self.threshold_divisor = threshold_divisor
+        self.collections = 0
+        self.min_free = None
+
+    def configure(self):
+        """Collect once and set the allocation threshold (MicroPython only)."""
+        gc.collect()
+        if mem_free is not None and hasattr(gc, "threshold"):
+            # Collect after a quarter of the free heap has been allocated
+            gc.threshold(mem_free() // self.threshold_divisor + mem_alloc())
+
+    async def collect(self):
+        """Periodic step: a short collection while the loop is idle."""
+        gc.collect()
+        self.collections += 1
+        if mem_free is not None:
+            free = mem_free()
+            if self.min_free is None or free < self.min_free:
+                self.min_free = free
+
+    def document(self):
+        """Heap state for the metrics report."""
+        if mem_free is None:
+            return {"collections": self.collections}
+        return {
+            "free": mem_free(),
+            "allocated": mem_alloc(),
+            "largest_free": largest_free_block(),
+            "min_free": self.min_free,
+            "collections": self.collections,
+        }
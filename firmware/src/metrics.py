@@ -0,0 +1,130 @@
+import asyncio
+from array import array
+
+from .clock import ticks_diff, ticks_us
+
+# Upper bounds of the histogram buckets in microseconds; a last bucket
+# counts everything above the final bound
+BUCKETS_US = (100, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000)
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in microseconds."""
+
+    def __init__(self, bounds=BUCKETS_US):
+        self.bounds = bounds
+        self.counts = array("L", (0 for _ in range(len(bounds) + 1)))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        if value < 0:
+            value = 0
+        bounds = self.bounds
+        i = 0
+        n = len(bounds)
+        while i < n and value > bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def document(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total // self.count if self.count else 0,
+            "max_us": self.max,
+            "buckets": list(self.counts),
+        }
+
+
+class LoopMetrics:
+    """
+    Event-loop health: scheduling lag and per-task iteration time.
+
+    The lag probe sleeps for `period_ms` and records how late it wakes up;
+    any task that holds the loop without yielding shows up there, and the
+    largest lag of an interval is the longest stall. Tasks record how long
+    each of their iterations took through a Histogram from `task()`.
+    Everything is reset after each `document()`, so every published report
+    covers one interval.
+
+    Nothing here runs unless the firmware creates it: with metrics disabled
+    the tasks use their plain, uninstrumented loops.
+    """
+
+    def __init__(self, period_ms=100, bounds=BUCKETS_US):
+        self.period_ms = period_ms
+        self.bounds = bounds
+        self.lag = Histogram(bounds)
+        self.tasks = {}
+
+    def task(self, name):
+        """Histogram for the iterations of task `name`."""
+        histogram = self.tasks.get(name)
+        if histogram is None:
+            histogram = self.tasks[name] = Histogram(self.bounds)
+        return histogram
+
+    async def probe(self):
+        """Task measuring scheduling lag, for as long as the loop runs."""
+        period_us = self.period_ms * 1000
+        delay = self.period_ms / 1000
+        while True:
+            start = ticks_us()
+            await asyncio.sleep(delay)
+            self.lag.record(ticks_diff(ticks_us(), start) - period_us)
+
+    def document(self):
+        """Report of the interval since the last call, then start a new one."""
+        doc = {
+            "buckets_us": self.bounds,
+            "loop_lag": self.lag.document(),
+            "tasks": {name: h.document() for name, h in self.tasks.items()},
+        }
+        self.lag.reset()
+        for histogram in self.tasks.values():
+            histogram.reset()
+        return doc
+
+
+async def periodic(step, interval, histogram=None):
+    """
+    Await `step()` every `interval` seconds. `interval` can also be a
+    function returning the current interval, for settings changed at run
+    time. With a histogram, the duration of each step is recorded in it;
+    without, the loop carries no timing code.
+    """
+    delay = interval if callable(interval) else (lambda: interval)
+    if histogram is None:
+        while True:
+            await step()
+            await asyncio.sleep(delay())
+    while True:
+        start = ticks_us()
+        await step()
+        histogram.record(ticks_diff(ticks_us(), start))
+        await asyncio.sleep(delay())
+
+
+def timed(function, histogram):
+    """Wrap a synchronous callback so that each call is recorded."""
+
+    def wrapper(*args):
+        start = ticks_us()
+        try:
+            return function(*args)
+        finally:
+            histogram.record(ticks_diff(ticks_us(), start))
+
+    return wrapper
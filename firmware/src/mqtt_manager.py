@@ -1,48 +1,166 @@
 import ujson
+from lib.umqtt.aio import MQTTAsyncClient
 from lib.umqtt.simple import MQTTClient
 
+from .clock import epoch_ms
+from .codec import MAGIC, stamp
+
 
 class MqttManager:
-    """Handles MQTT connection and data publishing."""
+    """
+    Handles MQTT connection and data publishing.
+
+    With `use_async` (the default) the asyncio stream client is used and
+    inbound commands are dispatched by its reader task as they arrive;
+    otherwise the blocking MQTTClient is used and `check_msg` must be polled.
+
+    Sessions are persistent (clean_session=False): after a reconnect the
+    broker still holds the subscriptions and the QoS 1 commands sent in
+    the meantime. `fallback_ip` is a secondary broker, used once
+    ConnectionSupervisor gives up on the current one (`use_next_broker`).
+    """
 
-    def __init__(self, client_id, broker_ip, user, password, port=1883):
-        self.client = MQTTClient(
+    def __init__(
+        self,
+        client_id,
+        broker_ip,
+        user,
+        password,
+        port=1883,
+        use_async=True,
+        fallback_ip=None,
+        keepalive=60,
+    ):
+        client_class = MQTTAsyncClient if use_async else MQTTClient
+        self.client = client_class(
             client_id=client_id,
             server=broker_ip,
             user=user,
             password=password,
             port=port,
-            keepalive=60,
+            keepalive=keepalive,
         )
+        self.brokers = [broker_ip] + ([fallback_ip] if fallback_ip else [])
         self.broker_ip = broker_ip
+        self.is_async = use_async
+        self._connected = False
+        self.sequence = {}  # topic -> sequence number of its next message
+
+    @property
+    def connected(self):
+        """False as soon as a failure was seen or the client lost the socket."""
+        if self.is_async:
+            return self._connected and self.client.is_connected()
+        return self._connected
+
+    @property
+    def last_rx(self):
+        """ticks_ms of the last packet received from the broker."""
+        return self.client.last_rx
+
+    @property
+    def needs_polling(self):
+        """True when inbound messages are only processed by check_msg()."""
+        return not self.is_async
+
+    async def _run(self, method, *args):
+        """Call a client method, awaiting it when the client is asynchronous."""
+        result = method(*args)
+        if self.is_async:
+            result = await result
+        return result
 
     def set_callback(self, callback_func):
         self.client.set_callback(callback_func)
 
+    def use_next_broker(self):
+        """Switch to the next configured broker. False if there is only one."""
+        if len(self.brokers) < 2:
+            return False
+        index = (self.brokers.index(self.broker_ip) + 1) % len(self.brokers)
+        self.broker_ip = self.client.server = self.brokers[index]
+        print(f"MQTT: switching to broker {self.broker_ip}")
+        return True
+
     async def connect(self):
-        """Connect to the MQTT broker."""
+        """Connect to the MQTT broker, resuming the previous session."""
+        self.client.close()  # Whatever is left of a lost connection
         try:
-            self.client.connect()
-            # TODO: Consider subscribing to something related to config.json
-            # in the future for dynamic updates
-            self.client.subscribe(f"{self.client.client_id}/actuators/+/action")
-            self.client.subscribe(f"{self.client.client_id}/sensors/+/action")
+            session_present = await self._run(self.client.connect, False)
+            if not session_present:
+                # New session (first connection, or another broker):
+                # QoS 1 so that the broker queues commands while offline
+                client_id = self.client.client_id
+                # Configuration updates (see config_update.py)
+                await self._run(self.client.subscribe, f"{client_id}/config", 1)
+                await self._run(
+                    self.client.subscribe, f"{client_id}/actuators/+/action", 1
+                )
+                await self._run(
+                    self.client.subscribe, f"{client_id}/sensors/+/action", 1
+                )
             print(
-                f"Connected to MQTT Broker at {self.broker_ip} and subscribed \
-                    to {self.client.client_id}"
+                f"Connected to MQTT Broker at {self.broker_ip} "
+                f"({'resumed' if session_present else 'new'} session)"
             )
+            self._connected = True
             return True
         except Exception as e:
             print(f"Failed to connect to MQTT: {e}")
+            self._connected = False
             return False
 
+    def drop(self):
+        """Abandon a connection that stopped answering."""
+        self._connected = False
+        self.client.close()
+
+    async def ping(self):
+        """Send a PINGREQ; the answer shows up in `last_rx`."""
+        try:
+            await self._run(self.client.ping)
+        except Exception as e:
+            print(f"Failed to ping: {e}")
+            self._connected = False
+
     def check_msg(self):
-        self.client.check_msg()
+        """Process pending inbound messages (blocking client only)."""
+        if not self._connected:
+            return
+        try:
+            self.client.check_msg()
+        except Exception as e:
+            print(f"MQTT connection lost: {e}")
+            self._connected = False
+
+    async def publish(self, topic, data, retain=False, qos=0):
+        """
+        Publish a dictionary as a JSON string, or already encoded bytes
+        (e.g. binary telemetry) as they are. Returns True on success; with
+        `qos` 1 or 2 only once the broker has acknowledged the message.
 
-    def publish(self, topic, data):
-        """Publish a dictionary as a JSON string."""
+        Each message carries its topic's sequence number and the publish
+        time, so the gateway can tell lost messages from late ones and
+        measure latency: dictionaries get "seq" and "ts" keys (added in
+        place), binary telemetry has them in its header. The sequence
+        number only advances when the message was handed to the client.
+        """
+        seq = self.sequence.get(topic, 0)
         try:
-            msg = ujson.dumps(data)
-            self.client.publish(topic, msg)
+            if isinstance(data, (bytes, bytearray, memoryview)):  # noqa: UP038
+                # Binary telemetry is a codec buffer, stamped in place
+                if not isinstance(data, bytes) and data and data[0] == MAGIC:
+                    stamp(data, seq, epoch_ms())
+                msg = data
+            else:
+                data["seq"] = seq
+                data["ts"] = epoch_ms()
+                msg = ujson.dumps(data)
+            await self._run(self.client.publish, topic, msg, retain, qos)
+            self.sequence[topic] = (seq + 1) & 0xFFFFFFFF
+            return True
         except Exception as e:
             print(f"Failed to publish: {e}")
+            # A failed write usually means the socket is gone
+            self._connected = False
+            return False
@@ -3,7 +3,7 @@ import uasyncio as asyncio
 
 
 class NetworkManager:
-    """Manages Wi-Fi connection and persistence."""
+    """Manages the Wi-Fi connection (kept up by ConnectionSupervisor)."""
 
     def __init__(self, ssid, password):
         self.ssid = ssid
@@ -27,11 +27,3 @@ class NetworkManager:
             print(f"Wi-Fi Connected: {self.wlan.ifconfig()[0]}")
             return True
         return False
-
-    async def keep_connected(self):
-        """Background task to ensure the connection stays alive."""
-        while True:
-            if not self.wlan.isconnected():
-                print("Wi-Fi lost, reconnecting...")
-                await self.connect()
-            await asyncio.sleep(30)
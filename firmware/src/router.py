@@ -0,0 +1,88 @@
+# Log levels for CommandRouter.verbosity
+QUIET = 0
+ERRORS = 1
+MESSAGES = 2
+
+
+class CommandRouter:
+    """
+    Dispatch table for inbound command topics.
+
+    Built once at startup from the actuator and sensor registries, it maps
+    the exact topic bytes delivered by the MQTT client to a prebound
+    handler, so routing a message is a single dict lookup with no decoding
+    or splitting. Actuator actions are looked up by their raw payload bytes
+    the same way. Anything not in the table is dropped and only counted.
+    """
+
+    def __init__(self, client_id, verbosity=ERRORS):
+        self.client_id = client_id
+        self.verbosity = verbosity
+        self.routes = {}  # topic bytes -> handler(msg)
+        self.routed = 0
+        self.rejected = 0
+
+    def add(self, topic, handler):
+        """Route `topic` (relative to the client id) to `handler(msg)`."""
+        self.routes[f"{self.client_id}/{topic}".encode()] = handler
+
+    def clear(self):
+        """Drop every route, before the table is rebuilt for a new config."""
+        self.routes = {}
+
+    def add_actuators(self, actuators, actions, on_change):
+        """
+        Route `actuators/<id>/action` to the actuator methods named in
+        `actions`, then call `on_change(actuator_id, actuator)`.
+        """
+        for actuator_id, actuator in actuators.items():
+            methods = {action.encode(): getattr(actuator, action) for action in actions}
+            self.add(
+                f"actuators/{actuator_id}/action",
+                self._actuator_handler(actuator_id, actuator, methods, on_change),
+            )
+
+    def add_sensors(self, sensors, on_read):
+        """Route `sensors/<id>/action` with a `read` payload to `on_read(id)`."""
+        for sensor_id in sensors:
+            self.add(
+                f"sensors/{sensor_id}/action", self._sensor_handler(sensor_id, on_read)
+            )
+
+    def _actuator_handler(self, actuator_id, actuator, methods, on_change):
+        def handle(msg):
+            method = methods.get(msg)
+            if method is None:
+                return False
+            method()
+            on_change(actuator_id, actuator)
+            return True
+
+        return handle
+
+    def _sensor_handler(self, sensor_id, on_read):
+        def handle(msg):
+            if msg != b"read":
+                return False
+            on_read(sensor_id)
+            return True
+
+        return handle
+
+    def dispatch(self, topic, msg):
+        """MQTT callback. Returns True if a handler accepted the message."""
+        handler = self.routes.get(topic)
+        try:
+            accepted = handler is not None and handler(msg)
+        except Exception as e:
+            accepted = False
+            if self.verbosity >= ERRORS:
+                print(f"Routing error on {topic}: {e}")
+
+        if accepted:
+            self.routed += 1
+        else:
+            self.rejected += 1
+        if self.verbosity >= MESSAGES:
+            print(f"{'Routed' if accepted else 'Rejected'} {topic}: {msg}")
+        return accepted
@@ -0,0 +1,174 @@
+import asyncio
+from array import array
+
+from .clock import ticks_diff, ticks_ms
+
+NAN = float("nan")
+
+
+class Sampler:
+    """
+    Single owner of the sensor hardware.
+
+    Every consumer (telemetry, on-demand reads, local logic) goes through
+    the sampler instead of calling `read()` itself. Each reading is cached
+    with its timestamp; a sensor is never measured more often than its
+    driver's MIN_INTERVAL, and concurrent requests for the same sensor share
+    a single measurement. Consumers that only want new values can subscribe
+    instead of polling.
+
+    Drivers measure straight into `store`, a preallocated float array where
+    each sensor owns the slots from `offsets[sensor_id]`, one per metric
+    (NaN after a failed measurement). Sampling and telemetry read the store
+    and allocate nothing; the reading documents returned by `read()` and
+    `latest()` are only built when asked for.
+
+    Sensors can be replaced or removed while the tasks run (configuration
+    reload); loops go through `ids`, a snapshot rebuilt on every change.
+    """
+
+    def __init__(self, sensors):
+        self.sensors = sensors
+        self.period = None  # Set by run(), can be changed while it runs
+        self.ticks = {}  # sensor_id -> ticks_ms of the last reading
+        self.ok = {}  # sensor_id -> whether the last measurement succeeded
+        self.reads = {sensor_id: 0 for sensor_id in sensors}  # Hardware reads
+        self.store = array("f")
+        self.offsets = {}
+        self._readings = {}  # sensor_id -> reading document, built on demand
+        self._locks = {sensor_id: asyncio.Lock() for sensor_id in sensors}
+        self._subscribers = []
+        self._layout()
+
+    def _layout(self):
+        """Allocate the store for the current sensors, keeping their values."""
+        offsets = {}
+        width = 0
+        for sensor_id, sensor in self.sensors.items():
+            offsets[sensor_id] = width
+            width += len(sensor.METRICS)
+        store = array("f", (NAN for _ in range(width)))
+        for sensor_id, offset in offsets.items():
+            old = self.offsets.get(sensor_id)
+            if old is not None and sensor_id in self.ticks:
+                for i in range(len(self.sensors[sensor_id].METRICS)):
+                    store[offset + i] = self.store[old + i]
+        self.ids = tuple(self.sensors)
+        self.offsets = offsets
+        self.store = store
+
+    def subscribe(self, callback):
+        """
+        Call `callback(sensor_id, store, offset)` after every new measurement;
+        the sensor's values start at `offset` in `store` (NaN if it failed).
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def replace(self, sensor_id, sensor):
+        """Add a sensor or swap its driver, dropping the cached reading."""
+        self.sensors[sensor_id] = sensor
+        for table in (self.ticks, self.ok, self._readings):
+            table.pop(sensor_id, None)
+        self.reads.setdefault(sensor_id, 0)
+        if sensor_id not in self._locks:
+            self._locks[sensor_id] = asyncio.Lock()
+        self._layout()
+
+    def remove(self, sensor_id):
+        self.sensors.pop(sensor_id, None)
+        for table in (self.ticks, self.ok, self._readings, self.reads, self._locks):
+            table.pop(sensor_id, None)
+        self._layout()
+
+    def age_ms(self, sensor_id):
+        """Milliseconds since the cached reading was taken, or None."""
+        tick = self.ticks.get(sensor_id)
+        if tick is None:
+            return None
+        return ticks_diff(ticks_ms(), tick)
+
+    def latest(self, sensor_id):
+        """
+        Cached reading {metric: {"value", "unit"}}, without touching the
+        hardware. None if the sensor was not read yet or its reading failed.
+        """
+        if not self.ok.get(sensor_id):
+            return None
+        reading = self._readings.get(sensor_id)
+        if reading is None:
+            store = self.store
+            offset = self.offsets[sensor_id]
+            reading = {}
+            for i, (metric, unit) in enumerate(self.sensors[sensor_id].METRICS):
+                # Rounding hides float32 noise (42.1 -> 42.099998)
+                reading[metric] = {"value": round(store[offset + i], 2), "unit": unit}
+            self._readings[sensor_id] = reading
+        return reading
+
+    def is_fresh(self, sensor_id, max_age):
+        """True when the cached reading is recent enough for `max_age`."""
+        age = self.age_ms(sensor_id)
+        if age is None:
+            return False
+        min_interval = self.sensors[sensor_id].MIN_INTERVAL
+        limit = max(max_age or 0, min_interval)
+        return age < limit * 1000
+
+    async def refresh(self, sensor_id, max_age=None):
+        """
+        Make the values in the store at most `max_age` seconds old, measuring
+        the sensor only when the cache is older than that and than the
+        driver's minimum interval. Raises KeyError for unknown sensors.
+        """
+        requested = ticks_ms()
+        async with self._locks[sensor_id]:
+            if self.is_fresh(sensor_id, max_age):
+                return
+            # Measured by another caller while this one waited for the lock
+            tick = self.ticks.get(sensor_id)
+            if tick is not None and ticks_diff(tick, requested) >= 0:
+                return
+            await self._measure(sensor_id)
+
+    async def read(self, sensor_id, max_age=None):
+        """refresh(), then return the reading (None if it failed)."""
+        await self.refresh(sensor_id, max_age)
+        return self.latest(sensor_id)
+
+    async def _measure(self, sensor_id):
+        store = self.store
+        offset = self.offsets[sensor_id]
+        sensor = self.sensors[sensor_id]
+        try:
+            ok = await sensor.measure_into_async(store, offset)
+        except Exception as e:
+            print(f"Sampling error on {sensor_id}: {e}")
+            ok = False
+        if store is not self.store:
+            return  # Sensors reconfigured meanwhile, the store was replaced
+
+        if not ok:
+            for i in range(len(sensor.METRICS)):
+                store[offset + i] = NAN
+        self.reads[sensor_id] += 1
+        self.ok[sensor_id] = ok
+        self.ticks[sensor_id] = ticks_ms()
+        self._readings.pop(sensor_id, None)
+        for callback in self._subscribers:
+            callback(sensor_id, store, offset)
+
+    async def run(self, period):
+        """
+        Background task refreshing every sensor once per `period` seconds,
+        or per `self.period` once that is changed.
+        """
+        self.period = period
+        while True:
+            for sensor_id in self.ids:
+                if sensor_id in self.sensors:
+                    await self.refresh(sensor_id, max_age=self.period / 2)
+            await asyncio.sleep(self.period)
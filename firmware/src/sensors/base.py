@@ -1,6 +1,11 @@
 class BaseSensor:
     """Base class for all sensors to ensure a unified interface."""
 
+    # (metric, unit) pairs returned by read(), in a stable order
+    METRICS = ()
+    # Minimum number of seconds between two hardware measurements
+    MIN_INTERVAL = 0
+
     def __init__(self, pin_number, sensor_id):
         self.pin_number = pin_number
         self.sensor_id = sensor_id
@@ -11,3 +16,29 @@ class BaseSensor:
         Must return a dictionary of measurements.
         """
         raise NotImplementedError("Subclasses must implement read()")
+
+    async def read_async(self):
+        """
+        Event-loop friendly variant of read(), awaited by the firmware tasks.
+        The default suits sensors whose read() returns immediately; drivers
+        that wait between attempts must override it and await instead.
+        """
+        return self.read()
+
+    def measure_into(self, values, offset):
+        """
+        Write one value per METRICS entry into `values` from `offset`
+        instead of building a reading. Returns False when the measurement
+        failed. The default goes through read(); drivers override it so that
+        sampling allocates nothing.
+        """
+        reading = self.read()
+        if reading is None:
+            return False
+        for i in range(len(self.METRICS)):
+            values[offset + i] = reading[self.METRICS[i][0]]["value"]
+        return True
+
+    async def measure_into_async(self, values, offset):
+        """Event-loop friendly variant of measure_into(), used by the Sampler."""
+        return self.measure_into(values, offset)
@@ -1,8 +1,11 @@
+import asyncio
 import time
+from array import array
 
 import dht
 from machine import Pin
 
+from ..clock import ticks_diff, ticks_ms
 from .base import BaseSensor
 
 
@@ -12,35 +15,86 @@ class ClimateSensor(BaseSensor):
     Includes retry logic to handle common 'OSError: [Errno 110] ETIMEDOUT'.
     """
 
-    def __init__(self, pin_number, sensor_id):
+    METRICS = (("temperature", "celsius"), ("humidity", "percent"))
+    MIN_INTERVAL = 1  # The DHT11 tolerates about one measurement per second
+
+    def __init__(self, pin_number, sensor_id, retry_delay=2):
         super().__init__(pin_number, sensor_id)
         self.sensor = dht.DHT11(Pin(pin_number))
+        self.retry_delay = retry_delay
+        # Last valid measurement, as the driver returned it
+        self.temperature = None
+        self.humidity = None
+        self._values = array("f", (0.0, 0.0))  # For read() and read_async()
+
+    def _measure_into(self, values, offset):
+        """Single measurement attempt, raising OSError or ValueError on failure."""
+        self.sensor.measure()
+        temp = self.sensor.temperature()
+        hum = self.sensor.humidity()
+
+        # Validate temperature is a number
+        if not isinstance(temp, (int, float)):  # noqa: UP038
+            raise ValueError(f"Invalid temperature: {temp}")
+
+        # Validate humidity is between 0 and 100
+        if not isinstance(hum, (int, float)) or not (0 <= hum <= 100):  # noqa: UP038
+            raise ValueError(f"Invalid humidity: {hum}")
+
+        values[offset] = temp
+        values[offset + 1] = hum
+        self.temperature = temp
+        self.humidity = hum
+
+    def _reading(self):
+        return {
+            "temperature": {"value": self.temperature, "unit": "celsius"},
+            "humidity": {"value": self.humidity, "unit": "percent"},
+        }
 
     def read(self, retries=3):
         """
         Attempts to read temperature and humidity.
         Returns a tuple (temp, hum) or (None, None) if all retries fail.
+        Blocks between retries: use read_async() from the event loop.
         """
         for i in range(retries):
             try:
-                self.sensor.measure()
-                temp = self.sensor.temperature()
-                hum = self.sensor.humidity()
-
-                # Validate temperature is a number
-                if not isinstance(temp, (int, float)):  # noqa: UP038
-                    raise ValueError(f"Invalid temperature: {temp}")
-
-                # Validate humidity is between 0 and 100
-                if not isinstance(hum, (int, float)) or not (0 <= hum <= 100):  # noqa: UP038
-                    raise ValueError(f"Invalid humidity: {hum}")
-
-                return {
-                    "temperature": {"value": temp, "unit": "celsius"},
-                    "humidity": {"value": hum, "unit": "percent"},
-                }
+                self._measure_into(self._values, 0)
+                return self._reading()
             except (OSError, ValueError) as e:
                 print(f"DHT11 Error (attempt {i + 1}/{retries}): {e}")
-                time.sleep(2)
+                time.sleep(self.retry_delay)
 
         return None
+
+    async def read_async(self, retries=3, timeout=None):
+        """
+        Same as read(), but awaits between retries so other tasks keep running.
+        The loop is only held for the duration of a single measure() call.
+        `timeout` bounds the total time spent retrying, in seconds.
+        """
+        if await self.measure_into_async(self._values, 0, retries, timeout):
+            return self._reading()
+        return None
+
+    async def measure_into_async(self, values, offset, retries=3, timeout=None):
+        """read_async() writing into `values`; returns False if all retries fail."""
+        start = ticks_ms()
+        delay_ms = int(self.retry_delay * 1000)
+        for i in range(retries):
+            try:
+                self._measure_into(values, offset)
+                return True
+            except (OSError, ValueError) as e:
+                print(f"DHT11 Error (attempt {i + 1}/{retries}): {e}")
+
+            if i + 1 == retries:
+                break
+            if timeout is not None:
+                elapsed = ticks_diff(ticks_ms(), start)
+                if elapsed + delay_ms > timeout * 1000:
+                    break
+            await asyncio.sleep(self.retry_delay)
+
+        return False
@@ -1,4 +1,36 @@
-from .climate_sensor import ClimateSensor
-from .soil_sensor import SoilSensor
+# Sensor type -> (driver module, class name, required config keys).
+# Driver modules are imported the first time config.json uses their type,
+# so unused drivers and the hardware modules they pull in (dht, ADC) cost
+# neither boot time nor RAM.
+SENSOR_DRIVERS = {
+    "csmsv2": ("soil_sensor", "SoilSensor", ("calibration",)),
+    "dht11": ("climate_sensor", "ClimateSensor", ()),
+}
 
-SENSOR_CLASSES = {"csmsv2": SoilSensor, "dht11": ClimateSensor}
+# TODO: Find more elegant way to handle sensor-specific
+# parameters without hardcoding keys
+SENSOR_OPTIONS = ("calibration", "samples", "trim")
+
+_loaded = {}
+
+
+def load_driver(sensor_type):
+    """Import (once) and return the driver class of a sensor type."""
+    cls = _loaded.get(sensor_type)
+    if cls is None:
+        module_name, class_name, _ = SENSOR_DRIVERS[sensor_type]
+        package = __name__.rpartition(".")[0]
+        module = __import__(f"{package}.{module_name}", None, None, (class_name,))
+        cls = _loaded[sensor_type] = getattr(module, class_name)
+    return cls
+
+
+def build_sensor(item):
+    """Driver for one `sensors` entry of config.json, or None if unknown."""
+    if item["type"] not in SENSOR_DRIVERS:
+        return None
+    args = {"pin_number": item["pin"], "sensor_id": item["id"]}
+    for key in SENSOR_OPTIONS:
+        if key in item:
+            args[key] = item[key]
+    return load_driver(item["type"])(**args)
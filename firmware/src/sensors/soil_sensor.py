@@ -1,3 +1,5 @@
+from array import array
+
 from machine import ADC, Pin
 
 from .base import BaseSensor
@@ -7,59 +9,100 @@ class SoilSensor(BaseSensor):
     """
     Driver for the Capacitive Soil Moisture Sensor V2.0.
     Handles raw ADC readings and percentage conversion based on calibration.
+
+    Each reading takes `samples` ADC conversions into a preallocated array,
+    sorts them in place and averages what is left after dropping `trim`
+    samples at each end: trim=0 is a plain mean, trim=(samples - 1) // 2
+    the median. The calibration is turned into a slope and an offset once,
+    so a conversion is a single multiply-add.
     """
 
-    def __init__(self, pin_number, sensor_id, calibration):
+    METRICS = (("moisture", "percent"),)
+
+    def __init__(self, pin_number, sensor_id, calibration, samples=1, trim=0):
+        if samples < 1 or not 0 <= 2 * trim < samples:
+            raise ValueError(f"Invalid oversampling: {samples} samples, trim {trim}")
         try:
             super().__init__(pin_number, sensor_id)
             self.adc = ADC(Pin(pin_number))
-            self.calibration = calibration
         except (ValueError, OSError) as e:
             raise ValueError(f"Failed to initialize sensor on \
                              pin {pin_number}: {e}") from e
+        self.samples = samples
+        self.trim = trim
+        self._buffer = array("H", bytes(2 * samples))
+        self.set_calibration(calibration)
+
+    def set_calibration(self, calibration):
+        """Store the calibration and precompute the raw -> percent transform."""
+        self.calibration = calibration
+        dry = calibration["dry"]
+        wet = calibration["wet"]
+        self._low = min(wet, dry)
+        self._high = max(wet, dry)
+        if dry == wet:
+            self._slope = None
+        else:
+            self._slope = 100 / (wet - dry)
+            self._offset = -dry * self._slope
+
+    def _sample(self):
+        """Fill the buffer with ADC conversions and return the filtered value."""
+        buffer = self._buffer
+        n = self.samples
+        read_u16 = self.adc.read_u16
+        for i in range(n):
+            value = read_u16()
+            # Insertion sort while sampling: n is small and nothing allocates
+            j = i
+            while j > 0 and buffer[j - 1] > value:
+                buffer[j] = buffer[j - 1]
+                j -= 1
+            buffer[j] = value
+        if n == 1:
+            return buffer[0]
+        total = 0
+        for i in range(self.trim, n - self.trim):
+            total += buffer[i]
+        return total // (n - 2 * self.trim)
 
     def read_raw(self):
-        """Returns the raw 16-bit value (0-65535)."""
+        """Returns the filtered raw 16-bit value (0-65535)."""
         try:
-            raw_value = self.adc.read_u16()
-            if not (
-                min(self.calibration["wet"], self.calibration["dry"])
-                <= raw_value
-                <= max(self.calibration["wet"], self.calibration["dry"])
-            ):
-                raise ValueError(
-                    f"Raw value {raw_value} is outside calibration range [ \
-                    {min(self.calibration['wet'], self.calibration['dry'])}, \
-                    {max(self.calibration['wet'], self.calibration['dry'])}]"
-                )
-            return raw_value
+            raw_value = self._sample()
         except OSError as e:
             raise OSError(f"Failed to read ADC: {e}") from e
+        if not self._low <= raw_value <= self._high:
+            raise ValueError(
+                f"Raw value {raw_value} is outside calibration range "
+                f"[{self._low}, {self._high}]"
+            )
+        return raw_value
 
     def get_percentage_from_raw(self, raw_value):
         """
         Pure logic: Converts a raw ADC value to a percentage.
-        Formula: ((raw - dry) / (wet - dry)) * 100
+        Formula: ((raw - dry) / (wet - dry)) * 100, as slope * raw + offset
         """
         if not isinstance(raw_value, (int, float)):  # noqa: UP038
             raise TypeError(f"raw_value must be numeric, got {type(raw_value)}")
 
-        if self.calibration["dry"] == self.calibration["wet"]:
+        if self._slope is None:
             raise ValueError("Calibration error: dry and wet cannot be equal")
 
-        percentage = (
-            (raw_value - self.calibration["dry"])
-            / (self.calibration["wet"] - self.calibration["dry"])
-            * 100
-        )
-        percentage = max(0.0, min(100.0, round(percentage, 1)))
+        percentage = round(raw_value * self._slope + self._offset, 1)
+        return max(0.0, min(100.0, percentage))
 
-        return percentage
-
-    def read(self):
+    def percentage(self):
         """Hardware dependent: Reads from ADC and then converts."""
         try:
-            percentage = self.get_percentage_from_raw(self.read_raw())
-            return {"moisture": {"value": percentage, "unit": "percent"}}
+            return self.get_percentage_from_raw(self.read_raw())
         except (OSError, TypeError) as e:
             raise RuntimeError(f"Failed to read sensor percentage: {e}") from e
+
+    def read(self):
+        return {"moisture": {"value": self.percentage(), "unit": "percent"}}
+
+    def measure_into(self, values, offset):
+        values[offset] = self.percentage()
+        return True
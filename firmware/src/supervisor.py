@@ -0,0 +1,146 @@
+import asyncio
+from random import getrandbits
+
+from .clock import sync_epoch, ticks_add, ticks_diff, ticks_ms
+
+
+class ConnectionSupervisor:
+    """
+    Keeps Wi-Fi and MQTT connected, and measures how long recoveries take.
+
+    Both layers are checked every `check_ms`, so a lost link is noticed
+    within about a second. Wi-Fi is reconnected first (and the clock synced
+    again), then MQTT, with an exponential backoff between failed attempts:
+    `backoff_min` seconds doubling up to `backoff_max`, each delay jittered
+    between half and all of its value so that a fleet does not reconnect in
+    step after a broker restart. After `failover_after` failures in a row the
+    next broker configured in MqttManager is tried.
+
+    While connected, a PINGREQ is sent every `keepalive / 2` seconds; a
+    broker that sends nothing back within `ping_timeout` seconds is treated
+    as lost, which also catches half-open TCP connections.
+    """
+
+    def __init__(
+        self,
+        wifi_mgr,
+        mqtt_mgr,
+        check_ms=1000,
+        keepalive=60,
+        ping_timeout=5,
+        backoff_min=1,
+        backoff_max=60,
+        failover_after=3,
+        on_connect=None,
+    ):
+        self.wifi = wifi_mgr
+        self.mqtt = mqtt_mgr
+        self.check_ms = check_ms
+        self.ping_interval_ms = keepalive * 500
+        self.ping_timeout_ms = ping_timeout * 1000
+        self.backoff_min_ms = backoff_min * 1000
+        self.backoff_max_ms = backoff_max * 1000
+        self.failover_after = failover_after
+        self.on_connect = on_connect  # Coroutine function, run after a reconnect
+
+        self.failures = 0  # Failed MQTT attempts since the last success
+        self.retry_at = None  # ticks_ms of the next MQTT attempt
+        self.ping_sent = ticks_ms()
+        self.awaiting_pong = False
+        self.down_since = None  # ticks_ms when the link was lost
+
+        self.wifi_reconnects = 0
+        self.mqtt_reconnects = 0
+        self.failovers = 0
+        self.last_recovery_ms = None
+        self.max_recovery_ms = 0
+        self.total_down_ms = 0
+
+    def backoff_ms(self):
+        """Jittered delay before the next attempt, after `failures` failures."""
+        doubling = min(self.failures - 1, 16)
+        delay = min(self.backoff_min_ms << doubling, self.backoff_max_ms)
+        return delay // 2 + (delay // 2) * getrandbits(10) // 1024
+
+    def _lost(self, now, what):
+        if self.down_since is None:
+            self.down_since = now
+            print(f"Supervisor: {what} lost")
+
+    def _recovered(self, now):
+        down = ticks_diff(now, self.down_since)
+        self.down_since = None
+        self.last_recovery_ms = down
+        self.max_recovery_ms = max(self.max_recovery_ms, down)
+        self.total_down_ms += down
+        print(f"Supervisor: link recovered in {down} ms")
+
+    async def _reconnect_wifi(self, now):
+        self._lost(now, "Wi-Fi")
+        if self.mqtt.connected:
+            self.mqtt.drop()  # The socket did not survive the link
+        if await self.wifi.connect():
+            self.wifi_reconnects += 1
+            self.retry_at = None  # MQTT right away, not after a stale backoff
+            # The clock is synced again, it may have drifted meanwhile
+            sync_epoch()
+
+    async def _reconnect_mqtt(self, now):
+        self._lost(now, "MQTT")
+        if self.retry_at is not None and ticks_diff(now, self.retry_at) < 0:
+            return
+        if await self.mqtt.connect():
+            self.failures = 0
+            self.retry_at = None
+            self.mqtt_reconnects += 1
+            self.ping_sent = ticks_ms()
+            self.awaiting_pong = False
+            self._recovered(ticks_ms())
+            if self.on_connect is not None:
+                await self.on_connect()
+            return
+        self.failures += 1
+        if self.failures % self.failover_after == 0 and self.mqtt.use_next_broker():
+            self.failovers += 1
+        self.retry_at = ticks_add(ticks_ms(), self.backoff_ms())
+
+    async def _keepalive(self, now):
+        if self.awaiting_pong:
+            if ticks_diff(self.mqtt.last_rx, self.ping_sent) >= 0:
+                self.awaiting_pong = False
+            elif ticks_diff(now, self.ping_sent) >= self.ping_timeout_ms:
+                print("Supervisor: broker not answering")
+                self.mqtt.drop()
+        elif ticks_diff(now, self.ping_sent) >= self.ping_interval_ms:
+            self.ping_sent = now
+            self.awaiting_pong = True
+            await self.mqtt.ping()
+
+    async def check(self):
+        """One supervision step."""
+        now = ticks_ms()
+        if not self.wifi.wlan.isconnected():
+            await self._reconnect_wifi(now)
+        elif not self.mqtt.connected:
+            await self._reconnect_mqtt(now)
+        else:
+            await self._keepalive(now)
+
+    async def run(self):
+        """Background task supervising both layers."""
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_ms / 1000)
+
+    def document(self):
+        """Reconnection counters and recovery times, for the metrics report."""
+        return {
+            "wifi_reconnects": self.wifi_reconnects,
+            "mqtt_reconnects": self.mqtt_reconnects,
+            "failovers": self.failovers,
+            "broker": self.mqtt.broker_ip,
+            "connected": self.down_since is None,
+            "last_recovery_ms": self.last_recovery_ms,
+            "max_recovery_ms": self.max_recovery_ms,
+            "total_down_ms": self.total_down_ms,
+        }
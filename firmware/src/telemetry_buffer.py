@@ -0,0 +1,285 @@
+import time
+from array import array
+
+from .clock import ticks_add, ticks_diff, ticks_ms
+
+# Source name used for actuator fields, mirroring the "actuators" key
+# of the single-message telemetry payload.
+ACTUATORS_SOURCE = "actuators"
+
+NAN = float("nan")  # Failed reading
+# Not sent again by the DeadbandFilter; "=" in JSON rows
+UNCHANGED = float("inf")
+UNCHANGED_JSON = "="
+
+
+def build_fields(sensors, actuators):
+    """
+    List the (source, metric, unit) columns of a telemetry sample.
+    Sensors contribute one column per declared metric, actuators one
+    "state" column each (1.0 for ON, 0.0 for OFF).
+    """
+    fields = []
+    for sensor_id, sensor in sensors.items():
+        for metric, unit in sensor.METRICS:
+            fields.append((sensor_id, metric, unit))
+    for actuator_id in actuators:
+        fields.append((ACTUATORS_SOURCE, actuator_id, None))
+    return fields
+
+
+def fill_values(fields, payload, values, offset):
+    """
+    Write the values of a telemetry payload ({sensor_id: reading,
+    "actuators": {...}}) into `values` starting at `offset`, one per field.
+    Missing readings are stored as NaN.
+    """
+    actuators = payload.get(ACTUATORS_SOURCE) or {}
+    for i, (source, metric, _) in enumerate(fields):
+        if source == ACTUATORS_SOURCE:
+            state = actuators.get(metric)
+            value = NAN if state is None else (1.0 if state == "ON" else 0.0)
+        else:
+            reading = payload.get(source)
+            value = NAN
+            if reading and metric in reading:
+                value = reading[metric]["value"]
+        values[offset + i] = value
+
+
+class TelemetryFrame:
+    """
+    The current telemetry sample as a preallocated array laid out like
+    `fields`, copied from the Sampler's store and the actuator states by
+    update() without building a payload. `sensors` provides the metric
+    layout, the sampler the offsets at the time of the update.
+    """
+
+    def __init__(self, fields, sensors, actuators, sampler):
+        width = len(fields)
+        self.sampler = sampler
+        self.values = array("f", (NAN for _ in range(width)))
+        self.sources = []  # sensor_id per field, None for actuators
+        self.actuators = []  # Actuator per field, None for sensors
+        self.columns = bytearray(width)  # Position of the metric in its sensor
+        for i, (source, metric, _) in enumerate(fields):
+            if source == ACTUATORS_SOURCE:
+                self.sources.append(None)
+                self.actuators.append(actuators[metric])
+            else:
+                metrics = [m for m, _ in sensors[source].METRICS]
+                self.columns[i] = metrics.index(metric)
+                self.sources.append(source)
+                self.actuators.append(None)
+
+    def update(self):
+        """Refill and return `values` (NaN for failed readings)."""
+        store = self.sampler.store
+        offsets = self.sampler.offsets
+        values = self.values
+        for i in range(len(values)):
+            actuator = self.actuators[i]
+            if actuator is None:
+                values[i] = store[offsets[self.sources[i]] + self.columns[i]]
+            else:
+                values[i] = 1.0 if actuator.is_on() else 0.0
+        return values
+
+
+def sample_row(stamp, values, offset, width):
+    """Build the JSON row [stamp, v1, v2, ...] of a stored sample."""
+    row = [stamp]
+    for i in range(width):
+        value = values[offset + i]
+        # NaN and infinity are not valid JSON;
+        # rounding hides float32 noise (42.1 -> 42.099998)
+        if value != value:
+            row.append(None)
+        elif value == UNCHANGED:
+            row.append(UNCHANGED_JSON)
+        else:
+            row.append(round(value, 2))
+    return row
+
+
+def batch_document(fields, samples):
+    """
+    Wrap sample rows into the batched telemetry document. `now` is the
+    device time at flush so the gateway can place samples even without
+    a synced clock.
+    """
+    return {
+        "fields": [list(field) for field in fields],
+        "samples": samples,
+        "now": int(time.time()),
+    }
+
+
+class SampleRing:
+    """
+    Fixed-size ring of timestamped samples backed by preallocated arrays.
+    When full, the oldest sample is overwritten.
+    """
+
+    def __init__(self, width, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.width = width
+        self.capacity = capacity
+        self.stamps = array("L", (0 for _ in range(capacity)))
+        self.values = array("f", (0.0 for _ in range(width * capacity)))
+        self.head = 0  # Index of the next slot to write
+        self.count = 0
+        self.overwritten = 0
+
+    def __len__(self):
+        return self.count
+
+    def next_slot(self, stamp):
+        """Claim the next slot, returning the offset of its first value."""
+        slot = self.head
+        self.stamps[slot] = stamp
+        self.head = (slot + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.overwritten += 1
+        return slot * self.width
+
+    def slots(self):
+        """Yield (stamp, offset) pairs from oldest to newest."""
+        start = (self.head - self.count) % self.capacity
+        for i in range(self.count):
+            slot = (start + i) % self.capacity
+            yield self.stamps[slot], slot * self.width
+
+    def clear(self):
+        self.count = 0
+
+
+class DeadbandFilter:
+    """
+    Report-by-exception: a field of a sample is kept only when it moved by
+    more than its deadband since it was last reported, or when it has not
+    been reported for `heartbeat` seconds. Other fields are replaced by
+    UNCHANGED, for which the gateway keeps the last value. A failed reading
+    stays NaN, so that the gateway forgets the last value; it makes the
+    sample worth sending when the reading just failed, or at the heartbeat.
+
+    `deadbands` maps sensor_id -> {metric: deadband}; fields without one
+    (and actuator states) are reported on any change.
+    """
+
+    def __init__(self, fields, deadbands, heartbeat):
+        width = len(fields)
+        self.bands = array("f", (0.0 for _ in range(width)))
+        for i, (source, metric, _) in enumerate(fields):
+            self.bands[i] = deadbands.get(source, {}).get(metric, 0)
+        self.heartbeat_ms = int(heartbeat * 1000)
+        self.last = array("f", (NAN for _ in range(width)))
+        # ticks_ms of the last report; a first failed reading is reported too
+        self.reported = [ticks_add(ticks_ms(), -self.heartbeat_ms)] * width
+        self.suppressed = 0
+
+    def apply(self, values, offset):
+        """Filter one sample in place, returning the number of fields kept."""
+        now = ticks_ms()
+        last = self.last
+        kept = 0
+        for i in range(len(last)):
+            value = values[offset + i]
+            previous = last[i]
+            if value != value:
+                # The next good reading is reported whatever its value
+                if previous == previous or (
+                    ticks_diff(now, self.reported[i]) >= self.heartbeat_ms
+                ):
+                    last[i] = NAN
+                    self.reported[i] = now
+                    kept += 1
+                continue
+            if (
+                previous != previous
+                or abs(value - previous) > self.bands[i]
+                or ticks_diff(now, self.reported[i]) >= self.heartbeat_ms
+            ):
+                last[i] = value
+                self.reported[i] = now
+                kept += 1
+            else:
+                values[offset + i] = UNCHANGED
+                self.suppressed += 1
+        return kept
+
+
+class TelemetryBatcher:
+    """
+    Accumulates telemetry samples and decides when to flush them as one
+    batch: after `batch_size` samples or `flush_interval` seconds since the
+    first pending sample, whichever comes first. With a DeadbandFilter,
+    samples in which nothing changed are not stored at all.
+    """
+
+    def __init__(self, fields, batch_size, flush_interval, deadband=None):
+        self.fields = fields
+        self.batch_size = batch_size
+        self.flush_interval_ms = int(flush_interval * 1000)
+        # Extra room so samples survive a few missed flushes before wrapping
+        self.ring = SampleRing(len(fields), batch_size * 2)
+        self.first_tick = None
+        self.deadband = deadband
+        self._scratch = array("f", (0.0 for _ in range(len(fields))))
+
+    def add(self, payload, stamp=None):
+        """
+        Store a telemetry payload ({sensor_id: reading, "actuators": {...}}).
+        Returns False if the deadband filter left nothing worth sending.
+        """
+        fill_values(self.fields, payload, self._scratch, 0)
+        return self.add_values(self._scratch, 0, stamp)
+
+    def add_values(self, values, offset, stamp=None):
+        """
+        Store a sample laid out like `fields` from `offset` in `values`,
+        e.g. a TelemetryFrame's. The deadband filter works in place, so the
+        values may be modified. Returns False if nothing was worth sending.
+        """
+        if stamp is None:
+            stamp = int(time.time())
+        if self.deadband is not None and not self.deadband.apply(values, offset):
+            return False
+        ring_offset = self.ring.next_slot(stamp)
+        ring = self.ring.values
+        for i in range(self.ring.width):
+            ring[ring_offset + i] = values[offset + i]
+        if self.first_tick is None:
+            self.first_tick = ticks_ms()
+        return True
+
+    def due(self):
+        if not self.ring.count:
+            return False
+        if self.ring.count >= self.batch_size:
+            return True
+        return ticks_diff(ticks_ms(), self.first_tick) >= self.flush_interval_ms
+
+    def rows(self):
+        """Yield pending samples as (stamp, values, offset), oldest first."""
+        for stamp, offset in self.ring.slots():
+            yield stamp, self.ring.values, offset
+
+    def to_payload(self):
+        """Build the batched JSON telemetry document of all pending samples."""
+        width = self.ring.width
+        samples = [sample_row(stamp, v, off, width) for stamp, v, off in self.rows()]
+        return batch_document(self.fields, samples)
+
+    def spill(self, backlog):
+        """Move all pending samples to a FlashBacklog and clear the ring."""
+        for stamp, offset in self.ring.slots():
+            backlog.append_row(stamp, self.ring.values, offset)
+        self.clear()
+
+    def clear(self):
+        self.ring.clear()
+        self.first_tick = None
@@ -0,0 +1,114 @@
+from .codec import CODECS
+from .config_culture import CULTURES, LOWER, RAISE
+from .sensors.sensor_classes import SENSOR_DRIVERS
+
+
+def _check_items(config, section, required, errors, pins):
+    """Entries of a section that have the required keys. Pins are global."""
+    items = config.get(section, [])
+    if not isinstance(items, list):
+        errors.append(f"{section}: expected a list")
+        return []
+    ids = set()
+    valid = []
+    for index, item in enumerate(items):
+        missing = [key for key in required if key not in item]
+        if missing:
+            errors.append(f"{section}[{index}]: missing {', '.join(missing)}")
+            continue
+        if item["id"] in ids:
+            errors.append(f"{section}[{index}]: duplicate id {item['id']}")
+        if item["pin"] in pins:
+            errors.append(
+                f"{section}[{index}]: pin {item['pin']} already used by "
+                f"{pins[item['pin']]}"
+            )
+        ids.add(item["id"])
+        pins[item["pin"]] = item["id"]
+        valid.append(item)
+    return valid
+
+
+def validate_config(config, actuator_actions):
+    """
+    Check config.json before anything is instantiated. Returns a list of
+    error messages, empty when the configuration can be built. Only the
+    driver registry is consulted, no driver module is imported.
+    """
+    errors = []
+    if not isinstance(config.get("client_id"), str) or not config["client_id"]:
+        errors.append("client_id: expected a non-empty string")
+
+    version = config.get("version", 0)
+    if not isinstance(version, int) or isinstance(version, bool):
+        errors.append("version: expected an integer")
+
+    pins = {}
+    sensors = _check_items(config, "sensors", ("id", "type", "pin"), errors, pins)
+    for item in sensors:
+        driver = SENSOR_DRIVERS.get(item["type"])
+        if driver is None:
+            errors.append(f"sensor {item['id']}: unknown type {item['type']}")
+            continue
+        for key in driver[2]:
+            if key not in item:
+                errors.append(f"sensor {item['id']}: missing {key}")
+        # A reload applies it to the running driver, where it must not fail
+        if "calibration" in item and not _is_calibration(item["calibration"]):
+            errors.append(f"sensor {item['id']}: calibration needs numeric dry, wet")
+
+    actuators = _check_items(config, "actuators", ("id", "pin"), errors, pins)
+    actuator_ids = {item["id"] for item in actuators}
+    buttons = _check_items(config, "buttons", ("id", "pin", "target"), errors, pins)
+    for item in buttons:
+        if item["target"] not in actuator_ids:
+            errors.append(f"button {item['id']}: unknown target {item['target']}")
+        for action in item.get("actions", {}).values():
+            if action not in actuator_actions:
+                errors.append(f"button {item['id']}: unknown action {action}")
+
+    encoding = config.get("telemetry", {}).get("encoding", "json")
+    if encoding not in CODECS:
+        errors.append(f"telemetry: unknown encoding {encoding}")
+
+    _check_control(config, {item["id"] for item in sensors}, actuator_ids, errors)
+    return errors
+
+
+def _is_calibration(calibration):
+    return isinstance(calibration, dict) and all(
+        isinstance(calibration.get(key), (int, float))  # noqa: UP038
+        for key in ("dry", "wet")
+    )
+
+
+def _check_control(config, sensor_ids, actuator_ids, errors):
+    control = config.get("control")
+    if not control:
+        return
+    culture = control.get("culture")
+    if culture is not None and culture not in CULTURES:
+        errors.append(f"control: unknown culture {culture}")
+    bands = CULTURES.get(culture, {})
+    controlled = set()
+    for index, rule in enumerate(control.get("rules", [])):
+        where = f"control.rules[{index}]"
+        missing = [key for key in ("sensor", "metric", "actuator") if key not in rule]
+        if missing:
+            errors.append(f"{where}: missing {', '.join(missing)}")
+            continue
+        if rule["sensor"] not in sensor_ids:
+            errors.append(f"{where}: unknown sensor {rule['sensor']}")
+        if rule["actuator"] not in actuator_ids:
+            errors.append(f"{where}: unknown actuator {rule['actuator']}")
+        elif rule["actuator"] in controlled:
+            errors.append(f"{where}: {rule['actuator']} already has a rule")
+        controlled.add(rule["actuator"])
+        if rule.get("action", RAISE) not in (RAISE, LOWER):
+            errors.append(f"{where}: unknown action {rule['action']}")
+        low, high = bands.get(rule["metric"], (None, None))
+        low, high = rule.get("low", low), rule.get("high", high)
+        if low is None or high is None:
+            errors.append(f"{where}: no band for {rule['metric']}")
+        elif low >= high:
+            errors.append(f"{where}: low must be below high")
@@ -0,0 +1,151 @@
+"""Size- and time-bounded batching of points in front of a sink."""
+
+import threading
+import time
+
+
+class BatchWriter:
+    """
+    Buffers points and hands them to a sink in batches.
+
+    A batch is flushed as soon as `max_points` are pending, or `max_delay`
+    seconds after its first point arrived, whichever comes first. Writes
+    happen on a dedicated thread so the MQTT network loop never waits on
+    the sink. If the sink fails with one of its TRANSIENT_ERRORS, the batch is
+    kept and retried with the next one, up to `max_pending` points; beyond
+    that the oldest points are dropped. A batch failing with any other error
+    would fail forever and block the ones behind it, so it is dropped.
+    """
+
+    def __init__(
+        self,
+        sink,
+        max_points=500,
+        max_delay=5.0,
+        max_pending=50_000,
+        clock=time.monotonic,
+    ):
+        if max_points <= 0 or max_delay <= 0:
+            raise ValueError("max_points and max_delay must be positive")
+        self.sink = sink
+        self.max_points = max_points
+        self.max_delay = max_delay
+        self.max_pending = max(max_pending, max_points)
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._first_at = None
+        self._closed = False
+        self._thread = None
+
+        # Counters for monitoring the ingestion path
+        self.batches_written = 0
+        self.points_written = 0
+        self.points_dropped = 0
+        self.write_errors = 0
+
+    def add(self, points):
+        """Queue points for writing. Safe to call from any thread."""
+        if not points:
+            return
+        with self._cond:
+            if self._first_at is None:
+                self._first_at = self.clock()
+            self._pending.extend(points)
+            self._trim()
+            if len(self._pending) >= self.max_points:
+                self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _trim(self):
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.points_dropped += overflow
+
+    def _due(self):
+        if len(self._pending) >= self.max_points:
+            return True
+        return bool(self._pending) and (self.clock() - self._first_at >= self.max_delay)
+
+    def _take_batch(self):
+        batch = self._pending[: self.max_points]
+        del self._pending[: self.max_points]
+        # Leftover points start a new batch window
+        self._first_at = self.clock() if self._pending else None
+        return batch
+
+    def _write(self, batch):
+        try:
+            self.sink.write(batch)
+        except Exception as e:
+            print(f"Sink write failed ({len(batch)} points): {e}")
+            self.write_errors += 1
+            if not isinstance(e, self.sink.TRANSIENT_ERRORS):
+                with self._cond:
+                    self.points_dropped += len(batch)
+                return True  # Not the sink's fault: no need to back off
+            with self._cond:
+                self._pending[:0] = batch
+                if self._first_at is None:
+                    self._first_at = self.clock()
+                self._trim()
+            return False
+        self.batches_written += 1
+        self.points_written += len(batch)
+        return True
+
+    def flush(self):
+        """Synchronously write everything that is pending."""
+        while True:
+            with self._cond:
+                if not self._pending:
+                    return
+                batch = self._take_batch()
+            if not self._write(batch):
+                return
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    if self._pending:
+                        timeout = self.max_delay - (self.clock() - self._first_at)
+                        self._cond.wait(max(timeout, 0))
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    break
+                batch = self._take_batch()
+
+            if not self._write(batch):
+                # Back off instead of hammering a failing sink
+                with self._cond:
+                    self._cond.wait(self.max_delay)
+
+        self.flush()
+
+    def start(self):
+        """Start the background writer thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="batch-writer", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def close(self):
+        """Stop the writer thread, flush what is left and close the sink."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self.flush()
+        self.sink.close()
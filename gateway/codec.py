@@ -0,0 +1,113 @@
+"""
+Decoder for the compact binary telemetry encoding of the firmware
+(see firmware/src/codec.py).
+
+A binary message is a `<BBIHIIQ` header (magic, version, schema_id, count,
+device time, sequence number, publish time in epoch ms) followed by `count`
+records of one `<I` stamp and one `<f` value per field. Version 1 headers
+stop after the device time. Field names come from the retained
+`<client_id>/schema` announcement, registered in a SchemaRegistry.
+"""
+
+import math
+import struct
+
+MAGIC = 0xB7
+# version -> header layout
+HEADERS = {1: struct.Struct("<BBIHI"), 2: struct.Struct("<BBIHIIQ")}
+# Value not sent again by a device reporting by exception (infinity in
+# binary records, "=" in JSON rows); a failed reading is NaN, or null
+UNCHANGED = "="
+
+
+def _row_value(value):
+    if math.isnan(value):
+        return None
+    if value == math.inf:
+        return UNCHANGED
+    return round(value, 2)
+
+
+def schema_id(fields) -> int:
+    """32-bit FNV-1a hash of the field layout, identical to the firmware's."""
+    h = 0x811C9DC5
+    for source, metric, unit in fields:
+        for byte in f"{source}/{metric}/{unit or ''};".encode():
+            h = ((h ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return h
+
+
+def is_field(field) -> bool:
+    """A [source, metric, unit] triple of strings whose unit may be None."""
+    return (
+        isinstance(field, list | tuple)
+        and len(field) == 3
+        and isinstance(field[0], str)
+        and isinstance(field[1], str)
+        and (field[2] is None or isinstance(field[2], str))
+    )
+
+
+def is_binary(payload: bytes) -> bool:
+    return bool(payload) and payload[0] == MAGIC
+
+
+class SchemaRegistry:
+    """Field layouts announced by each device, keyed by schema id."""
+
+    def __init__(self):
+        self._schemas: dict[str, dict[int, list]] = {}
+
+    def register(self, device: str, document: dict) -> int:
+        """
+        Store an announced layout under its id. Raises ValueError when the
+        fields are not [source, metric, unit] triples or the id does not match.
+        """
+        fields = document["fields"]
+        if not isinstance(fields, list) or not all(map(is_field, fields)):
+            raise ValueError(f"Invalid schema fields for {device}")
+        fields = [tuple(field) for field in fields]
+        announced = document.get("id")
+        computed = schema_id(fields)
+        if announced is not None and announced != computed:
+            raise ValueError(
+                f"Schema id mismatch for {device}: {announced} != {computed}"
+            )
+        self._schemas.setdefault(device, {})[computed] = fields
+        return computed
+
+    def get(self, device: str, schema: int):
+        return self._schemas.get(device, {}).get(schema)
+
+
+def decode_binary(device: str, payload: bytes, registry: SchemaRegistry) -> dict:
+    """
+    Decode a binary message into the batched telemetry document
+    `{"fields": [...], "samples": [[stamp, v1, ...]], "now": device_time}`,
+    plus the "seq" and "ts" of the publish for version 2 messages.
+    """
+    if len(payload) < 2:
+        raise ValueError(f"Binary payload too short: {len(payload)} bytes")
+    header = HEADERS.get(payload[1])
+    if payload[0] != MAGIC or header is None:
+        raise ValueError(f"Unsupported binary telemetry version {payload[1]}")
+    if len(payload) < header.size:
+        raise ValueError(f"Binary payload too short: {len(payload)} bytes")
+    _, version, schema, count, now, *stamp = header.unpack_from(payload)
+
+    fields = registry.get(device, schema)
+    if fields is None:
+        raise ValueError(f"Unknown schema {schema:#010x} for {device}")
+
+    record = struct.Struct(f"<I{len(fields)}f")
+    expected = header.size + count * record.size
+    if len(payload) != expected:
+        raise ValueError(f"Binary payload is {len(payload)} bytes, expected {expected}")
+
+    samples = []
+    for sample_stamp, *values in record.iter_unpack(memoryview(payload)[header.size :]):
+        samples.append([sample_stamp] + [_row_value(v) for v in values])
+    document = {"fields": fields, "samples": samples, "now": now}
+    if stamp:
+        document["seq"], document["ts"] = stamp
+    return document
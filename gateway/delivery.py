@@ -0,0 +1,159 @@
+"""
+Delivery quality of each device stream: loss, reordering and latency.
+
+Devices number the messages of each topic and stamp them with their
+NTP-synced publish time (see MqttManager.publish). Per `(device, channel)`
+stream, a bitmap of the last WINDOW sequence numbers tells a late message
+(counted as lost when the gap was seen, then as reordered) from a duplicate.
+A sequence number that goes back with a newer publish time than the highest
+one is a device restart, even when its first messages were lost, and
+latencies go into a streaming quantile sketch whose memory depends on
+the range of values, not on their number.
+"""
+
+import math
+import threading
+from dataclasses import dataclass, field
+
+# Sequence numbers further back than this are taken as a device restart
+WINDOW = 64
+
+
+class QuantileSketch:
+    """
+    Streaming quantiles with relative accuracy `alpha` (log-spaced buckets,
+    as in DDSketch). Values up to `min_value` share a single bucket.
+    """
+
+    def __init__(self, alpha=0.01, min_value=1e-3):
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.buckets: dict[int, int] = {}
+        self.low = 0  # Values <= min_value, clock skew included
+        self.count = 0
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        if self.max is None or value > self.max:
+            self.max = value
+        if value <= self.min_value:
+            self.low += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def quantile(self, q):
+        """Value at quantile `q` (0..1), or None when empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.low
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Middle of the bucket, within alpha of every value in it
+                return min(2 * self.gamma**index / (self.gamma + 1), self.max)
+        return self.max
+
+    def merge(self, other):
+        """Add the values of a sketch with the same `alpha`."""
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.low += other.low
+        self.count += other.count
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+
+@dataclass(slots=True)
+class StreamStats:
+    received: int = 0
+    lost: int = 0  # Gaps not filled (yet) by a late message
+    reordered: int = 0
+    duplicates: int = 0
+    restarts: int = 0
+    highest: int = -1
+    highest_ts: int = 0  # Publish time of `highest`, 0 when unknown
+    seen: int = 0  # Bit n set: highest - n was received
+    latency_ms: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def observe(self, seq, ts_ms=0):
+        self.received += 1
+        if self.highest < 0:
+            self._restart(seq, ts_ms)
+        elif seq > self.highest:
+            gap = seq - self.highest
+            self.lost += gap - 1
+            self.seen = (self.seen << gap | 1) & ((1 << WINDOW) - 1)
+            self.highest = seq
+            self.highest_ts = ts_ms
+        elif seq == 0 < self.highest or seq <= self.highest - WINDOW:
+            self._restart(seq, ts_ms)
+        else:
+            bit = 1 << (self.highest - seq)
+            if seq < self.highest and ts_ms and ts_ms > self.highest_ts > 0:
+                # Late messages and duplicates were published before `highest`
+                self._restart(seq, ts_ms)
+            elif self.seen & bit:
+                # Also a retried publish: it keeps its seq, with a newer ts
+                self.duplicates += 1
+            else:
+                self.seen |= bit
+                self.lost -= 1
+                self.reordered += 1
+
+    def _restart(self, seq, ts_ms):
+        if self.highest >= 0:
+            self.restarts += 1
+            self.lost += seq  # Sent since the restart, not received (yet)
+        self.highest = seq
+        self.highest_ts = ts_ms
+        self.seen = 1
+
+
+class DeliveryTracker:
+    """Thread-safe delivery statistics of every `(device, channel)` stream."""
+
+    def __init__(self):
+        self.streams: dict[tuple[str, str], StreamStats] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, device, channel, seq, ts_ms, received_ns):
+        """
+        Record one message. `ts_ms` is its publish time in epoch ms (0 when
+        the device clock is not synced, and then no latency is recorded).
+        """
+        with self._lock:
+            stats = self.streams.get((device, channel))
+            if stats is None:
+                stats = self.streams[(device, channel)] = StreamStats()
+            stats.observe(seq, ts_ms)
+            if ts_ms:
+                stats.latency_ms.add(received_ns / 1_000_000 - ts_ms)
+
+    def summary(self, device=None):
+        """
+        Totals over the streams of `device` (all devices by default), with
+        latency p50/p95/p99 in milliseconds.
+        """
+        totals = dict.fromkeys(
+            ("received", "lost", "reordered", "duplicates", "restarts"), 0
+        )
+        latency = QuantileSketch()
+        with self._lock:
+            for (stream_device, _), stats in self.streams.items():
+                if device is not None and stream_device != device:
+                    continue
+                for key in totals:
+                    totals[key] += getattr(stats, key)
+                latency.merge(stats.latency_ms)
+        expected = totals["received"] - totals["duplicates"] + totals["lost"]
+        totals["loss"] = totals["lost"] / expected if expected else 0.0
+        for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            totals[name] = latency.quantile(q)
+        totals["max_ms"] = latency.max
+        return totals
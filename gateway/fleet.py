@@ -0,0 +1,119 @@
+"""
+Fleet-wide device state for the gateway.
+
+One compact record per device (last value of each metric, last-seen time,
+online flag), updated in O(1) per message. Offline detection uses a heap of
+deadlines with lazy rescheduling: a device has at most one entry, and an
+entry that expires while the device was seen in the meantime is pushed back
+with its new deadline. Expiry therefore never scans the fleet, and its cost
+does not grow with the message rate.
+"""
+
+import heapq
+import threading
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class DeviceState:
+    device: str
+    last_seen: float
+    online: bool = True
+    messages: int = 0
+    values: dict = field(default_factory=dict)  # (source, metric) -> value
+
+
+class FleetState:
+    """
+    Thread-safe per-device state table fed with decoded points.
+
+    `on_change(device, online)` is called when a device is first seen, comes
+    back, or has not been seen for `offline_after` seconds.
+    """
+
+    def __init__(self, offline_after=300.0, clock=time.monotonic, on_change=None):
+        if offline_after <= 0:
+            raise ValueError("offline_after must be positive")
+        self.offline_after = offline_after
+        self.clock = clock
+        self.on_change = on_change
+        self.devices: dict[str, DeviceState] = {}
+        self.online = 0
+        self._deadlines: list[tuple[float, str]] = []
+        # (source, metric) keys shared by every device instead of one tuple each
+        self._keys: dict[tuple[str, str], tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.devices)
+
+    def get(self, device):
+        return self.devices.get(device)
+
+    def snapshot(self, device):
+        """
+        Last known value of every metric of a device. Devices reporting by
+        exception only send what changed, so this is their full state; a
+        metric whose reading failed is left out until it is read again.
+        """
+        with self._lock:
+            state = self.devices.get(device)
+            return None if state is None else dict(state.values)
+
+    def _notify(self, device, online):
+        if self.on_change is not None:
+            self.on_change(device, online)
+
+    def observe(self, points, now=None):
+        """Record the points of one message (all from the same device)."""
+        if not points:
+            return
+        now = self.clock() if now is None else now
+        device = points[0].device
+        with self._lock:
+            state = self.devices.get(device)
+            if state is None:
+                state = self.devices[device] = DeviceState(device, now)
+                self._came_online(device, now)
+            else:
+                state.last_seen = now
+                if not state.online:
+                    state.online = True
+                    self._came_online(device, now)
+
+            state.messages += 1
+            values = state.values
+            keys = self._keys
+            # Batches are chronological, so the newest sample of a metric wins
+            for point in points:
+                key = (point.source, point.metric)
+                if point.value is None:
+                    values.pop(key, None)  # Failed: no known value anymore
+                else:
+                    values[keys.setdefault(key, key)] = point.value
+
+    def _came_online(self, device, now):
+        self.online += 1
+        # Offline devices have no heap entry, so this is the only one
+        heapq.heappush(self._deadlines, (now + self.offline_after, device))
+        self._notify(device, True)
+
+    def expire(self, now=None):
+        """Mark devices silent for `offline_after` as offline and return them."""
+        now = self.clock() if now is None else now
+        deadlines = self._deadlines
+        offline = []
+        with self._lock:
+            while deadlines and deadlines[0][0] <= now:
+                _, device = heapq.heappop(deadlines)
+                state = self.devices[device]
+                due = state.last_seen + self.offline_after
+                if due > now:
+                    heapq.heappush(deadlines, (due, device))
+                    continue
+                state.online = False
+                self.online -= 1
+                offline.append(device)
+                self._notify(device, False)
+        return offline
@@ -0,0 +1,161 @@
+"""
+Telemetry ingestion daemon.
+
+Subscribes to every device's `<client_id>/telemetry` and `<client_id>/data`
+topics, flattens payloads into points and writes them in batches to InfluxDB
+(or to a local SQLite file when no InfluxDB is configured). The fleet table
+tracks which devices are online, the delivery tracker how many of their
+messages are lost, reordered or late. With INGEST_RULES_PATH set, the points
+also feed the rules engine, which sends actuator commands back to devices.
+
+Run with: python -m gateway.ingest
+"""
+
+import os
+import time
+from pathlib import Path
+
+from gateway.batching import BatchWriter
+from gateway.codec import SchemaRegistry
+from gateway.delivery import DeliveryTracker
+from gateway.fleet import FleetState
+from gateway.rules import load_rules
+from gateway.sinks import InfluxLineSink, SQLiteSink
+from gateway.telemetry import CHANNELS, decode_message, readings
+
+SUBSCRIPTIONS = [f"+/{channel}" for channel in CHANNELS]
+
+
+class IngestService:
+    """Bridges MQTT callbacks to the batch writer."""
+
+    def __init__(self, writer, clock_ns=time.time_ns, fleet=None, rules=None):
+        self.writer = writer
+        self.clock_ns = clock_ns
+        self.schemas = SchemaRegistry()
+        if fleet is None:
+            fleet = FleetState(on_change=self.on_device_status)
+        self.fleet = fleet
+        self.rules = rules
+        self.delivery = DeliveryTracker()
+        self.messages = 0
+        self.rejected = 0
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            print(f"Connected to broker, subscribing to {SUBSCRIPTIONS}")
+            client.subscribe([(topic, 0) for topic in SUBSCRIPTIONS])
+        else:
+            print(f"Connection failed with code {rc}")
+
+    def on_message(self, client, userdata, msg):
+        self.handle(msg.topic, msg.payload)
+
+    def handle(self, topic, payload):
+        """Decode one message and queue its points. Never raises."""
+        self.messages += 1
+        try:
+            points = decode_message(
+                topic, payload, self.clock_ns(), self.schemas, self.delivery
+            )
+        except ValueError as e:
+            self.rejected += 1
+            print(f"Rejected message: {e}")
+            return
+        # Failed readings only clear the fleet table's last value
+        values = readings(points)
+        self.writer.add(values)
+        self.fleet.observe(points)
+        self.fleet.expire()
+        if self.rules is not None:
+            self.rules.observe(values)
+
+    def on_device_status(self, device, online):
+        print(f"Device {device} is {'online' if online else 'offline'}")
+
+    def report_delivery(self):
+        totals = self.delivery.summary()
+        latency = ""
+        if totals["p50_ms"] is not None:
+            latency = (
+                f", latency p50 {totals['p50_ms']:.0f} ms, "
+                f"p95 {totals['p95_ms']:.0f} ms, p99 {totals['p99_ms']:.0f} ms"
+            )
+        print(
+            f"Delivery: {totals['received']} received, {totals['lost']} lost "
+            f"({totals['loss']:.2%}), {totals['reordered']} reordered, "
+            f"{totals['duplicates']} duplicates{latency}"
+        )
+
+
+def build_sink(env=os.environ):
+    """Pick the sink from the environment: InfluxDB if configured, else SQLite."""
+    influx_url = env.get("INFLUX_URL")
+    if influx_url:
+        return InfluxLineSink(
+            url=influx_url,
+            org=env.get("INFLUX_ORG", "growhub"),
+            bucket=env.get("INFLUX_BUCKET", "telemetry"),
+            token=env.get("INFLUX_TOKEN"),
+        )
+    return SQLiteSink(env.get("INGEST_SQLITE_PATH", "growhub.sqlite3"))
+
+
+def main():
+    import paho.mqtt.client as mqtt
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env")
+
+    writer = BatchWriter(
+        build_sink(),
+        max_points=int(os.getenv("INGEST_BATCH_SIZE", 500)),
+        max_delay=float(os.getenv("INGEST_BATCH_INTERVAL", 5.0)),
+    ).start()
+    fleet = FleetState(offline_after=float(os.getenv("INGEST_OFFLINE_AFTER", 300)))
+    service = IngestService(writer, fleet=fleet)
+    fleet.on_change = service.on_device_status
+    report_interval = float(os.getenv("INGEST_REPORT_INTERVAL", 300))
+
+    client = mqtt.Client()
+    client.username_pw_set(os.getenv("MQTT_USER"), os.getenv("MQTT_PASSWORD"))
+    client.on_connect = service.on_connect
+    client.on_message = service.on_message
+
+    rules_path = os.getenv("INGEST_RULES_PATH")
+    if rules_path:
+        service.rules = load_rules(
+            rules_path, lambda topic, command: client.publish(topic, command, qos=1)
+        )
+        print(f"Loaded {len(service.rules.rules)} rules from {rules_path}")
+
+    try:
+        client.connect(
+            os.getenv("MQTT_BROKER", "localhost"), int(os.getenv("MQTT_PORT", 1883)), 60
+        )
+        client.loop_start()
+        next_report = time.monotonic() + report_interval
+        while True:
+            # Devices that went silent are found even when nothing arrives
+            time.sleep(1)
+            fleet.expire()
+            if time.monotonic() >= next_report:
+                service.report_delivery()
+                next_report += report_interval
+    except KeyboardInterrupt:
+        print("Ingestion stopped by user")
+    finally:
+        client.disconnect()
+        client.loop_stop()
+        writer.close()
+        print(
+            f"Devices: {len(fleet)} ({fleet.online} online), "
+            f"messages: {service.messages}, rejected: {service.rejected}, "
+            f"points written: {writer.points_written}, "
+            f"dropped: {writer.points_dropped}"
+        )
+        service.report_delivery()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+State behind the live monitor, kept separate from the terminal rendering.
+
+Rows are formatted once when their value changes and stored in a sorted
+index, so drawing a frame only walks the visible page instead of every
+sensor of every device.
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+
+UNIT_LABELS = {"celsius": "°C", "percent": "%"}
+
+
+def format_cells(point):
+    """Pre-render the (source, metric, value) cells of a row."""
+    if point.value is None:
+        metric = "Status" if point.kind == "actuator" else point.metric.capitalize()
+        return (point.source, metric, "[bold red]failed[/bold red]")
+    if point.kind == "actuator":
+        state = "ON" if point.value else "OFF"
+        color = "bold green" if point.value else "bold red"
+        return (point.source, "Status", f"[{color}]{state}[/{color}]")
+
+    unit = UNIT_LABELS.get(point.unit, point.unit or "")
+    return (point.source, point.metric.capitalize(), f"{point.value} {unit}".rstrip())
+
+
+class LiveView:
+    """
+    Thread-safe table model fed by MQTT callbacks.
+
+    Rows are keyed by (device, is_actuator, source, metric) so that each
+    device lists its sensors before its actuators. `update` records which
+    rows changed and wakes up the render loop; the render loop calls
+    `wait_for_frame` and only redraws when a visible row or the view changed.
+    """
+
+    def __init__(self, page_size=40, min_frame_interval=0.5, clock=time.monotonic):
+        self.page_size = page_size
+        self.min_frame_interval = min_frame_interval
+        self.clock = clock
+
+        self.rows = {}
+        self.keys = []  # Sorted row keys, grouped by device
+        self.last_seen = {}
+        self.device = None  # None shows every device
+        self.page = 0
+
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._changed = set()
+        self._view_changed = True
+        self._last_frame = None
+
+    # --- Producer side (MQTT thread) ---
+
+    def update(self, points):
+        """Apply new points, returning the number of rows whose text changed."""
+        changed = 0
+        with self._lock:
+            now = self.clock()
+            for point in points:
+                self.last_seen[point.device] = now
+                is_actuator = point.kind == "actuator"
+                key = (point.device, is_actuator, point.source, point.metric)
+                cells = format_cells(point)
+                previous = self.rows.get(key)
+                if previous == cells:
+                    continue
+                if previous is None:
+                    insort(self.keys, key)
+                self.rows[key] = cells
+                self._changed.add(key)
+                changed += 1
+        if changed:
+            self._event.set()
+        return changed
+
+    # --- Navigation ---
+
+    def _mark_view_changed(self):
+        self._view_changed = True
+        self._event.set()
+
+    def show_device(self, device):
+        """Restrict the view to a single device, or all devices with None."""
+        with self._lock:
+            self.device = device
+            self.page = 0
+            self._mark_view_changed()
+
+    def next_page(self):
+        with self._lock:
+            if self.page + 1 < self._page_count():
+                self.page += 1
+                self._mark_view_changed()
+
+    def previous_page(self):
+        with self._lock:
+            if self.page > 0:
+                self.page -= 1
+                self._mark_view_changed()
+
+    # --- Consumer side (render loop) ---
+
+    def _bounds(self):
+        """Index range of the rows matching the device filter."""
+        if self.device is None:
+            return 0, len(self.keys)
+        start = bisect_left(self.keys, (self.device,))
+        end = bisect_left(self.keys, (self.device + "\0",))
+        return start, end
+
+    def _page_count(self):
+        start, end = self._bounds()
+        return max(1, -(-(end - start) // self.page_size))
+
+    def _visible_keys(self):
+        start, end = self._bounds()
+        first = min(start + self.page * self.page_size, end)
+        return self.keys[first : min(first + self.page_size, end)]
+
+    def wait_for_frame(self, timeout=None):
+        """
+        Block until something visible changed and the minimum frame interval
+        has elapsed. Returns the frame to draw, or None on timeout.
+        """
+        if not self._event.wait(timeout):
+            return None
+
+        if self._last_frame is not None:
+            delay = self.min_frame_interval - (self.clock() - self._last_frame)
+            if delay > 0:
+                # Let further updates pile up into the same frame
+                time.sleep(delay)
+
+        with self._lock:
+            self._event.clear()
+            visible = self._visible_keys()
+            if not self._view_changed and self._changed.isdisjoint(visible):
+                self._changed.clear()
+                return None
+            self._changed.clear()
+            self._view_changed = False
+            self._last_frame = self.clock()
+            return {
+                "rows": [(key, self.rows[key]) for key in visible],
+                "page": self.page,
+                "pages": self._page_count(),
+                "device": self.device,
+                "devices": len(self.last_seen),
+                "total_rows": len(self.keys),
+            }
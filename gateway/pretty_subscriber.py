@@ -1,4 +1,7 @@
-import json
+import argparse
+import os
+import sys
+import threading
 from datetime import datetime
 
 import paho.mqtt.client as mqtt
@@ -6,73 +9,119 @@ from rich.console import Console
 from rich.live import Live
 from rich.table import Table
 
+from gateway.codec import SchemaRegistry
+from gateway.live_view import LiveView
+from gateway.telemetry import CHANNELS, decode_message
+
 # Configuration
-BROKER_IP = "localhost"
-MQTT_USER = "pico_client"
-MQTT_PASS = "your_password"  # Replace with your .env value
-TOPIC = "growhub/telemetry"
+BROKER_IP = os.getenv("MQTT_BROKER", "localhost")
+MQTT_USER = os.getenv("MQTT_USER", "pico_client")
+MQTT_PASS = os.getenv("MQTT_PASSWORD", "your_password")  # Replace with your .env value
+TOPICS = [f"+/{channel}" for channel in CHANNELS]
 
 console = Console()
-current_data = {}
+schemas = SchemaRegistry()
 
 
-def on_message(client, userdata, msg):
-    """Callback triggered when data is received."""
-    global current_data
+def on_message(client, view, msg):
+    """Callback triggered when data is received: only updates the view model."""
     try:
-        payload = json.loads(msg.payload.decode())
-        current_data = payload
-    except Exception as e:
-        console.print(f"[red]Error parsing JSON: {e}[/red]")
+        view.update(decode_message(msg.topic, msg.payload, 0, schemas))
+    except ValueError as e:
+        console.print(f"[red]Error parsing message: {e}[/red]")
+
 
+def on_connect(client, view, flags, rc):
+    if rc == 0:
+        client.subscribe([(topic, 0) for topic in TOPICS])
+    else:
+        console.print(f"[red]Connection failed with code {rc}[/red]")
 
-def generate_table() -> Table:
-    """Generates a rich table with the latest data."""
+
+def generate_table(frame) -> Table:
+    """Builds a rich table holding only the rows of the current page."""
+    scope = frame["device"] or f"{frame['devices']} devices"
     table = Table(
-        title=f"🌱 GrowHub Live Monitor - {datetime.now().strftime('%H:%M:%S')}"
+        title=f"🌱 GrowHub Live Monitor - {scope} - "
+        f"{datetime.now().strftime('%H:%M:%S')}",
+        caption=f"Page {frame['page'] + 1}/{frame['pages']} "
+        f"({frame['total_rows']} rows) - n/p: page, d <id>: device, a: all",
     )
 
+    if frame["device"] is None:
+        table.add_column("Device", style="blue", no_wrap=True)
     table.add_column("Sensor/Actuator", style="cyan", no_wrap=True)
     table.add_column("Metric", style="magenta")
     table.add_column("Value", style="green")
 
-    # Parsing Sensors
-    for sensor_id, metrics in current_data.items():
-        if sensor_id == "actuators":
-            continue
-
-        for metric_name, metric_data in metrics.items():
-            unit = (
-                "%" if "moisture" in metric_name or "humidity" in metric_name else "°C"
-            )
-            table.add_row(
-                sensor_id, metric_name.capitalize(), f"{metric_data.value} {unit}"
-            )
-
-    # Parsing Actuators
-    if "actuators" in current_data:
-        table.add_section()
-        for act_id, state in current_data["actuators"].items():
-            color = "bold green" if state == "ON" else "bold red"
-            table.add_row(act_id, "Status", f"[{color}]{state}[/{color}]")
+    previous = None
+    for (device, is_actuator, _, _), cells in frame["rows"]:
+        if previous is not None and previous != (device, is_actuator):
+            table.add_section()
+        previous = (device, is_actuator)
+        if frame["device"] is None:
+            table.add_row(device, *cells)
+        else:
+            table.add_row(*cells)
 
     return table
 
 
-# MQTT Client Setup
-client = mqtt.Client()
-client.username_pw_set(MQTT_USER, MQTT_PASS)
-client.on_message = on_message
+def read_commands(view):
+    """Reads navigation commands from stdin (one per line)."""
+    for line in sys.stdin:
+        command, _, argument = line.strip().partition(" ")
+        if command == "n":
+            view.next_page()
+        elif command == "p":
+            view.previous_page()
+        elif command == "d" and argument:
+            view.show_device(argument.strip())
+        elif command == "a":
+            view.show_device(None)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="GrowHub live telemetry monitor")
+    parser.add_argument("--device", help="Only show this client_id")
+    parser.add_argument("--page-size", type=int, default=40)
+    parser.add_argument(
+        "--min-frame-interval",
+        type=float,
+        default=0.5,
+        help="Minimum number of seconds between two redraws",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    view = LiveView(
+        page_size=args.page_size, min_frame_interval=args.min_frame_interval
+    )
+    view.show_device(args.device)
 
-try:
-    client.connect(BROKER_IP, 1883, 60)
-    client.subscribe(TOPIC)
-    client.loop_start()
+    # MQTT Client Setup
+    client = mqtt.Client(userdata=view)
+    client.username_pw_set(MQTT_USER, MQTT_PASS)
+    client.on_connect = on_connect
+    client.on_message = on_message
 
-    # UI Live Update Loop
-    with Live(generate_table(), refresh_per_second=1) as live:
-        while True:
-            live.update(generate_table())
-except KeyboardInterrupt:
-    client.disconnect()
-    console.print("\n[yellow]Monitoring stopped.[/yellow]")
+    try:
+        client.connect(BROKER_IP, 1883, 60)
+        client.loop_start()
+        threading.Thread(target=read_commands, args=(view,), daemon=True).start()
+
+        # UI loop: sleeps until on_message or a command changes something visible
+        with Live(console=console, auto_refresh=False) as live:
+            while True:
+                frame = view.wait_for_frame(timeout=1.0)
+                if frame is not None:
+                    live.update(generate_table(frame), refresh=True)
+    except KeyboardInterrupt:
+        client.disconnect()
+        console.print("\n[yellow]Monitoring stopped.[/yellow]")
+
+
+if __name__ == "__main__":
+    main()
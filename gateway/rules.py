@@ -0,0 +1,247 @@
+"""
+Streaming rules engine for decisions that span devices or time windows.
+
+Rules are declared in a JSON document:
+
+    {
+      "zones": {"A": ["tray-1", "tray-2"]},
+      "rules": [{
+        "name": "zone-a-dry",
+        "zone": "A",
+        "source": "SoilSensor", "metric": "moisture",
+        "aggregate": "mean", "window": 900,
+        "below": 30, "when": "any",
+        "then": [{"device": "tray-1", "actuator": "WaterPump", "command": "on"}],
+        "else": [{"device": "tray-1", "actuator": "WaterPump", "command": "off"}],
+        "cooldown": 600
+      }]
+    }
+
+A rule watches one metric on several devices (a zone, or "devices"), keeps
+a sliding-window aggregate of each series and holds when the aggregate is
+"below" or "above" its threshold on "any" (default) or "all" of them. Its
+"then" commands are published to `<device>/actuators/<id>/action` when it
+starts to hold, its "else" commands when it stops; "cooldown" seconds
+bounds how often "then" fires.
+
+Aggregates are updated in O(1) (amortised) per sample and shared by the
+rules that use the same series and window. Each rule counts how many of its
+inputs hold, so a sample only re-checks the rules of its own series: the
+cost follows the rate of changes, not the number of rules.
+"""
+
+import json
+import math
+from collections import deque
+from pathlib import Path
+
+AGGREGATES = ("count", "sum", "mean", "min", "max", "ewma")
+COMMANDS = ("on", "off", "toggle")
+
+
+class WindowAggregate:
+    """
+    Count, sum, mean, min and max over the last `window` seconds, and an
+    exponentially weighted mean with `window` as its time constant. Samples
+    older than the newest one already seen are ignored.
+    """
+
+    __slots__ = ("window", "samples", "sum", "_min", "_max", "ewma", "last")
+
+    def __init__(self, window):
+        self.window = window
+        self.samples = deque()  # (time, value)
+        self.sum = 0.0
+        # Monotonic deques: the window's min (max) is always at the front
+        self._min = deque()
+        self._max = deque()
+        self.ewma = None
+        self.last = None
+
+    def add(self, t, value):
+        """Add a sample; returns False when it was older than the last one."""
+        if self.last is not None and t < self.last:
+            return False
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            alpha = 1 - math.exp(-(t - self.last) / self.window)
+            self.ewma += alpha * (value - self.ewma)
+        self.last = t
+
+        self.samples.append((t, value))
+        self.sum += value
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((t, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((t, value))
+        self.expire(t)
+        return True
+
+    def expire(self, now):
+        start = now - self.window
+        samples = self.samples
+        while samples and samples[0][0] <= start:
+            self.sum -= samples.popleft()[1]
+        if not samples:
+            self.sum = 0.0  # No rounding error carried over
+        while self._min and self._min[0][0] <= start:
+            self._min.popleft()
+        while self._max and self._max[0][0] <= start:
+            self._max.popleft()
+
+    def value(self, aggregate):
+        """Current value of an aggregate, None while the window is empty."""
+        count = len(self.samples)
+        if aggregate == "count":
+            return count
+        if not count:
+            return None
+        if aggregate == "sum":
+            return self.sum
+        if aggregate == "mean":
+            return self.sum / count
+        if aggregate == "min":
+            return self._min[0][1]
+        if aggregate == "max":
+            return self._max[0][1]
+        return self.ewma
+
+
+class Rule:
+    """Compiled rule: its inputs' state and the commands it sends."""
+
+    __slots__ = (
+        "name",
+        "aggregate",
+        "threshold",
+        "below",
+        "require_all",
+        "inputs",
+        "holding",
+        "satisfied",
+        "active",
+        "engaged",
+        "then",
+        "otherwise",
+        "cooldown",
+        "fired_at",
+    )
+
+    def __init__(self, spec, devices):
+        self.name = spec.get("name", "rule")
+        self.aggregate = spec.get("aggregate", "mean")
+        if self.aggregate not in AGGREGATES:
+            raise ValueError(f"{self.name}: unknown aggregate {self.aggregate}")
+        if ("below" in spec) == ("above" in spec):
+            raise ValueError(f"{self.name}: needs exactly one of below/above")
+        self.below = "below" in spec
+        self.threshold = spec["below"] if self.below else spec["above"]
+        when = spec.get("when", "any")
+        if when not in ("any", "all"):
+            raise ValueError(f"{self.name}: unknown quantifier {when}")
+        self.require_all = when == "all"
+        self.inputs = len(devices)
+        self.holding = bytearray(self.inputs)  # 1 when input i holds
+        self.satisfied = 0
+        self.active = False  # The condition holds
+        self.engaged = False  # "then" was sent and "else" not yet
+        self.then = [self._command(c) for c in spec.get("then", [])]
+        self.otherwise = [self._command(c) for c in spec.get("else", [])]
+        self.cooldown = spec.get("cooldown", 0)
+        self.fired_at = None
+
+    def _command(self, command):
+        if command.get("command") not in COMMANDS:
+            raise ValueError(f"{self.name}: unknown command {command.get('command')}")
+        topic = f"{command['device']}/actuators/{command['actuator']}/action"
+        return topic, command["command"]
+
+    def update(self, index, value):
+        """Record the aggregate of input `index` and update the condition."""
+        holds = value is not None and (
+            value < self.threshold if self.below else value > self.threshold
+        )
+        if holds == bool(self.holding[index]):
+            return
+        self.holding[index] = holds
+        self.satisfied += 1 if holds else -1
+        if self.require_all:
+            self.active = self.satisfied == self.inputs
+        else:
+            self.active = self.satisfied > 0
+
+
+class RulesEngine:
+    """
+    Evaluates the rules of a JSON document against decoded points and sends
+    their commands through `publish(topic, payload)`.
+    """
+
+    def __init__(self, document, publish):
+        self.publish = publish
+        self.rules = []
+        # (device, source, metric) -> [(aggregate, [(rule, input index)])]
+        self.series = {}
+        self.fired = 0
+        zones = document.get("zones", {})
+        for spec in document.get("rules", []):
+            devices = spec.get("devices")
+            if devices is None:
+                zone = spec.get("zone")
+                if zone not in zones:
+                    raise ValueError(f"{spec.get('name')}: unknown zone {zone}")
+                devices = zones[zone]
+            if "source" not in spec or "metric" not in spec:
+                raise ValueError(f"{spec.get('name')}: needs a source and a metric")
+            rule = Rule(spec, devices)
+            self.rules.append(rule)
+            window = spec.get("window", 300)
+            for index, device in enumerate(devices):
+                key = (device, spec["source"], spec["metric"])
+                self._watch(key, window, rule, index)
+
+    def _watch(self, key, window, rule, index):
+        entries = self.series.setdefault(key, [])
+        for aggregate, watchers in entries:
+            if aggregate.window == window:
+                watchers.append((rule, index))
+                return
+        entries.append((WindowAggregate(window), [(rule, index)]))
+
+    def observe(self, points):
+        """Feed decoded points; only the rules of their series are checked."""
+        for point in points:
+            entries = self.series.get((point.device, point.source, point.metric))
+            if entries is None:
+                continue
+            t = point.timestamp_ns / 1e9
+            for aggregate, watchers in entries:
+                if not aggregate.add(t, point.value):
+                    continue
+                for rule, index in watchers:
+                    rule.update(index, aggregate.value(rule.aggregate))
+                    if rule.active != rule.engaged:
+                        self._fire(rule, t)
+
+    def _fire(self, rule, t):
+        if rule.active:
+            if rule.fired_at is not None and t - rule.fired_at < rule.cooldown:
+                # Retried on the next sample of its inputs while it holds
+                return
+            rule.fired_at = t
+            commands = rule.then
+        else:
+            commands = rule.otherwise
+        rule.engaged = rule.active
+        self.fired += 1
+        print(f"Rule {rule.name}: {'holds' if rule.active else 'released'}")
+        for topic, command in commands:
+            self.publish(topic, command)
+
+
+def load_rules(path, publish):
+    """Build a RulesEngine from a JSON rules file."""
+    return RulesEngine(json.loads(Path(path).read_text()), publish)
@@ -0,0 +1,127 @@
+"""Storage backends for ingested telemetry points."""
+
+import sqlite3
+import urllib.parse
+import urllib.request
+
+
+class Sink:
+    """Base class for all sinks. A sink receives whole batches of points."""
+
+    # Failures worth retrying; any other error means the batch cannot be written
+    TRANSIENT_ERRORS: tuple[type[Exception], ...] = (OSError,)
+
+    def write(self, points):
+        """Persist a batch of points. Must raise on failure."""
+        raise NotImplementedError("Subclasses must implement write()")
+
+    def close(self):
+        """Release any resources held by the sink."""
+
+
+# Characters that must be backslash-escaped in line protocol keys and tags
+_ESCAPES = str.maketrans({"\\": "\\\\", ",": "\\,", "=": "\\=", " ": "\\ "})
+
+
+def _escape_key(value):
+    """Escape a measurement, tag key/value or field key for line protocol."""
+    return value.translate(_ESCAPES)
+
+
+def to_line_protocol(point, measurement="growhub"):
+    """Encode a point as a single InfluxDB line protocol record."""
+    tags = [
+        ("device", point.device),
+        ("kind", point.kind),
+        ("source", point.source),
+    ]
+    if point.unit:
+        tags.append(("unit", point.unit))
+    tag_str = ",".join(f"{_escape_key(k)}={_escape_key(str(v))}" for k, v in tags)
+    return (
+        f"{_escape_key(measurement)},{tag_str} "
+        f"{_escape_key(point.metric)}={float(point.value)!r} {point.timestamp_ns}"
+    )
+
+
+class InfluxLineSink(Sink):
+    """
+    Writes batches to the InfluxDB v2 HTTP API using line protocol.
+    One HTTP request is issued per batch, never per point.
+    """
+
+    def __init__(self, url, org, bucket, token=None, timeout=10.0):
+        query = urllib.parse.urlencode(
+            {"org": org, "bucket": bucket, "precision": "ns"}
+        )
+        self.write_url = f"{url.rstrip('/')}/api/v2/write?{query}"
+        self.token = token
+        self.timeout = timeout
+
+    def encode(self, points):
+        return "\n".join(to_line_protocol(p) for p in points).encode()
+
+    def write(self, points):
+        if not points:
+            return
+        request = urllib.request.Request(
+            self.write_url, data=self.encode(points), method="POST"
+        )
+        request.add_header("Content-Type", "text/plain; charset=utf-8")
+        if self.token:
+            request.add_header("Authorization", f"Token {self.token}")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise OSError(f"InfluxDB write failed with HTTP {response.status}")
+
+
+class SQLiteSink(Sink):
+    """
+    Local stand-in for InfluxDB, storing one row per point.
+    Each batch is committed in a single transaction.
+    """
+
+    # e.g. "database is locked"
+    TRANSIENT_ERRORS = (OSError, sqlite3.OperationalError)
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS points (
+            timestamp_ns INTEGER NOT NULL,
+            device TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            source TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            value REAL NOT NULL,
+            unit TEXT
+        )
+    """
+
+    def __init__(self, path=":memory:"):
+        # Batches are written from the writer thread, not the creating one
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(self.SCHEMA)
+        self.conn.commit()
+
+    def write(self, points):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO points VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        p.timestamp_ns,
+                        p.device,
+                        p.kind,
+                        p.source,
+                        p.metric,
+                        p.value,
+                        p.unit,
+                    )
+                    for p in points
+                ],
+            )
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,212 @@
+"""Decoding of GrowHub device messages into flat time-series points."""
+
+import json
+from dataclasses import dataclass
+
+from gateway.codec import SchemaRegistry, decode_binary, is_binary, is_field
+
+# Topics published by the firmware, relative to the device client_id
+CHANNELS = ("telemetry", "data", "schema")
+
+# Actuator states are stored as numbers so they can be graphed
+STATE_VALUES = {"ON": 1, "OFF": 0}
+
+# Added to every JSON message by the firmware: sequence number, publish time
+ENVELOPE_KEYS = ("seq", "ts")
+
+
+@dataclass(slots=True)
+class Point:
+    """A single measurement of one metric, ready to be written to a sink."""
+
+    device: str
+    kind: str  # "sensor" or "actuator"
+    source: str  # sensor_id or actuator_id
+    metric: str
+    value: float | None  # None: the reading failed (not written to sinks)
+    unit: str | None
+    timestamp_ns: int
+
+
+def parse_topic(topic: str) -> tuple[str, str] | None:
+    """Split `<client_id>/<channel>` into its parts, or None if not ingestible."""
+    device, _, channel = topic.rpartition("/")
+    if not device or "/" in device or channel not in CHANNELS:
+        return None
+    return device, channel
+
+
+def _sensor_points(device, sensor_id, metrics, timestamp_ns):
+    # A sensor that failed all its retries reports None instead of metrics
+    if not isinstance(metrics, dict):
+        return []
+
+    points = []
+    for metric, reading in metrics.items():
+        if isinstance(reading, dict):
+            value, unit = reading.get("value"), reading.get("unit")
+        else:
+            value, unit = reading, None
+        if isinstance(value, bool) or not isinstance(value, int | float):
+            continue
+        if not isinstance(unit, str):
+            unit = None
+        points.append(
+            Point(device, "sensor", sensor_id, metric, value, unit, timestamp_ns)
+        )
+    return points
+
+
+def _actuator_point(device, actuator_id, state, timestamp_ns):
+    value = STATE_VALUES.get(state) if isinstance(state, str) else None
+    if value is None:
+        return []
+    return [Point(device, "actuator", actuator_id, "state", value, None, timestamp_ns)]
+
+
+def _is_number(value):
+    return isinstance(value, int | float) and not isinstance(value, bool)
+
+
+def _batch_points(device, payload, timestamp_ns):
+    """
+    Flatten a batched telemetry document:
+    `{"fields": [[source, metric, unit], ...], "samples": [[stamp, v1, ...]],
+    "now": stamp_at_flush}`. Sample times are placed relative to the receive
+    time using the device's own `now`, so they do not depend on its clock
+    being synced. Raises ValueError when the document is not shaped like this.
+    A null value is a failed reading and becomes a point with value None;
+    other values that are not numbers (UNCHANGED included) are skipped.
+    """
+    fields = payload.get("fields") or []
+    samples = payload.get("samples") or []
+    now = payload.get("now")
+    if not isinstance(fields, list | tuple) or not all(map(is_field, fields)):
+        raise ValueError("Batch fields must be [source, metric, unit] lists")
+    if not isinstance(samples, list) or not all(
+        isinstance(row, list | tuple) and row and _is_number(row[0]) for row in samples
+    ):
+        raise ValueError("Batch samples must be [stamp, values...] lists")
+    if now is not None and not _is_number(now):
+        raise ValueError("Batch device time must be a number")
+
+    points = []
+    for row in samples:
+        stamp = row[0]
+        if now is None:
+            sample_ns = stamp * 1_000_000_000
+        else:
+            sample_ns = timestamp_ns - (now - stamp) * 1_000_000_000
+        for (source, metric, unit), value in zip(fields, row[1:], strict=False):
+            if value is not None and not _is_number(value):
+                continue
+            if source == "actuators":
+                points.append(
+                    Point(device, "actuator", metric, "state", value, None, sample_ns)
+                )
+            else:
+                points.append(
+                    Point(device, "sensor", source, metric, value, unit, sample_ns)
+                )
+    return points
+
+
+def flatten_payload(device, channel, payload, timestamp_ns):
+    """
+    Flatten a decoded device payload into a list of points.
+
+    `telemetry` payloads look like
+    `{sensor_id: {metric: {value, unit}}, "actuators": {actuator_id: "ON"}}`,
+    `data` payloads like `{"sensor": sensor_id, "data": {metric: {value, unit}}}`
+    or `{"actuator": actuator_id, "data": {"state": "ON"}}`.
+    Batched telemetry (see `_batch_points`) is recognised by its "samples" key.
+    Raises ValueError when the structure does not match, whatever the device
+    sent: the caller runs inside the MQTT client's callback.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError(f"Unexpected payload type: {type(payload).__name__}")
+
+    points = []
+    if channel == "telemetry" and "samples" in payload:
+        points += _batch_points(device, payload, timestamp_ns)
+
+    elif channel == "telemetry":
+        for key, metrics in payload.items():
+            if key in ENVELOPE_KEYS:
+                continue
+            if key == "actuators":
+                if not isinstance(metrics, dict):
+                    raise ValueError("Telemetry actuators must be an object")
+                for actuator_id, state in metrics.items():
+                    points += _actuator_point(device, actuator_id, state, timestamp_ns)
+            else:
+                points += _sensor_points(device, key, metrics, timestamp_ns)
+
+    elif channel == "data":
+        data = payload.get("data")
+        for key in ("sensor", "actuator"):
+            if key in payload and not isinstance(payload[key], str):
+                raise ValueError(f"Data {key} id must be a string")
+        if "sensor" in payload:
+            points += _sensor_points(device, payload["sensor"], data, timestamp_ns)
+        elif "actuator" in payload and isinstance(data, dict):
+            points += _actuator_point(
+                device, payload["actuator"], data.get("state"), timestamp_ns
+            )
+
+    return points
+
+
+def _observe_delivery(delivery, device, channel, document, timestamp_ns):
+    # Messages of older firmware have no sequence number
+    if delivery is None or not isinstance(document, dict):
+        return
+    seq, ts = document.get("seq"), document.get("ts")
+    if not isinstance(seq, int) or isinstance(seq, bool):
+        return
+    if not isinstance(ts, int | float) or isinstance(ts, bool):
+        ts = 0
+    delivery.observe(device, channel, seq, ts, timestamp_ns)
+
+
+def readings(points):
+    """The points that carry a value, for sinks and rules."""
+    return [point for point in points if point.value is not None]
+
+
+def decode_message(topic, payload, timestamp_ns, schemas=None, delivery=None):
+    """
+    Turn a raw MQTT message into points.
+    Returns an empty list for topics that are not device telemetry and
+    raises ValueError for payloads that cannot be decoded. Schema
+    announcements are recorded in `schemas` so that later binary messages
+    of the same device can be decoded. Sequence numbers and publish times of
+    telemetry and data messages are recorded in `delivery`, a
+    DeliveryTracker.
+    """
+    parsed = parse_topic(topic)
+    if parsed is None:
+        return []
+    device, channel = parsed
+    if schemas is None:
+        schemas = SchemaRegistry()
+
+    if is_binary(payload):
+        document = decode_binary(device, payload, schemas)
+        _observe_delivery(delivery, device, channel, document, timestamp_ns)
+        return _batch_points(device, document, timestamp_ns)
+
+    try:
+        document = json.loads(payload)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid JSON payload on {topic}: {e}") from e
+
+    if channel == "schema":
+        try:
+            schemas.register(device, document)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid schema announcement on {topic}: {e}") from e
+        return []
+
+    _observe_delivery(delivery, device, channel, document, timestamp_ns)
+    return flatten_payload(device, channel, document, timestamp_ns)
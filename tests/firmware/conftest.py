@@ -0,0 +1,16 @@
+import pytest  # type: ignore
+
+
+class FakeTicks:
+    """A ticks_ms/ticks_us stand-in that only moves when a test sets `now`."""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_ticks():
+    return FakeTicks()
@@ -0,0 +1,275 @@
+import asyncio
+import struct
+
+import pytest  # type: ignore
+
+from firmware.lib.umqtt.aio import MQTTAsyncClient, _packet
+from firmware.lib.umqtt.simple import MQTTException
+
+
+async def read_packet(reader):
+    op = (await reader.readexactly(1))[0]
+    sz, sh = 0, 0
+    while True:
+        b = (await reader.readexactly(1))[0]
+        sz |= (b & 0x7F) << sh
+        if not b & 0x80:
+            break
+        sh += 7
+    return op, await reader.readexactly(sz)
+
+
+class FakeBroker:
+    """
+    Minimal broker: acks everything (QoS 2 included) and records received
+    packets. The first `ignore` QoS 1/2 publishes are not acknowledged.
+    """
+
+    def __init__(self, connack_code=0, ignore=0):
+        self.connack_code = connack_code
+        self.ignore = ignore
+        self.packets = []
+        self.writer = None
+        self.server = None
+
+    async def handle(self, reader, writer):
+        self.writer = writer
+        try:
+            while True:
+                op, body = await read_packet(reader)
+                self.packets.append((op, body))
+                kind = op & 0xF0
+                if kind == 0x10:
+                    writer.write(bytes((0x20, 2, 0, self.connack_code)))
+                elif kind == 0x80:
+                    writer.write(b"\x90\x03" + body[:2] + b"\x00")
+                elif kind == 0x30 and op & 0x06:
+                    topic_len = body[0] << 8 | body[1]
+                    pid = body[2 + topic_len : 4 + topic_len]
+                    if self.ignore:
+                        self.ignore -= 1
+                    else:
+                        ack = b"\x40\x02" if op & 0x06 == 0x02 else b"\x50\x02"
+                        writer.write(ack + pid)
+                elif kind == 0x60:  # PUBREL
+                    writer.write(b"\x70\x02" + body[:2])
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+
+    async def push(self, topic, msg):
+        self.writer.write(_packet(0x30, struct.pack("!H", len(topic)) + topic, msg))
+        await self.writer.drain()
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+
+class TestPacket:
+    def test_single_buffer_with_length(self):
+        pkt = _packet(0x30, b"\x00\x01t", b"x" * 200)
+        assert bytes(pkt[:3]) == b"\x30\xcb\x01"
+        assert len(pkt) == 3 + 203
+
+
+class TestMQTTAsyncClient:
+    def test_connect_subscribe_and_receive_without_polling(self):
+        async def scenario():
+            async with FakeBroker() as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                received = asyncio.Event()
+                messages = []
+
+                def callback(topic, msg):
+                    messages.append((topic, msg))
+                    received.set()
+
+                client.set_callback(callback)
+                await client.connect()
+                await client.subscribe("dev1/actuators/+/action")
+                await broker.push(b"dev1/actuators/WaterPump/action", b"on")
+                await received.wait()
+                await client.disconnect()
+                return messages, broker.packets
+
+        messages, packets = run(scenario())
+        assert messages == [(b"dev1/actuators/WaterPump/action", b"on")]
+        assert [op & 0xF0 for op, _ in packets] == [0x10, 0x80, 0xE0]
+
+    def test_publish_qos0_and_qos1(self):
+        async def scenario():
+            async with FakeBroker() as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                await client.connect()
+                await client.publish("dev1/telemetry", '{"a": 1}')
+                await client.publish(b"dev1/telemetry", b"bin", qos=1)
+                await client.disconnect()
+                return broker.packets
+
+        packets = run(scenario())
+        publishes = [(op, body) for op, body in packets if op & 0xF0 == 0x30]
+        assert publishes[0] == (0x30, b"\x00\x0edev1/telemetry" + b'{"a": 1}')
+        assert publishes[1][0] == 0x32
+        assert publishes[1][1].endswith(b"bin")
+
+    def test_publish_buffer_is_reused_and_grows(self):
+        async def scenario():
+            async with FakeBroker() as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                await client.connect()
+                await client.publish("t", b"x" * 300)
+                buffer = client._buf
+                await client.publish("t", memoryview(b"short"))
+                await client.disconnect()
+                return broker.packets, buffer is client._buf
+
+        packets, reused = run(scenario())
+        publishes = [body for op, body in packets if op == 0x30]
+        assert publishes == [b"\x00\x01t" + b"x" * 300, b"\x00\x01tshort"]
+        assert reused
+
+    def test_publish_qos2_completes_the_handshake(self):
+        async def scenario():
+            async with FakeBroker() as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                await client.connect()
+                await client.publish("t", b"x", qos=2)
+                inflight = client.inflight()
+                await client.disconnect()
+                return broker.packets, inflight
+
+        packets, inflight = run(scenario())
+        assert [op for op, _ in packets[1:]] == [0x34, 0x62, 0xE0]
+        assert inflight == 0
+
+    def test_unacknowledged_publish_is_retransmitted_with_dup(self):
+        async def scenario():
+            async with FakeBroker(ignore=1) as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                client.retry_ms = 20
+                await client.connect()
+                await client.publish("t", b"x", qos=1)
+                await client.disconnect()
+                return broker.packets, client.retransmits
+
+        packets, retransmits = run(scenario())
+        publishes = [(op, body) for op, body in packets if op & 0xF0 == 0x30]
+        assert [op for op, _ in publishes] == [0x32, 0x3A]
+        assert publishes[0][1] == publishes[1][1]
+        assert retransmits == 1
+
+    def test_publish_gives_up_after_timeout(self):
+        async def scenario():
+            async with FakeBroker(ignore=10) as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                client.retry_ms = 10
+                await client.connect()
+                with pytest.raises(asyncio.TimeoutError):
+                    await client.publish("t", b"x", qos=1, timeout=0.05)
+                return client.inflight()
+
+        assert run(scenario()) == 0
+
+    def test_window_bounds_concurrent_publishes(self):
+        async def scenario():
+            async with FakeBroker(ignore=2) as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                client.window = 2
+                client.retry_ms = 50
+                await client.connect()
+                tasks = [
+                    asyncio.create_task(client.publish("t", bytes((i,)), qos=1))
+                    for i in range(3)
+                ]
+                await asyncio.sleep(0.02)
+                # Two in flight and unacknowledged, the third waits its turn
+                sent = sum(op & 0xF0 == 0x30 for op, _ in broker.packets)
+                await asyncio.gather(*tasks)
+                return sent
+
+        assert run(scenario()) == 2
+
+    def test_unacknowledged_publish_is_resent_to_a_resumed_session(self):
+        async def scenario():
+            async with FakeBroker(ignore=1) as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                await client.connect(clean_session=False)
+                task = asyncio.create_task(client.publish("t", b"x", qos=1))
+                await asyncio.sleep(0.02)
+                client.close()
+                with pytest.raises(OSError):
+                    await task
+                assert client.inflight() == 1
+                await client.connect(clean_session=False)
+                await asyncio.sleep(0.02)
+                return client.inflight(), broker.packets
+
+        inflight, packets = run(scenario())
+        assert inflight == 0
+        assert [op for op, _ in packets if op & 0xF0 == 0x30] == [0x32, 0x3A]
+
+    def test_incoming_qos2_is_delivered_once(self):
+        async def scenario():
+            async with FakeBroker() as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                messages = []
+                client.set_callback(lambda topic, msg: messages.append(msg))
+                await client.connect()
+                packet = struct.pack("!H", 1) + b"t" + struct.pack("!H", 7)
+                for op in (0x34, 0x3C):  # Original, then a DUP retransmission
+                    broker.writer.write(_packet(op, packet, b"on"))
+                await broker.writer.drain()
+                await asyncio.sleep(0.02)
+                broker.writer.write(b"\x62\x02\x00\x07")  # PUBREL
+                await broker.writer.drain()
+                await asyncio.sleep(0.02)
+                return messages, broker.packets
+
+        messages, packets = run(scenario())
+        assert messages == [b"on"]
+        assert [op for op, _ in packets[1:]] == [0x50, 0x50, 0x70]
+
+    def test_refused_connection(self):
+        async def scenario():
+            async with FakeBroker(connack_code=5) as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                await client.connect()
+
+        with pytest.raises(MQTTException):
+            run(scenario())
+
+    def test_publish_after_connection_loss_raises(self):
+        async def scenario():
+            async with FakeBroker() as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                await client.connect()
+                broker.writer.close()
+                await asyncio.sleep(0.05)
+                assert not client.is_connected()
+                await client.publish("dev1/telemetry", b"x")
+
+        with pytest.raises(OSError):
+            run(scenario())
+
+    def test_close_without_disconnect(self):
+        async def scenario():
+            async with FakeBroker() as broker:
+                client = MQTTAsyncClient("dev1", "127.0.0.1", broker.port)
+                await client.connect()
+                assert client.last_rx > 0
+                client.close()
+                await asyncio.sleep(0.05)
+                return client.is_connected(), broker.packets
+
+        connected, packets = run(scenario())
+        assert not connected
+        assert [op & 0xF0 for op, _ in packets] == [0x10]
@@ -0,0 +1,217 @@
+import pytest  # type: ignore
+
+from firmware.lib.umqtt.simple import MQTTClient
+
+
+class FakeSocket:
+    """Records every write; supports MicroPython's write(buf, length)."""
+
+    def __init__(self, incoming=b"", respond=None):
+        self.writes = []
+        self.incoming = bytearray(incoming)
+        self.respond = respond  # Called with each written packet
+        self.blocking = True
+
+    def write(self, buf, length=None):
+        data = bytes(buf if length is None else memoryview(buf)[:length])
+        self.writes.append(data)
+        if self.respond:
+            self.incoming += self.respond(data)
+        return len(data)
+
+    def read(self, n):
+        if not self.incoming and not self.blocking:
+            return None
+        data = bytes(self.incoming[:n])
+        del self.incoming[:n]
+        return data
+
+    def setblocking(self, flag):
+        self.blocking = flag
+
+
+@pytest.fixture
+def client():
+    c = MQTTClient("test", "localhost")
+    c.sock = FakeSocket()
+    return c
+
+
+def test_publish_qos0_is_a_single_write(client):
+    client.publish("dev/telemetry", b"hello")
+
+    assert client.sock.writes == [b"\x30\x14\x00\x0ddev/telemetryhello"]
+
+
+def test_publish_accepts_bytes_topic_str_payload_and_retain(client):
+    client.publish(b"dev/schema", "{}", retain=True)
+
+    assert client.sock.writes == [b"\x31\x0e\x00\x0adev/schema{}"]
+
+
+def test_publish_long_payload_grows_buffer_and_encodes_length(client):
+    payload = bytes(range(256)) * 2
+
+    client.publish("t", payload)
+
+    (packet,) = client.sock.writes
+    # Remaining length 2 + 1 + 512 = 515 -> 0x83 0x04
+    assert packet[:3] == b"\x30\x83\x04"
+    assert packet[3:6] == b"\x00\x01t"
+    assert packet[6:] == payload
+
+
+def test_publish_qos1_includes_packet_id_and_waits_for_puback(client):
+    client.sock = FakeSocket(incoming=b"\x40\x02\x00\x01")
+
+    client.publish("t", b"x", qos=1)
+
+    assert client.sock.writes == [b"\x32\x06\x00\x01t\x00\x01x"]
+
+
+def test_packet_id_wraps_and_skips_zero(client):
+    client.pid = 0xFFFF
+    client.sock = FakeSocket(incoming=b"\x40\x02\x00\x01")
+
+    client.publish("t", b"x", qos=1)
+
+    assert client.pid == 1
+
+
+def test_buffer_is_reused_between_publishes(client):
+    client.publish("t", b"a")
+    buffer = client._buf
+    client.publish("t", b"b")
+
+    assert client._buf is buffer
+    assert client.sock.writes[1] == b"\x30\x04\x00\x01tb"
+
+
+def ack(op, pid):
+    return bytes((op, 2, pid >> 8, pid & 0xFF))
+
+
+def broker(data):
+    """Acknowledges publishes like a broker would, including the QoS 2 flow."""
+    if data[0] & 0xF0 == 0x30 and data[0] & 6:
+        pos = 2 + (data[2] << 8 | data[3]) + 2
+        pid = data[pos] << 8 | data[pos + 1]
+        return ack(0x40 if data[0] & 6 == 2 else 0x50, pid)
+    if data[0] == 0x62:
+        return ack(0x70, data[2] << 8 | data[3])
+    return b""
+
+
+class TestInflightWindow:
+    def test_publishes_do_not_wait_for_acks_within_the_window(self, client):
+        client.window = 4
+
+        pids = [client.publish("t", b"x", qos=1) for _ in range(4)]
+
+        assert pids == [1, 2, 3, 4]
+        assert len(client.sock.writes) == 4
+        assert client.inflight() == 4
+
+        client.sock.incoming += b"".join(ack(0x40, pid) for pid in pids)
+        client.flush()
+
+        assert client.inflight() == 0
+
+    def test_full_window_blocks_until_a_slot_frees(self, client):
+        client.window = 2
+        client.publish("t", b"a", qos=1)
+        client.publish("t", b"b", qos=1)
+        client.sock.incoming += ack(0x40, 1)
+
+        client.publish("t", b"c", qos=1)
+
+        assert sorted(client._inflight) == [2, 3]
+
+    def test_out_of_order_acks(self, client):
+        client.window = 3
+        for _ in range(3):
+            client.publish("t", b"x", qos=1)
+        client.sock.incoming += ack(0x40, 3) + ack(0x40, 1) + ack(0x40, 2)
+
+        client.flush()
+
+        assert client.inflight() == 0
+
+    def test_overdue_messages_are_retransmitted_with_dup(self, client):
+        client.window = 2
+        client.retry_ms = 0
+        client.publish("t", b"x", qos=1)
+
+        client._retransmit()
+
+        first, again = client.sock.writes
+        assert again[0] == first[0] | 0x08
+        assert again[1:] == first[1:]
+        assert client.retransmits == 1
+
+    def test_unrelated_packets_are_still_processed_while_waiting(self, client):
+        received = []
+        client.set_callback(lambda topic, msg: received.append((topic, msg)))
+        client.sock.respond = broker
+        client.sock.incoming += b"\x30\x04\x00\x01ab"
+
+        client.publish("t", b"x", qos=1)
+
+        assert received == [(b"a", b"b")]
+        assert client.inflight() == 0
+
+
+class TestQos2:
+    def test_publish_runs_the_full_handshake(self, client):
+        client.sock.respond = broker
+
+        pid = client.publish("t", b"x", qos=2)
+
+        assert client.sock.writes[0][0] == 0x34
+        assert client.sock.writes[1] == ack(0x62, pid)
+        assert client.inflight() == 0
+
+    def test_lost_pubrel_is_retransmitted(self, client):
+        client.window = 2
+        client.retry_ms = 0
+        pid = client.publish("t", b"x", qos=2)
+        client.sock.incoming += ack(0x50, pid)
+        client.check_msg()
+
+        client._retransmit()
+
+        assert client.sock.writes[-2:] == [ack(0x62, pid)] * 2
+        assert client._inflight[pid][0] == 0x70
+
+    def test_incoming_message_is_delivered_exactly_once(self, client):
+        received = []
+        client.set_callback(lambda topic, msg: received.append(msg))
+        publish = b"\x34\x06\x00\x01a\x00\x07m"
+        dup = bytes((publish[0] | 0x08,)) + publish[1:]
+        client.sock.incoming += publish + dup + ack(0x62, 7)
+
+        for _ in range(3):
+            client.wait_msg()
+
+        assert received == [b"m"]
+        assert client.sock.writes == [ack(0x50, 7), ack(0x50, 7), ack(0x70, 7)]
+        assert not client._rx_qos2
+
+
+def test_pingresp_updates_last_rx(client):
+    client.sock.incoming += b"\xd0\x00"
+
+    client.check_msg()
+
+    assert client.last_rx > 0
+
+
+def test_close_drops_the_socket_without_disconnect(client):
+    sock = client.sock
+    sock.close = lambda: sock.writes.append(b"closed")
+
+    client.close()
+    client.close()
+
+    assert sock.writes == [b"closed"]
+    assert client.sock is None
@@ -1,4 +1,6 @@
+import asyncio
 import sys
+import time
 from unittest.mock import MagicMock
 
 import pytest  # type: ignore
@@ -51,3 +53,56 @@ class TestClimateSensor:
 
         result = sensor.read(retries=2)
         assert result is None
+
+
+def run_with_ticker(coro, tick=0.01):
+    """Run `coro` next to a task ticking every `tick` seconds and return
+    (result, longest gap between two ticks)."""
+
+    async def scenario():
+        gaps = []
+
+        async def ticker():
+            last = time.monotonic()
+            while True:
+                await asyncio.sleep(tick)
+                now = time.monotonic()
+                gaps.append(now - last)
+                last = now
+
+        task = asyncio.create_task(ticker())
+        result = await coro
+        task.cancel()
+        return result, max(gaps, default=0)
+
+    return asyncio.run(scenario())
+
+
+class TestClimateSensorAsync:
+    def test_read_async_success(self, sensor):
+        mock_dht.DHT11.return_value.measure.side_effect = None
+        mock_dht.DHT11.return_value.temperature.return_value = 25
+        mock_dht.DHT11.return_value.humidity.return_value = 60
+
+        result = asyncio.run(sensor.read_async())
+        assert result["temperature"]["value"] == 25
+
+    def test_read_async_retries_without_stalling_loop(self, sensor):
+        mock_dht.DHT11.return_value.measure.side_effect = OSError(110)
+        sensor.retry_delay = 0.2
+
+        result, stall = run_with_ticker(sensor.read_async(retries=3))
+        assert result is None
+        assert mock_dht.DHT11.return_value.measure.call_count == 3
+        # A blocking retry would hold the loop for a whole retry_delay
+        assert stall < sensor.retry_delay / 2
+
+    def test_read_async_timeout(self, sensor):
+        mock_dht.DHT11.return_value.measure.side_effect = OSError(110)
+        sensor.retry_delay = 0.2
+
+        start = time.monotonic()
+        result = asyncio.run(sensor.read_async(retries=10, timeout=0.3))
+        assert result is None
+        assert time.monotonic() - start < 0.4
+        assert mock_dht.DHT11.return_value.measure.call_count == 2
@@ -0,0 +1,47 @@
+import sys
+from unittest.mock import MagicMock
+
+# Keep the driver tests' mocks: drivers are imported lazily, at test time
+sys.modules.setdefault("machine", MagicMock())
+sys.modules.setdefault("dht", MagicMock())
+from firmware.src.sensors import sensor_classes  # noqa: E402
+
+CLIMATE_MODULE = "firmware.src.sensors.climate_sensor"
+
+
+def test_load_driver_returns_the_class():
+    cls = sensor_classes.load_driver("csmsv2")
+    assert cls.__name__ == "SoilSensor"
+    assert sensor_classes.load_driver("csmsv2") is cls
+
+
+def test_drivers_are_imported_only_when_used(monkeypatch):
+    monkeypatch.setattr(sensor_classes, "_loaded", {})
+    monkeypatch.delitem(sys.modules, CLIMATE_MODULE, raising=False)
+
+    sensor_classes.build_sensor(
+        {"id": "Soil", "type": "csmsv2", "pin": 26, "calibration": {"dry": 2, "wet": 1}}
+    )
+    assert CLIMATE_MODULE not in sys.modules
+
+    sensor = sensor_classes.build_sensor({"id": "Air", "type": "dht11", "pin": 15})
+    assert CLIMATE_MODULE in sys.modules
+    assert sensor.sensor_id == "Air"
+
+
+def test_unknown_type_builds_nothing():
+    assert sensor_classes.build_sensor({"id": "X", "type": "nope", "pin": 1}) is None
+
+
+def test_options_are_passed_to_the_driver():
+    sensor = sensor_classes.build_sensor(
+        {
+            "id": "Soil",
+            "type": "csmsv2",
+            "pin": 26,
+            "calibration": {"dry": 2, "wet": 1},
+            "samples": 5,
+            "trim": 2,
+        }
+    )
+    assert (sensor.samples, sensor.trim) == (5, 2)
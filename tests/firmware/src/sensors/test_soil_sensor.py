@@ -1,3 +1,4 @@
+import asyncio
 import sys
 from unittest.mock import MagicMock
 
@@ -50,6 +51,11 @@ class TestSoilSensor:
         mock_adc_instance.read_u16.return_value = midpoint
         assert sensor.read() == {"moisture": {"unit": "percent", "value": 50.0}}
 
+    def test_read_async(self, sensor):
+        mock_adc_instance.read_u16.return_value = wet
+        result = asyncio.run(sensor.read_async())
+        assert result == {"moisture": {"unit": "percent", "value": 100.0}}
+
     def test_read_dry(self, sensor):
         # Test Case: Dry value (0%)
         mock_adc_instance.read_u16.return_value = dry
@@ -102,3 +108,47 @@ class TestSoilSensor:
             match="Calibration error: dry and wet cannot be equal",
         ):
             bad_sensor.get_percentage_from_raw(35000)
+
+
+class TestSoilSensorOversampling:
+    def make(self, samples, trim):
+        return SoilSensor(
+            pin_number=26,
+            calibration={"dry": dry, "wet": wet},
+            sensor_id="SoilSensor",
+            samples=samples,
+            trim=trim,
+        )
+
+    def test_median_rejects_spikes(self):
+        sensor = self.make(samples=5, trim=2)
+        mock_adc_instance.read_u16.side_effect = [35000, 65535, 34990, 0, 35010]
+        try:
+            assert sensor.read_raw() == 35000
+        finally:
+            mock_adc_instance.read_u16.side_effect = None
+
+    def test_trimmed_mean(self):
+        sensor = self.make(samples=6, trim=1)
+        mock_adc_instance.read_u16.side_effect = [1, 30000, 30004, 30002, 30006, 60000]
+        try:
+            assert sensor.read_raw() == 30003
+        finally:
+            mock_adc_instance.read_u16.side_effect = None
+
+    def test_takes_the_configured_number_of_samples(self):
+        sensor = self.make(samples=8, trim=2)
+        mock_adc_instance.read_u16.reset_mock()
+        mock_adc_instance.read_u16.return_value = wet
+        assert sensor.read() == {"moisture": {"unit": "percent", "value": 100.0}}
+        assert mock_adc_instance.read_u16.call_count == 8
+
+    @pytest.mark.parametrize("samples, trim", [(0, 0), (4, 2), (3, -1)])
+    def test_invalid_oversampling(self, samples, trim):
+        with pytest.raises(ValueError, match="Invalid oversampling"):
+            self.make(samples, trim)
+
+    def test_set_calibration_updates_the_transform(self, sensor):
+        sensor.set_calibration({"dry": 40000, "wet": 20000})
+        assert sensor.get_percentage_from_raw(30000) == 50.0
+        assert sensor.calibration == {"dry": 40000, "wet": 20000}
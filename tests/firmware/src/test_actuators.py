@@ -1,10 +1,18 @@
+import asyncio
 import sys
+import time
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest  # type: ignore
 
 sys.modules["machine"] = MagicMock()
-from firmware.src.actuators import Actuator, ManualButton  # noqa: E402
+from firmware.src.actuators import (  # noqa: E402
+    DOUBLE_PRESS,
+    LONG_PRESS,
+    PRESS,
+    Actuator,
+    ManualButton,
+)
 
 
 class TestActuator:
@@ -70,3 +78,133 @@ class TestManualButton:
     def test_button_is_pressed_false(self, button, mock_pin):
         mock_pin.value.return_value = 1
         assert button.is_pressed() is False
+
+
+def make_button(mock_pin, **kwargs):
+    mock_pin.value.return_value = 1  # Released (active low)
+    with patch("firmware.src.actuators.Pin", return_value=mock_pin):
+        return ManualButton(12, "btn_1", "pump_1", debounce_ms=5, **kwargs)
+
+
+async def set_level(button, mock_pin, pressed, bounces=0):
+    """Simulate the pin changing level, with optional contact bounce."""
+    for _ in range(bounces):
+        mock_pin.value.return_value = 1 if pressed else 0
+        button._on_edge(mock_pin)
+    mock_pin.value.return_value = 0 if pressed else 1
+    button._on_edge(mock_pin)
+    await asyncio.sleep(0)
+
+
+def collect_gestures(button, scenario, duration=0.3):
+    """Run the button task while `scenario` drives the pin."""
+    gestures = []
+
+    async def main():
+        task = asyncio.create_task(
+            button.run(lambda btn, g: gestures.append((g, time.monotonic())))
+        )
+        await asyncio.sleep(0)
+        start = await scenario()
+        await asyncio.sleep(duration)
+        task.cancel()
+        return start
+
+    start = asyncio.run(main())
+    return gestures, start
+
+
+class TestManualButtonInterrupts:
+    def test_irq_registered_on_both_edges_by_the_task(self):
+        mock_pin = MagicMock()
+        button = make_button(mock_pin)
+        assert mock_pin.irq.call_count == 0
+        collect_gestures(button, lambda: asyncio.sleep(0), duration=0)
+        assert mock_pin.irq.call_count == 1
+
+    def test_close_detaches_the_handler(self):
+        mock_pin = MagicMock()
+        make_button(mock_pin).close()
+        mock_pin.irq.assert_called_with(handler=None)
+
+    def test_idle_button_does_no_work(self):
+        mock_pin = MagicMock()
+        button = make_button(mock_pin)
+
+        async def scenario():
+            mock_pin.value.reset_mock()
+
+        gestures, _ = collect_gestures(button, scenario, duration=0.2)
+        assert gestures == []
+        assert mock_pin.value.call_count == 0
+
+    def test_press_latency_is_bounded_by_debounce(self):
+        mock_pin = MagicMock()
+        button = make_button(mock_pin)
+
+        async def scenario():
+            start = time.monotonic()
+            await set_level(button, mock_pin, pressed=True, bounces=3)
+            return start
+
+        gestures, start = collect_gestures(button, scenario)
+        assert [g for g, _ in gestures] == [PRESS]
+        assert gestures[0][1] - start < 0.05
+
+    def test_held_press_is_reported_once(self):
+        mock_pin = MagicMock()
+        button = make_button(mock_pin)
+
+        async def scenario():
+            await set_level(button, mock_pin, pressed=True)
+            await asyncio.sleep(0.05)
+            await set_level(button, mock_pin, pressed=True, bounces=2)
+
+        gestures, _ = collect_gestures(button, scenario)
+        assert [g for g, _ in gestures] == [PRESS]
+
+    def test_long_press(self):
+        mock_pin = MagicMock()
+        button = make_button(
+            mock_pin, long_press_ms=50, actions={PRESS: "toggle", LONG_PRESS: "off"}
+        )
+
+        async def scenario():
+            await set_level(button, mock_pin, pressed=True)
+            await asyncio.sleep(0.1)
+            await set_level(button, mock_pin, pressed=False)
+
+        gestures, _ = collect_gestures(button, scenario)
+        assert [g for g, _ in gestures] == [LONG_PRESS]
+
+    def test_short_press_with_long_press_configured(self):
+        mock_pin = MagicMock()
+        button = make_button(
+            mock_pin, long_press_ms=100, actions={PRESS: "toggle", LONG_PRESS: "off"}
+        )
+
+        async def scenario():
+            await set_level(button, mock_pin, pressed=True)
+            await asyncio.sleep(0.02)
+            await set_level(button, mock_pin, pressed=False)
+
+        gestures, _ = collect_gestures(button, scenario)
+        assert [g for g, _ in gestures] == [PRESS]
+
+    def test_double_press(self):
+        mock_pin = MagicMock()
+        button = make_button(
+            mock_pin,
+            double_press_ms=100,
+            actions={PRESS: "toggle", DOUBLE_PRESS: "on"},
+        )
+
+        async def scenario():
+            for _ in range(2):
+                await set_level(button, mock_pin, pressed=True)
+                await asyncio.sleep(0.02)
+                await set_level(button, mock_pin, pressed=False)
+                await asyncio.sleep(0.02)
+
+        gestures, _ = collect_gestures(button, scenario)
+        assert [g for g, _ in gestures] == [DOUBLE_PRESS]
@@ -0,0 +1,111 @@
+import pytest  # type: ignore
+
+from firmware.src.backlog import FlashBacklog
+
+FIELDS = [("SoilSensor", "moisture", "percent"), ("actuators", "WaterPump", None)]
+
+
+def payload(moisture, pump="OFF"):
+    return {
+        "SoilSensor": {"moisture": {"value": moisture, "unit": "percent"}},
+        "actuators": {"WaterPump": pump},
+    }
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "backlog")
+
+
+def make_backlog(directory, **kwargs):
+    options = {"segment_records": 4, "max_segments": 3, "write_block": 2}
+    options.update(kwargs)
+    return FlashBacklog(FIELDS, directory=directory, **options)
+
+
+def drain(backlog, limit=100):
+    stamps = []
+    while backlog.pending():
+        document, token = backlog.read_batch(limit)
+        stamps += [row[0] for row in document["samples"]]
+        backlog.consume(token)
+    return stamps
+
+
+class TestFlashBacklog:
+    def test_records_are_fixed_size(self, directory):
+        backlog = make_backlog(directory)
+        assert backlog.record_size == 4 + 4 * len(FIELDS)
+
+    def test_staged_records_are_readable(self, directory):
+        backlog = make_backlog(directory, write_block=8)
+        backlog.append(payload(40.5, "ON"), stamp=7)
+        document, _ = backlog.read_batch(10)
+        assert document["samples"] == [[7, 40.5, 1.0]]
+        assert document["fields"] == [list(f) for f in FIELDS]
+
+    def test_writes_whole_blocks(self, directory):
+        backlog = make_backlog(directory, write_block=2)
+        backlog.append(payload(1), stamp=1)
+        assert backlog.segments == []
+        backlog.append(payload(2), stamp=2)
+        assert backlog.segments == [0]
+        assert backlog.tail_records == 2
+
+    def test_segments_rotate(self, directory):
+        backlog = make_backlog(directory)
+        for stamp in range(10):
+            backlog.append(payload(stamp), stamp=stamp)
+        assert backlog.segments == [0, 1, 2]
+        assert backlog.pending() == 10
+        assert drain(backlog, limit=3) == list(range(10))
+        assert backlog.segments == []
+
+    def test_bounded_by_dropping_oldest_segment(self, directory):
+        backlog = make_backlog(directory)
+        for stamp in range(16):
+            backlog.append(payload(stamp), stamp=stamp)
+        assert backlog.segments == [1, 2, 3]
+        assert backlog.dropped == 4
+        assert drain(backlog) == list(range(4, 16))
+
+    def test_survives_reboot(self, directory):
+        backlog = make_backlog(directory)
+        for stamp in range(6):
+            backlog.append(payload(stamp), stamp=stamp)
+        restarted = make_backlog(directory)
+        assert restarted.pending() == 6
+        assert drain(restarted) == list(range(6))
+
+    def test_changed_fields_discard_old_records(self, directory):
+        backlog = make_backlog(directory)
+        for stamp in range(4):
+            backlog.append(payload(stamp), stamp=stamp)
+        other = FlashBacklog(FIELDS[:1], directory=directory, segment_records=4)
+        assert other.pending() == 0
+
+    def test_missing_reading_is_null(self, directory):
+        backlog = make_backlog(directory)
+        backlog.append({"SoilSensor": None, "actuators": {}}, stamp=3)
+        document, _ = backlog.read_batch(1)
+        assert document["samples"] == [[3, None, None]]
+
+    def test_rotation_while_publishing_does_not_skip_records(self, directory):
+        backlog = make_backlog(directory, max_segments=2, write_block=1)
+        for stamp in range(8):
+            backlog.append(payload(stamp), stamp=stamp)
+        count, rows, token = backlog.read_rows(4)
+        assert [row[0] for row in rows] == [0, 1, 2, 3]
+        backlog.append(payload(8), stamp=8)  # Drops segment 0 meanwhile
+        backlog.consume(token)
+        assert backlog.dropped == 4
+        assert drain(backlog) == [4, 5, 6, 7, 8]
+
+    def test_flush_while_publishing_staged_records(self, directory):
+        backlog = make_backlog(directory, write_block=2)
+        backlog.append(payload(0), stamp=0)
+        _, rows, token = backlog.read_rows(4)
+        assert [row[0] for row in rows] == [0]
+        backlog.append(payload(1), stamp=1)  # Flushes both to flash
+        backlog.consume(token)
+        assert drain(backlog) == [0, 1]
@@ -0,0 +1,111 @@
+import struct
+from array import array
+
+import pytest  # type: ignore
+
+from firmware.src.codec import (
+    HEADER_FORMAT,
+    HEADER_SIZE,
+    MAGIC,
+    BinaryCodec,
+    JsonCodec,
+    make_codec,
+    schema_id,
+    stamp,
+)
+from firmware.src.telemetry_buffer import SampleRing
+
+FIELDS = [
+    ("SoilSensor", "moisture", "percent"),
+    ("ClimateSensor", "temperature", "celsius"),
+    ("actuators", "WaterPump", None),
+]
+
+PAYLOAD = {
+    "SoilSensor": {"moisture": {"value": 42.5, "unit": "percent"}},
+    "ClimateSensor": {"temperature": {"value": 21, "unit": "celsius"}},
+    "actuators": {"WaterPump": "ON"},
+}
+
+
+class TestSchemaId:
+    def test_is_stable(self):
+        assert schema_id(FIELDS) == schema_id(list(FIELDS))
+
+    def test_changes_with_layout(self):
+        assert schema_id(FIELDS) != schema_id(FIELDS[:2])
+        assert schema_id(FIELDS) != schema_id(list(reversed(FIELDS)))
+
+
+class TestMakeCodec:
+    def test_known_encodings(self):
+        assert isinstance(make_codec("json", FIELDS), JsonCodec)
+        assert isinstance(make_codec("binary", FIELDS), BinaryCodec)
+
+    def test_unknown_encoding(self):
+        with pytest.raises(ValueError, match="Unknown telemetry encoding"):
+            make_codec("xml", FIELDS)
+
+
+class TestBinaryCodec:
+    def test_single_payload(self):
+        codec = BinaryCodec(FIELDS)
+        message = codec.encode_payload(PAYLOAD)
+        assert len(message) == HEADER_SIZE + 4 + 4 * len(FIELDS)
+        header = struct.unpack_from(HEADER_FORMAT, message)
+        magic, _, schema, count, _, seq, ts = header
+        assert (magic, schema, count, seq, ts) == (MAGIC, codec.schema_id, 1, 0, 0)
+        record = struct.unpack_from("<I3f", message, HEADER_SIZE)
+        assert record[1:] == (42.5, 21.0, 1.0)
+
+    def test_rows(self):
+        codec = BinaryCodec(FIELDS)
+        values = array("f", [1.0, 2.0, 0.0, 3.0, 4.0, 1.0])
+        message = codec.encode([(10, values, 0), (20, values, 3)], 2)
+        assert len(message) == HEADER_SIZE + 2 * codec.record_size
+        second = HEADER_SIZE + codec.record_size
+        assert struct.unpack_from("<I3f", message, second) == (20, 3.0, 4.0, 1.0)
+
+    def test_sample_reuses_its_buffer(self):
+        codec = BinaryCodec(FIELDS)
+        message = codec.encode_sample(array("f", [42.5, 21.0, 1.0]), 10)
+        assert struct.unpack_from("<I3f", message, HEADER_SIZE) == (10, 42.5, 21, 1)
+        assert codec.encode_sample(array("f", [1.0, 2.0, 0.0]), 20) is message
+
+    def test_ring(self):
+        codec = BinaryCodec(FIELDS)
+        ring = SampleRing(width=3, capacity=2)
+        for sample_stamp in (10, 20, 30):  # 10 is overwritten
+            offset = ring.next_slot(sample_stamp)
+            ring.values[offset : offset + 3] = array("f", [sample_stamp, 0.0, 1.0])
+        message = codec.encode_ring(ring)
+        assert len(message) == HEADER_SIZE + 2 * codec.record_size
+        assert struct.unpack_from(HEADER_FORMAT, message)[3] == 2
+        records = [
+            struct.unpack_from("<I3f", message, HEADER_SIZE + i * codec.record_size)
+            for i in range(2)
+        ]
+        assert records == [(20, 20.0, 0.0, 1.0), (30, 30.0, 0.0, 1.0)]
+        assert bytes(codec.encode_ring(ring)) == bytes(message)
+
+    def test_stamp_fills_sequence_and_time(self):
+        codec = BinaryCodec(FIELDS)
+        message = codec.encode_payload(PAYLOAD)
+        stamp(message, 7, 1_700_000_000_123)
+        header = struct.unpack_from(HEADER_FORMAT, message)
+        assert header[-2:] == (7, 1_700_000_000_123)
+        record = struct.unpack_from("<I3f", message, HEADER_SIZE)
+        assert record[1:] == (42.5, 21.0, 1.0)
+
+    def test_json_sample_keeps_the_nested_format(self):
+        values = array("f", [float("nan"), 21.0, 1.0])
+        assert JsonCodec(FIELDS).encode_sample(values) == {
+            "SoilSensor": None,
+            "ClimateSensor": {"temperature": {"value": 21.0, "unit": "celsius"}},
+            "actuators": {"WaterPump": "ON"},
+        }
+
+    def test_json_schema_document(self):
+        document = JsonCodec(FIELDS).schema_document()
+        assert document["id"] == schema_id(FIELDS)
+        assert document["encoding"] == "json"
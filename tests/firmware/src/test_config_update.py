@@ -0,0 +1,117 @@
+import json
+
+import pytest  # type: ignore
+
+from firmware.src.config_update import (
+    changed_sections,
+    diff_items,
+    merge_config,
+    needs_new_driver,
+    parse_update,
+    save_config,
+)
+
+CONFIG = {
+    "version": 1,
+    "client_id": "dev",
+    "telemetry": {"interval": 10, "encoding": "binary"},
+    "sensors": [
+        {"id": "Soil", "type": "csmsv2", "pin": 26, "calibration": {"dry": 1}},
+        {"id": "Climate", "type": "dht11", "pin": 15},
+    ],
+    "actuators": [{"id": "Pump", "pin": 18}],
+    "buttons": [],
+}
+
+
+class TestParseUpdate:
+    def test_newer_version(self):
+        update = parse_update(b'{"version": 2, "sampling": {"period": 5}}', 1)
+        assert update["sampling"] == {"period": 5}
+
+    @pytest.mark.parametrize("version", [0, 1])
+    def test_stale_version_is_ignored(self, version):
+        assert parse_update(json.dumps({"version": version}).encode(), 1) is None
+
+    @pytest.mark.parametrize(
+        "msg, error",
+        [
+            (b"{not json", "Invalid config document"),
+            (b"[1, 2]", "must be an object"),
+            (b'{"sensors": []}', "integer version"),
+            (b'{"version": "2"}', "integer version"),
+            (b'{"version": true}', "integer version"),
+        ],
+    )
+    def test_invalid_documents(self, msg, error):
+        with pytest.raises(ValueError, match=error):
+            parse_update(msg, 1)
+
+
+class TestMergeConfig:
+    def test_partial_update_merges_items_by_id(self):
+        merged = merge_config(
+            CONFIG,
+            {
+                "version": 2,
+                "sensors": [
+                    {"id": "Soil", "calibration": {"dry": 2}},
+                    {"id": "Light", "type": "bh1750", "pin": 4},
+                ],
+            },
+        )
+        ids = [item["id"] for item in merged["sensors"]]
+        assert ids == ["Soil", "Climate", "Light"]
+        assert merged["sensors"][0] == {
+            "id": "Soil",
+            "type": "csmsv2",
+            "pin": 26,
+            "calibration": {"dry": 2},
+        }
+        assert merged["actuators"] is CONFIG["actuators"]
+        assert CONFIG["sensors"][0]["calibration"] == {"dry": 1}
+
+    def test_remove_item(self):
+        merged = merge_config(
+            CONFIG, {"version": 2, "sensors": [{"id": "Climate", "remove": True}]}
+        )
+        assert [item["id"] for item in merged["sensors"]] == ["Soil"]
+
+    def test_objects_merge_key_by_key(self):
+        merged = merge_config(CONFIG, {"version": 2, "telemetry": {"interval": 5}})
+        assert merged["telemetry"] == {"interval": 5, "encoding": "binary"}
+        assert merged["version"] == 2
+
+    def test_full_update_replaces_the_config(self):
+        merged = merge_config(CONFIG, {"version": 2, "full": True, "client_id": "x"})
+        assert merged == {"version": 2, "client_id": "x"}
+
+    def test_item_without_id(self):
+        with pytest.raises(ValueError, match="without id"):
+            merge_config(CONFIG, {"version": 2, "actuators": [{"pin": 3}]})
+
+
+def test_diff_items():
+    new = [{"id": "Pump", "pin": 19}, {"id": "Lamp", "pin": 20}]
+    assert diff_items(CONFIG["actuators"], new) == (["Pump", "Lamp"], [])
+    assert diff_items(CONFIG["actuators"], []) == ([], ["Pump"])
+
+
+def test_needs_new_driver():
+    soil = CONFIG["sensors"][0]
+    assert not needs_new_driver(soil, {**soil, "calibration": {"dry": 5}})
+    assert needs_new_driver(soil, {**soil, "pin": 27})
+    assert needs_new_driver(None, soil)
+
+
+def test_changed_sections_ignore_the_version():
+    new = merge_config(CONFIG, {"version": 2, "telemetry": {"interval": 5}})
+    assert changed_sections(CONFIG, new) == ["telemetry"]
+
+
+def test_save_config_replaces_the_file(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("{}")
+    save_config(CONFIG, str(path))
+    assert json.loads(path.read_text()) == CONFIG
+    assert list(tmp_path.iterdir()) == [path]
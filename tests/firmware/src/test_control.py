@@ -0,0 +1,176 @@
+import asyncio
+from array import array
+
+import pytest  # type: ignore
+
+from firmware.src.config_culture import CULTURES
+from firmware.src.control import NAN, ControlEngine
+
+
+class FakeSensor:
+    METRICS = (("moisture", "percent"), ("humidity", "percent"))
+
+
+class FakeActuator:
+    def __init__(self):
+        self.state = False
+
+    def on(self):
+        self.state = True
+
+    def off(self):
+        self.state = False
+
+    def is_on(self):
+        return self.state
+
+
+def reading(**values):
+    """Sampler store and offset, NaN for the metrics not given."""
+    return array("f", (values.get(m, NAN) for m, _ in FakeSensor.METRICS)), 0
+
+
+@pytest.fixture
+def actuators():
+    return {"Pump": FakeActuator(), "Fan": FakeActuator()}
+
+
+@pytest.fixture
+def changes():
+    return []
+
+
+def make_engine(actuators, changes, **options):
+    rules = [
+        {"sensor": "Soil", "metric": "moisture", "actuator": "Pump", **options},
+        {
+            "sensor": "Climate",
+            "metric": "humidity",
+            "actuator": "Fan",
+            "action": "lower",
+            "low": 60,
+            "high": 80,
+        },
+    ]
+    return ControlEngine(
+        rules,
+        {"Soil": FakeSensor(), "Climate": FakeSensor()},
+        actuators,
+        bands=CULTURES["tomato"],
+        on_change=lambda actuator_id, actuator: changes.append(
+            (actuator_id, actuator.is_on())
+        ),
+    )
+
+
+class TestHysteresis:
+    def test_pump_follows_the_band(self, actuators, changes):
+        engine = make_engine(actuators, changes)
+        for moisture, expected in ((50, False), (35, True), (50, True), (65, False)):
+            engine.on_reading("Soil", *reading(moisture=moisture))
+            engine.evaluate(0)
+            assert actuators["Pump"].is_on() is expected
+        assert changes == [("Pump", True), ("Pump", False)]
+
+    def test_fan_lowers_humidity(self, actuators, changes):
+        engine = make_engine(actuators, changes)
+        engine.on_reading("Climate", *reading(humidity=85))
+        engine.evaluate(0)
+        assert actuators["Fan"].is_on()
+        engine.on_reading("Climate", *reading(humidity=55))
+        engine.evaluate(0)
+        assert not actuators["Fan"].is_on()
+
+    def test_command_holds_until_the_next_reading(self, actuators, changes):
+        engine = make_engine(actuators, changes)
+        engine.on_reading("Soil", *reading(moisture=30))
+        engine.evaluate(0)
+        actuators["Pump"].off()  # Remote command inside the engine's decision
+        engine.evaluate(100)
+        assert not actuators["Pump"].is_on()
+
+    def test_failed_reading_switches_off(self, actuators, changes):
+        engine = make_engine(actuators, changes)
+        engine.on_reading("Soil", *reading(moisture=30))
+        engine.evaluate(0)
+        engine.on_reading("Soil", *reading())  # All NaN
+        engine.evaluate(100)
+        assert not actuators["Pump"].is_on()
+
+    def test_unknown_sensor_is_ignored(self, actuators, changes):
+        engine = make_engine(actuators, changes)
+        engine.on_reading("Light", *reading(moisture=0))
+        engine.evaluate(0)
+        assert changes == []
+
+
+class TestLimits:
+    def test_max_on_and_min_off(self, actuators, changes):
+        engine = make_engine(actuators, changes, max_on=30, min_off=300)
+        engine.on_reading("Soil", *reading(moisture=30))
+        engine.evaluate(0)
+        engine.evaluate(29_999)
+        assert actuators["Pump"].is_on()
+        engine.evaluate(30_000)
+        assert not actuators["Pump"].is_on()
+
+        engine.on_reading("Soil", *reading(moisture=30))
+        engine.evaluate(100_000)
+        assert not actuators["Pump"].is_on()
+        engine.on_reading("Soil", *reading(moisture=30))
+        engine.evaluate(330_000)
+        assert actuators["Pump"].is_on()
+
+    def test_manual_off_releases_the_rule(self, actuators, changes):
+        engine = make_engine(actuators, changes, max_on=30)
+        engine.on_reading("Soil", *reading(moisture=30))
+        engine.evaluate(0)
+        actuators["Pump"].off()
+        engine.evaluate(40_000)
+        assert changes == [("Pump", True)]
+
+    def test_release_switches_off_engaged_actuators(self, actuators, changes):
+        engine = make_engine(actuators, changes)
+        actuators["Fan"].on()  # Not switched by the engine
+        engine.on_reading("Soil", *reading(moisture=30))
+        engine.evaluate(0)
+        engine.release(10)
+        assert not actuators["Pump"].is_on()
+        assert actuators["Fan"].is_on()
+
+
+class TestCompilation:
+    def test_rule_band_overrides_culture(self, actuators, changes):
+        engine = make_engine(actuators, changes, low=10, high=20)
+        assert engine.table[0][4:6] == (10, 20)
+
+    def test_unknown_metric(self, actuators):
+        with pytest.raises(ValueError, match="no Soil light"):
+            ControlEngine(
+                [{"sensor": "Soil", "metric": "light", "actuator": "Pump"}],
+                {"Soil": FakeSensor()},
+                actuators,
+                bands={"light": (1, 2)},
+            )
+
+    def test_missing_band(self, actuators):
+        with pytest.raises(ValueError, match="invalid band"):
+            ControlEngine(
+                [{"sensor": "Soil", "metric": "moisture", "actuator": "Pump"}],
+                {"Soil": FakeSensor()},
+                actuators,
+            )
+
+
+def test_task_reacts_to_readings(actuators, changes):
+    engine = make_engine(actuators, changes)
+
+    async def scenario():
+        task = asyncio.create_task(engine.run(tick=10))
+        await asyncio.sleep(0)
+        engine.on_reading("Soil", *reading(moisture=30))
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert actuators["Pump"].is_on()
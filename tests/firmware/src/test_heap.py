@@ -0,0 +1,75 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest  # type: ignore
+
+from firmware.src.heap import HeapMonitor, largest_free_block
+
+
+class FakeHeap:
+    """MicroPython's gc.mem_free/mem_alloc, with a largest allocatable block."""
+
+    def __init__(self, free, largest):
+        self.free = free
+        self.largest = largest
+
+    def mem_free(self):
+        return self.free
+
+    def mem_alloc(self):
+        return 100_000 - self.free
+
+    def bytearray(self, size):
+        if size > self.largest:
+            raise MemoryError
+        return b""
+
+
+@pytest.fixture
+def fake_heap():
+    fake = FakeHeap(free=60_000, largest=12_345)
+    with (
+        patch("firmware.src.heap.mem_free", fake.mem_free),
+        patch("firmware.src.heap.mem_alloc", fake.mem_alloc),
+        patch("firmware.src.heap.bytearray", fake.bytearray, create=True),
+    ):
+        yield fake
+
+
+def test_largest_free_block_is_found_by_bisection(fake_heap):
+    assert largest_free_block() == 12 * 1024
+    assert largest_free_block(resolution=1) == 12_345
+
+
+def test_largest_free_block_bisects_at_coarse_resolution(fake_heap):
+    sizes = []
+
+    def bytearray(size):
+        sizes.append(size)
+        return fake_heap.bytearray(size)
+
+    with patch("firmware.src.heap.bytearray", bytearray, create=True):
+        largest_free_block()
+    assert len(sizes) <= 7
+    assert all(size % 1024 == 0 for size in sizes)
+
+
+def test_collections_track_the_lowest_free_heap(fake_heap):
+    monitor = HeapMonitor()
+    asyncio.run(monitor.collect())
+    fake_heap.free = 40_000
+    asyncio.run(monitor.collect())
+    fake_heap.free = 50_000
+    asyncio.run(monitor.collect())
+    report = monitor.document()
+    assert report["min_free"] == 40_000
+    assert report["collections"] == 3
+    assert (report["free"], report["allocated"]) == (50_000, 50_000)
+
+
+def test_without_micropython_heap_functions():
+    with patch("firmware.src.heap.mem_free", None):
+        monitor = HeapMonitor()
+        monitor.configure()
+        asyncio.run(monitor.collect())
+        assert monitor.document() == {"collections": 1}
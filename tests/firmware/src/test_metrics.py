@@ -0,0 +1,145 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest  # type: ignore
+
+from firmware.src.metrics import Histogram, LoopMetrics, periodic, timed
+
+
+@pytest.fixture
+def ticks(fake_ticks):
+    with patch("firmware.src.metrics.ticks_us", fake_ticks):
+        yield fake_ticks
+
+
+class TestHistogram:
+    def test_values_fall_in_their_bucket(self):
+        histogram = Histogram(bounds=(100, 1_000))
+        for value in (0, 100, 101, 1_000, 1_001, 50_000):
+            histogram.record(value)
+        assert list(histogram.counts) == [2, 2, 2]
+        assert histogram.count == 6
+        assert histogram.max == 50_000
+
+    def test_negative_values_count_as_zero(self):
+        histogram = Histogram(bounds=(100,))
+        histogram.record(-20)
+        assert list(histogram.counts) == [1, 0]
+        assert histogram.max == 0
+
+    def test_document_and_reset(self):
+        histogram = Histogram(bounds=(100,))
+        histogram.record(50)
+        histogram.record(250)
+        assert histogram.document() == {
+            "count": 2,
+            "mean_us": 150,
+            "max_us": 250,
+            "buckets": [1, 1],
+        }
+        histogram.reset()
+        assert histogram.document() == {
+            "count": 0,
+            "mean_us": 0,
+            "max_us": 0,
+            "buckets": [0, 0],
+        }
+
+
+class TestLoopMetrics:
+    def test_task_histograms_are_created_once(self):
+        metrics = LoopMetrics()
+        assert metrics.task("telemetry") is metrics.task("telemetry")
+
+    def test_document_covers_one_interval(self):
+        metrics = LoopMetrics(bounds=(100,))
+        metrics.lag.record(500)
+        metrics.task("telemetry").record(20)
+        doc = metrics.document()
+        assert doc["buckets_us"] == (100,)
+        assert doc["loop_lag"]["max_us"] == 500
+        assert doc["tasks"]["telemetry"]["count"] == 1
+        again = metrics.document()
+        assert again["loop_lag"]["count"] == 0
+        assert again["tasks"]["telemetry"]["count"] == 0
+
+    def test_probe_records_late_wake_ups(self, ticks):
+        metrics = LoopMetrics(period_ms=10)
+
+        async def sleep(delay):
+            # Woken 3 ms late
+            ticks.now += int(delay * 1_000_000) + 3_000
+            if metrics.lag.count == 2:
+                raise asyncio.CancelledError
+
+        with patch("firmware.src.metrics.asyncio.sleep", sleep):
+            with pytest.raises(asyncio.CancelledError):
+                asyncio.run(metrics.probe())
+        assert metrics.lag.count == 2
+        assert metrics.lag.max == 3_000
+
+
+class TestInstrumentation:
+    def test_periodic_times_each_step(self, ticks):
+        histogram = Histogram()
+        steps = []
+
+        async def step():
+            ticks.now += 250
+            steps.append(ticks.now)
+
+        async def sleep(delay):
+            if len(steps) == 3:
+                raise asyncio.CancelledError
+
+        with patch("firmware.src.metrics.asyncio.sleep", sleep):
+            with pytest.raises(asyncio.CancelledError):
+                asyncio.run(periodic(step, 1, histogram))
+        assert histogram.count == 3
+        assert histogram.total == 750
+
+    def test_periodic_without_histogram_runs_steps(self, ticks):
+        steps = []
+
+        async def step():
+            steps.append(1)
+
+        async def sleep(delay):
+            if len(steps) == 2:
+                raise asyncio.CancelledError
+
+        with patch("firmware.src.metrics.asyncio.sleep", sleep):
+            with pytest.raises(asyncio.CancelledError):
+                asyncio.run(periodic(step, 1))
+        assert len(steps) == 2
+
+    def test_periodic_reads_a_changing_interval(self, ticks):
+        intervals = [5, 7]
+        delays = []
+
+        async def step():
+            pass
+
+        async def sleep(delay):
+            delays.append(delay)
+            if len(delays) == 2:
+                raise asyncio.CancelledError
+            intervals.pop(0)
+
+        with patch("firmware.src.metrics.asyncio.sleep", sleep):
+            with pytest.raises(asyncio.CancelledError):
+                asyncio.run(periodic(step, lambda: intervals[0]))
+        assert delays == [5, 7]
+
+    def test_timed_records_failing_calls(self, ticks):
+        histogram = Histogram()
+
+        def handler(button, gesture):
+            ticks.now += 40
+            raise ValueError(gesture)
+
+        wrapped = timed(handler, histogram)
+        with pytest.raises(ValueError):
+            wrapped("button", "press")
+        assert histogram.count == 1
+        assert histogram.max == 40
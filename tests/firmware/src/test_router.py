@@ -0,0 +1,102 @@
+from unittest.mock import Mock
+
+import pytest  # type: ignore
+
+from firmware.src.router import MESSAGES, QUIET, CommandRouter
+
+
+@pytest.fixture
+def pump():
+    return Mock(spec=["on", "off", "toggle"])
+
+
+@pytest.fixture
+def changes():
+    return []
+
+
+@pytest.fixture
+def reads():
+    return []
+
+
+@pytest.fixture
+def router(pump, changes, reads):
+    r = CommandRouter("dev", verbosity=QUIET)
+    r.add_actuators(
+        {"Pump": pump},
+        ["on", "off", "toggle"],
+        lambda actuator_id, actuator: changes.append(actuator_id),
+    )
+    r.add_sensors({"Soil": Mock()}, reads.append)
+    return r
+
+
+def test_routes_are_keyed_by_topic_bytes(router):
+    assert set(router.routes) == {
+        b"dev/actuators/Pump/action",
+        b"dev/sensors/Soil/action",
+    }
+
+
+def test_clear_drops_every_route(router):
+    router.clear()
+    router.add("config", lambda msg: True)
+
+    assert set(router.routes) == {b"dev/config"}
+    assert not router.dispatch(b"dev/actuators/Pump/action", b"on")
+
+
+def test_actuator_command_calls_method_and_reports_change(router, pump, changes):
+    assert router.dispatch(b"dev/actuators/Pump/action", b"on")
+
+    pump.on.assert_called_once_with()
+    assert changes == ["Pump"]
+    assert router.routed == 1
+
+
+def test_unknown_action_is_rejected(router, pump, changes):
+    assert not router.dispatch(b"dev/actuators/Pump/action", b"explode")
+
+    assert changes == []
+    assert router.rejected == 1
+
+
+def test_sensor_read_command(router, reads):
+    assert router.dispatch(b"dev/sensors/Soil/action", b"read")
+    assert not router.dispatch(b"dev/sensors/Soil/action", b"write")
+
+    assert reads == ["Soil"]
+
+
+@pytest.mark.parametrize(
+    "topic",
+    [b"dev/actuators/Fan/action", b"other/actuators/Pump/action", b"dev", b""],
+)
+def test_unknown_topics_are_rejected(router, topic):
+    assert not router.dispatch(topic, b"on")
+    assert router.rejected == 1
+
+
+def test_handler_errors_are_contained(router, pump, capsys):
+    router.verbosity = 1
+    pump.off.side_effect = RuntimeError("pin stuck")
+
+    assert not router.dispatch(b"dev/actuators/Pump/action", b"off")
+
+    assert "pin stuck" in capsys.readouterr().out
+
+
+def test_quiet_router_prints_nothing(router, capsys):
+    router.dispatch(b"dev/actuators/Pump/action", b"on")
+    router.dispatch(b"dev/nowhere", b"on")
+
+    assert capsys.readouterr().out == ""
+
+
+def test_verbose_router_logs_every_message(router, capsys):
+    router.verbosity = MESSAGES
+
+    router.dispatch(b"dev/nowhere", b"on")
+
+    assert "Rejected" in capsys.readouterr().out
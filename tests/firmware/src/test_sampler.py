@@ -0,0 +1,139 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest  # type: ignore
+
+from firmware.src.sampler import Sampler
+
+
+class FakeSensor:
+    METRICS = (("moisture", "percent"),)
+
+    def __init__(self, min_interval=0, delay=0, fail=False):
+        self.MIN_INTERVAL = min_interval
+        self.delay = delay
+        self.fail = fail
+        self.measurements = 0
+
+    async def measure_into_async(self, values, offset):
+        self.measurements += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("ADC failure")
+        values[offset] = self.measurements
+        return True
+
+
+@pytest.fixture
+def ticks(fake_ticks):
+    with patch("firmware.src.sampler.ticks_ms", fake_ticks):
+        yield fake_ticks
+
+
+class TestSampler:
+    def test_burst_of_reads_costs_one_measurement(self, ticks):
+        sensor = FakeSensor()
+        sampler = Sampler({"soil": sensor})
+
+        async def burst():
+            first = await sampler.read("soil", max_age=3)
+            rest = [await sampler.read("soil", max_age=3) for _ in range(20)]
+            return first, rest
+
+        first, rest = asyncio.run(burst())
+        assert sensor.measurements == 1
+        assert all(reading is first for reading in rest)
+
+    def test_concurrent_reads_share_one_measurement(self, ticks):
+        sensor = FakeSensor(delay=0.01)
+        sampler = Sampler({"soil": sensor})
+
+        async def concurrent():
+            return await asyncio.gather(*(sampler.read("soil") for _ in range(5)))
+
+        readings = asyncio.run(concurrent())
+        assert sensor.measurements == 1
+        assert len(readings) == 5
+
+    def test_stale_cache_is_refreshed(self, ticks):
+        sensor = FakeSensor()
+        sampler = Sampler({"soil": sensor})
+        asyncio.run(sampler.read("soil", max_age=3))
+        ticks.now = 3_000
+        asyncio.run(sampler.read("soil", max_age=3))
+        assert sampler.reads["soil"] == 2
+
+    def test_min_interval_overrides_max_age(self, ticks):
+        sensor = FakeSensor(min_interval=1)
+        sampler = Sampler({"dht": sensor})
+        asyncio.run(sampler.read("dht", max_age=0))
+        ticks.now = 500
+        asyncio.run(sampler.read("dht", max_age=0))
+        assert sensor.measurements == 1
+        ticks.now = 1_000
+        asyncio.run(sampler.read("dht", max_age=0))
+        assert sensor.measurements == 2
+
+    def test_failed_read_is_cached_as_none(self, ticks):
+        sampler = Sampler({"soil": FakeSensor(fail=True)})
+        assert asyncio.run(sampler.read("soil")) is None
+        assert sampler.latest("soil") is None
+        assert sampler.age_ms("soil") == 0
+
+    def test_subscribers_are_notified_of_new_measurements_only(self, ticks):
+        sampler = Sampler({"soil": FakeSensor()})
+        received = []
+        sampler.subscribe(lambda sensor_id, values, offset: received.append(sensor_id))
+        asyncio.run(sampler.read("soil", max_age=3))
+        asyncio.run(sampler.read("soil", max_age=3))
+        assert received == ["soil"]
+
+    def test_unknown_sensor(self, ticks):
+        with pytest.raises(KeyError):
+            asyncio.run(Sampler({}).read("missing"))
+
+    def test_replaced_sensor_is_measured_again(self, ticks):
+        sampler = Sampler({"soil": FakeSensor()})
+        asyncio.run(sampler.read("soil", max_age=3))
+        replacement = FakeSensor()
+        sampler.replace("soil", replacement)
+        asyncio.run(sampler.read("soil", max_age=3))
+        assert replacement.measurements == 1
+        assert sampler.reads["soil"] == 2
+
+    def test_removed_sensor_leaves_the_snapshot(self, ticks):
+        sampler = Sampler({"soil": FakeSensor(), "dht": FakeSensor()})
+        sampler.remove("soil")
+        sampler.replace("light", FakeSensor())
+        assert sampler.ids == ("dht", "light")
+        with pytest.raises(KeyError):
+            asyncio.run(sampler.read("soil"))
+
+    def test_measurements_land_in_the_store(self, ticks):
+        sampler = Sampler({"soil": FakeSensor(), "dht": FakeSensor()})
+        received = []
+        sampler.subscribe(lambda *args: received.append(args[2]))
+        asyncio.run(sampler.read("dht"))
+        assert sampler.store[sampler.offsets["dht"]] == 1
+        assert received == [1]
+        assert sampler.latest("dht") == {"moisture": {"value": 1, "unit": "percent"}}
+
+    def test_failed_read_stores_nan(self, ticks):
+        sampler = Sampler({"soil": FakeSensor(fail=True)})
+        asyncio.run(sampler.refresh("soil"))
+        assert sampler.store[0] != sampler.store[0]
+
+    def test_replace_keeps_the_other_values(self, ticks):
+        sampler = Sampler({"soil": FakeSensor(), "dht": FakeSensor()})
+        asyncio.run(sampler.read("dht"))
+        sampler.remove("soil")
+        assert sampler.offsets == {"dht": 0}
+        assert sampler.store[0] == 1
+
+    def test_unsubscribe(self, ticks):
+        sampler = Sampler({"soil": FakeSensor()})
+        received = []
+        sampler.subscribe(received.append)
+        sampler.unsubscribe(received.append)
+        asyncio.run(sampler.read("soil"))
+        assert received == []
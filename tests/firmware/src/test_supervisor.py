@@ -0,0 +1,150 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest  # type: ignore
+
+from firmware.src.supervisor import ConnectionSupervisor
+
+
+class FakeWlan:
+    def __init__(self):
+        self.up = True
+
+    def isconnected(self):
+        return self.up
+
+
+class FakeWifi:
+    def __init__(self):
+        self.wlan = FakeWlan()
+        self.reachable = True
+
+    async def connect(self):
+        self.wlan.up = self.reachable
+        return self.reachable
+
+
+class FakeMqtt:
+    def __init__(self, brokers=("primary",)):
+        self.brokers = list(brokers)
+        self.broker_ip = brokers[0]
+        self.connected = True
+        self.down = set()  # Unreachable brokers
+        self.attempts = []
+        self.pings = 0
+        self.last_rx = 0
+
+    async def connect(self):
+        self.attempts.append(self.broker_ip)
+        self.connected = self.broker_ip not in self.down
+        return self.connected
+
+    def drop(self):
+        self.connected = False
+
+    async def ping(self):
+        self.pings += 1
+
+    def use_next_broker(self):
+        if len(self.brokers) < 2:
+            return False
+        index = (self.brokers.index(self.broker_ip) + 1) % len(self.brokers)
+        self.broker_ip = self.brokers[index]
+        return True
+
+
+@pytest.fixture
+def ticks(fake_ticks):
+    with patch("firmware.src.supervisor.ticks_ms", fake_ticks):
+        with patch("firmware.src.supervisor.sync_epoch"):
+            yield fake_ticks
+
+
+def step(supervisor, ticks, ms=1000):
+    ticks.now += ms
+    asyncio.run(supervisor.check())
+
+
+class TestReconnection:
+    def test_wifi_then_mqtt_and_time_to_recover(self, ticks):
+        wifi, mqtt = FakeWifi(), FakeMqtt()
+        supervisor = ConnectionSupervisor(wifi, mqtt)
+        wifi.wlan.up = False
+        step(supervisor, ticks)
+        assert not mqtt.connected  # Dropped with the link
+        assert wifi.wlan.up
+        step(supervisor, ticks)
+        assert mqtt.connected
+        document = supervisor.document()
+        assert document["wifi_reconnects"] == 1
+        assert document["mqtt_reconnects"] == 1
+        assert document["last_recovery_ms"] == 1000
+        assert document["connected"]
+
+    def test_backoff_grows_with_jitter(self, ticks):
+        supervisor = ConnectionSupervisor(FakeWifi(), FakeMqtt())
+        delays = []
+        for failures in range(1, 9):
+            supervisor.failures = failures
+            delays.append(supervisor.backoff_ms())
+        for failures, delay in enumerate(delays, 1):
+            bound = min(1000 << (failures - 1), 60_000)
+            assert bound // 2 <= delay <= bound
+
+    def test_no_attempt_before_the_backoff_expires(self, ticks):
+        mqtt = FakeMqtt()
+        mqtt.down.add("primary")
+        mqtt.connected = False
+        supervisor = ConnectionSupervisor(FakeWifi(), mqtt, backoff_min=4)
+        step(supervisor, ticks)
+        step(supervisor, ticks)  # 1 s later, the delay is at least 2 s
+        assert len(mqtt.attempts) == 1
+        ticks.now = supervisor.retry_at
+        asyncio.run(supervisor.check())
+        assert len(mqtt.attempts) == 2
+
+    def test_failover_to_the_secondary_broker(self, ticks):
+        mqtt = FakeMqtt(("primary", "secondary"))
+        mqtt.down.add("primary")
+        mqtt.connected = False
+        supervisor = ConnectionSupervisor(FakeWifi(), mqtt, failover_after=2)
+        for _ in range(4):
+            step(supervisor, ticks, 60_000)
+        assert mqtt.attempts == ["primary", "primary", "secondary"]
+        assert mqtt.connected
+        assert supervisor.document()["failovers"] == 1
+
+    def test_on_connect_runs_after_a_reconnect(self, ticks):
+        mqtt = FakeMqtt()
+        mqtt.connected = False
+        calls = []
+
+        async def on_connect():
+            calls.append(mqtt.broker_ip)
+
+        supervisor = ConnectionSupervisor(FakeWifi(), mqtt, on_connect=on_connect)
+        step(supervisor, ticks)
+        assert calls == ["primary"]
+
+
+class TestKeepalive:
+    def test_ping_every_half_keepalive(self, ticks):
+        mqtt = FakeMqtt()
+        supervisor = ConnectionSupervisor(FakeWifi(), mqtt, keepalive=10)
+        step(supervisor, ticks, 4_000)
+        assert mqtt.pings == 0
+        step(supervisor, ticks, 1_000)
+        assert mqtt.pings == 1
+        mqtt.last_rx = ticks.now + 20  # PINGRESP
+        step(supervisor, ticks, 1_000)
+        assert mqtt.connected and not supervisor.awaiting_pong
+
+    def test_silent_broker_is_dropped(self, ticks):
+        mqtt = FakeMqtt()
+        supervisor = ConnectionSupervisor(FakeWifi(), mqtt, keepalive=10)
+        step(supervisor, ticks, 5_000)
+        step(supervisor, ticks, 5_000)
+        assert not mqtt.connected
+        step(supervisor, ticks)
+        assert mqtt.connected
+        assert supervisor.mqtt_reconnects == 1
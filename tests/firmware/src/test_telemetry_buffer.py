@@ -0,0 +1,180 @@
+from array import array
+from unittest.mock import Mock, patch
+
+import pytest  # type: ignore
+
+from firmware.src.telemetry_buffer import (
+    DeadbandFilter,
+    SampleRing,
+    TelemetryBatcher,
+    TelemetryFrame,
+    build_fields,
+)
+
+FIELDS = [
+    ("SoilSensor", "moisture", "percent"),
+    ("ClimateSensor", "temperature", "celsius"),
+    ("actuators", "WaterPump", None),
+]
+
+
+def payload(moisture, temperature=21, pump="OFF"):
+    return {
+        "SoilSensor": {"moisture": {"value": moisture, "unit": "percent"}},
+        "ClimateSensor": {"temperature": {"value": temperature, "unit": "celsius"}},
+        "actuators": {"WaterPump": pump},
+    }
+
+
+class TestBuildFields:
+    def test_fields_follow_sensor_metrics(self):
+        soil = Mock(METRICS=(("moisture", "percent"),))
+        fields = build_fields({"SoilSensor": soil}, {"WaterPump": Mock()})
+        assert fields == [
+            ("SoilSensor", "moisture", "percent"),
+            ("actuators", "WaterPump", None),
+        ]
+
+
+class TestSampleRing:
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            SampleRing(width=2, capacity=0)
+
+    def test_overwrites_oldest_when_full(self):
+        ring = SampleRing(width=1, capacity=3)
+        for stamp in range(5):
+            ring.values[ring.next_slot(stamp)] = stamp
+        assert [stamp for stamp, _ in ring.slots()] == [2, 3, 4]
+        assert ring.overwritten == 2
+
+
+class TestTelemetryFrame:
+    def test_copies_store_values_and_actuator_states(self):
+        sensors = {
+            "ClimateSensor": Mock(METRICS=(("humidity", "%"), ("temperature", "C"))),
+            "SoilSensor": Mock(METRICS=(("moisture", "percent"),)),
+        }
+        pump = Mock(is_on=Mock(return_value=True))
+        sampler = Mock(
+            store=array("f", [55.0, 21.0, 40.5]),
+            offsets={"ClimateSensor": 0, "SoilSensor": 2},
+        )
+        frame = TelemetryFrame(FIELDS, sensors, {"WaterPump": pump}, sampler)
+        assert list(frame.update()) == [40.5, 21.0, 1.0]
+
+        sampler.store = array("f", [40.0, 55.0, 22.0])  # Sensors reconfigured
+        sampler.offsets = {"SoilSensor": 0, "ClimateSensor": 1}
+        pump.is_on.return_value = False
+        values = frame.values
+        assert frame.update() is values
+        assert list(values) == [40.0, 22.0, 0.0]
+
+
+class TestTelemetryBatcher:
+    def test_flush_on_batch_size(self):
+        batcher = TelemetryBatcher(FIELDS, batch_size=3, flush_interval=600)
+        batcher.add(payload(40.5), stamp=1)
+        batcher.add(payload(41.1), stamp=2)
+        assert not batcher.due()
+        batcher.add(payload(41.7, pump="ON"), stamp=3)
+        assert batcher.due()
+
+    def test_flush_on_interval(self):
+        batcher = TelemetryBatcher(FIELDS, batch_size=10, flush_interval=5)
+        with patch("firmware.src.telemetry_buffer.ticks_ms", return_value=1_000):
+            batcher.add(payload(40), stamp=1)
+        with patch("firmware.src.telemetry_buffer.ticks_ms", return_value=5_999):
+            assert not batcher.due()
+        with patch("firmware.src.telemetry_buffer.ticks_ms", return_value=6_000):
+            assert batcher.due()
+
+    def test_payload_format(self):
+        batcher = TelemetryBatcher(FIELDS, batch_size=3, flush_interval=60)
+        batcher.add(payload(40.1), stamp=10)
+        batcher.add({"SoilSensor": None, "actuators": {"WaterPump": "ON"}}, stamp=20)
+        doc = batcher.to_payload()
+        assert doc["fields"] == [list(f) for f in FIELDS]
+        assert doc["samples"] == [[10, 40.1, 21, 0.0], [20, None, None, 1.0]]
+
+    def test_add_values_from_an_offset(self):
+        batcher = TelemetryBatcher(FIELDS, batch_size=3, flush_interval=60)
+        values = array("f", [0.0, 40.5, 21.0, 1.0])
+        batcher.add_values(values, 1, stamp=10)
+        assert batcher.to_payload()["samples"] == [[10, 40.5, 21.0, 1.0]]
+
+    def test_clear(self):
+        batcher = TelemetryBatcher(FIELDS, batch_size=1, flush_interval=60)
+        batcher.add(payload(40), stamp=1)
+        batcher.clear()
+        assert not batcher.due()
+        assert batcher.to_payload()["samples"] == []
+
+
+class TestDeadbandFilter:
+    @pytest.fixture
+    def batcher(self):
+        with patch("firmware.src.telemetry_buffer.ticks_ms", return_value=0):
+            deadband = DeadbandFilter(FIELDS, {"SoilSensor": {"moisture": 1.0}}, 60)
+        return TelemetryBatcher(
+            FIELDS, batch_size=10, flush_interval=60, deadband=deadband
+        )
+
+    def add(self, batcher, sample, stamp, tick=0):
+        with patch("firmware.src.telemetry_buffer.ticks_ms", return_value=tick):
+            return batcher.add(sample, stamp=stamp)
+
+    def test_first_sample_is_complete(self, batcher):
+        assert self.add(batcher, payload(40), 1)
+        assert batcher.to_payload()["samples"] == [[1, 40.0, 21, 0.0]]
+
+    def test_changes_within_deadband_are_suppressed(self, batcher):
+        self.add(batcher, payload(40), 1)
+        assert not self.add(batcher, payload(40.8), 2, tick=10_000)
+        assert len(batcher.ring) == 1
+        assert batcher.deadband.suppressed == 3
+
+    def test_only_changed_fields_are_sent(self, batcher):
+        self.add(batcher, payload(40), 1)
+        self.add(batcher, payload(41.5), 2, tick=10_000)
+        self.add(batcher, payload(41.5, temperature=22, pump="ON"), 3, tick=20_000)
+
+        assert batcher.to_payload()["samples"][1:] == [
+            [2, 41.5, "=", "="],
+            [3, "=", 22, 1.0],
+        ]
+
+    def test_drift_is_measured_from_last_report(self, batcher):
+        self.add(batcher, payload(40), 1)
+        self.add(batcher, payload(40.6), 2, tick=10_000)
+        self.add(batcher, payload(41.2), 3, tick=20_000)
+
+        assert batcher.to_payload()["samples"][1:] == [[3, 41.2, "=", "="]]
+
+    def test_heartbeat_resends_unchanged_fields(self, batcher):
+        self.add(batcher, payload(40), 1)
+        assert not self.add(batcher, payload(40), 2, tick=59_999)
+        assert self.add(batcher, payload(40), 3, tick=60_000)
+
+        assert batcher.to_payload()["samples"][1] == [3, 40.0, 21, 0.0]
+
+    def test_recovered_sensor_is_reported_at_once(self, batcher):
+        self.add(batcher, payload(40), 1)
+        self.add(batcher, {"actuators": {"WaterPump": "OFF"}}, 2, tick=10_000)
+        self.add(batcher, payload(40), 3, tick=20_000)
+
+        assert batcher.to_payload()["samples"][1:] == [
+            [2, None, None, "="],
+            [3, 40.0, 21, "="],
+        ]
+
+    def test_failed_reading_is_sent_once_then_at_the_heartbeat(self, batcher):
+        failed = {"actuators": {"WaterPump": "OFF"}}
+        self.add(batcher, failed, 1)
+        assert not self.add(batcher, failed, 2, tick=10_000)
+        assert self.add(batcher, failed, 3, tick=60_000)
+
+        assert batcher.to_payload()["samples"] == [
+            [1, None, None, 0.0],
+            [3, None, None, 0.0],
+        ]
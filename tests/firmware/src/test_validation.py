@@ -0,0 +1,110 @@
+import json
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from firmware.src.validation import validate_config
+
+ACTIONS = ["on", "off", "toggle"]
+CALIBRATION = {"dry": 50000, "wet": 18000}
+
+
+@pytest.fixture
+def config():
+    return {
+        "client_id": "dev",
+        "telemetry": {"encoding": "binary"},
+        "sensors": [
+            {"id": "Soil", "type": "csmsv2", "pin": 26, "calibration": CALIBRATION},
+            {"id": "Climate", "type": "dht11", "pin": 15},
+        ],
+        "actuators": [{"id": "Pump", "pin": 18}],
+        "buttons": [
+            {"id": "Button", "pin": 14, "target": "Pump", "actions": {"press": "on"}}
+        ],
+    }
+
+
+def test_valid_config(config):
+    assert validate_config(config, ACTIONS) == []
+
+
+def test_shipped_config_is_valid():
+    path = Path(__file__).resolve().parents[3] / "firmware" / "config.json"
+    assert validate_config(json.loads(path.read_text()), ACTIONS) == []
+
+
+@pytest.mark.parametrize(
+    "change, error",
+    [
+        (lambda c: c.update(client_id=""), "client_id"),
+        (lambda c: c.update(version="2"), "version: expected an integer"),
+        (lambda c: c["sensors"][0].update(type="bme280"), "unknown type bme280"),
+        (lambda c: c["sensors"][0].pop("calibration"), "sensor Soil: missing"),
+        (
+            lambda c: c["sensors"][0].update(calibration={"dry": 50000}),
+            "sensor Soil: calibration",
+        ),
+        (lambda c: c["sensors"][1].pop("pin"), "sensors[1]: missing pin"),
+        (lambda c: c["sensors"][1].update(id="Soil", pin=16), "duplicate id Soil"),
+        (lambda c: c["actuators"][0].update(pin=26), "pin 26 already used by Soil"),
+        (lambda c: c["buttons"][0].update(target="Fan"), "unknown target Fan"),
+        (
+            lambda c: c["buttons"][0]["actions"].update(press="explode"),
+            "unknown action explode",
+        ),
+        (lambda c: c["telemetry"].update(encoding="xml"), "unknown encoding xml"),
+        (lambda c: c.update(sensors={}), "sensors: expected a list"),
+    ],
+)
+def test_errors(config, change, error):
+    change(config)
+
+    errors = validate_config(config, ACTIONS)
+
+    assert len(errors) == 1
+    assert error in errors[0]
+
+
+def test_all_errors_are_reported_at_once(config):
+    config["client_id"] = None
+    config["actuators"] = [{"id": "Pump"}]
+
+    errors = validate_config(config, ACTIONS)
+
+    assert len(errors) == 3  # client_id, actuator pin, then the button target
+
+
+def rule(**changes):
+    return {"sensor": "Soil", "metric": "moisture", "actuator": "Pump", **changes}
+
+
+def test_control_rules(config):
+    config["control"] = {
+        "culture": "tomato",
+        "rules": [rule(), rule(sensor="Climate", metric="humidity", actuator="Fan")],
+    }
+    config["actuators"].append({"id": "Fan", "pin": 19})
+    assert validate_config(config, ACTIONS) == []
+
+
+@pytest.mark.parametrize(
+    "control, error",
+    [
+        ({"culture": "cactus", "rules": []}, "unknown culture cactus"),
+        ({"culture": "tomato", "rules": [rule(sensor="Leaf")]}, "unknown sensor"),
+        ({"culture": "tomato", "rules": [rule(actuator="Fan")]}, "unknown actuator"),
+        ({"culture": "tomato", "rules": [rule(), rule()]}, "Pump already has a rule"),
+        ({"culture": "tomato", "rules": [rule(action="flood")]}, "unknown action"),
+        ({"rules": [rule()]}, "no band for moisture"),
+        ({"rules": [rule(low=60, high=40)]}, "low must be below high"),
+        ({"rules": [{"sensor": "Soil"}]}, "missing metric, actuator"),
+    ],
+)
+def test_control_errors(config, control, error):
+    config["control"] = control
+
+    errors = validate_config(config, ACTIONS)
+
+    assert len(errors) == 1
+    assert error in errors[0]
@@ -0,0 +1,154 @@
+import asyncio
+import importlib
+import json
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest  # type: ignore
+
+FIRMWARE = Path(__file__).parents[2] / "firmware"
+
+for name in ("machine", "dht", "network"):
+    sys.modules.setdefault(name, MagicMock())
+sys.modules.setdefault("ujson", json)
+sys.modules.setdefault("uasyncio", asyncio)
+
+
+@pytest.fixture
+def main(monkeypatch, tmp_path):
+    """The firmware's main module, set up offline, writing to `tmp_path`."""
+    monkeypatch.syspath_prepend(str(FIRMWARE))
+    monkeypatch.chdir(FIRMWARE)
+    monkeypatch.delitem(sys.modules, "main", raising=False)
+    module = importlib.import_module("main")
+    monkeypatch.chdir(tmp_path)
+    module.setup()
+    return module
+
+
+def update(version, **sections):
+    return json.dumps({"version": version, **sections}).encode()
+
+
+def cancel_tasks(main):
+    for task in main.button_tasks.values():
+        task.cancel()
+    if main.control_task is not None:
+        main.control_task.cancel()
+
+
+def test_config_updates_while_booting_are_applied_once_tasks_started(main):
+    messages = [
+        update(2, buttons=[{"id": "WaterPumpButton", "debounce_ms": 50}]),
+        update(3, sampling={"period": 5}),
+    ]
+
+    async def boot():
+        for message in messages:
+            main.on_config_message(message)
+        await asyncio.sleep(0)
+        assert main.config["version"] == 1
+        main.start_tasks()
+        await asyncio.sleep(0.05)
+        cancel_tasks(main)
+
+    asyncio.run(boot())
+    assert main.config["version"] == 3
+    assert main.buttons["WaterPumpButton"].debounce_ms == 50
+    assert main.sampler.period == 5
+    assert set(main.button_tasks) == set(main.buttons)
+
+
+def test_apply_config_replaces_buttons_and_control_tasks(main):
+    new_config = main.merge_config(
+        main.config,
+        {
+            "version": 2,
+            "buttons": [{"id": "GrowLampButton", "remove": True}],
+            "control": {"culture": "radish", "rules": []},
+        },
+    )
+
+    async def reload():
+        main.start_tasks()
+        old_task = main.button_tasks["GrowLampButton"]
+        control_task = main.control_task
+        applied, restart = await main.apply_config(new_config)
+        await asyncio.sleep(0)
+        assert old_task.cancelled() and control_task.cancelled()
+        cancel_tasks(main)
+        return applied, restart
+
+    applied, restart = asyncio.run(reload())
+    assert (sorted(applied), restart) == (["buttons", "control"], [])
+    assert list(main.buttons) == list(main.button_tasks) == ["WaterPumpButton"]
+    assert main.control is None
+
+
+def test_failed_build_leaves_the_running_configuration(main):
+    new_config = main.merge_config(
+        main.config,
+        {"version": 2, "buttons": [{"id": "WaterPumpButton", "pin": 27}]},
+    )
+
+    async def reload():
+        main.start_tasks()
+        tasks = dict(main.button_tasks)
+        with patch.object(main, "build_button", side_effect=ValueError("pin")):
+            with pytest.raises(ValueError):
+                await main.apply_config(new_config)
+        await asyncio.sleep(0)
+        assert main.button_tasks == tasks
+        assert not any(task.done() for task in tasks.values())
+        cancel_tasks(main)
+
+    asyncio.run(reload())
+    assert main.config["version"] == 1
+    assert main.buttons["WaterPumpButton"].pin is not None
+
+
+def test_failed_build_leaves_the_actuators_running(main):
+    new_config = main.merge_config(
+        main.config,
+        {
+            "version": 2,
+            "actuators": [{"id": "WaterPump", "pin": 20}],
+            "buttons": [{"id": "WaterPumpButton", "pin": 27}],
+        },
+    )
+    pump = main.actuators["WaterPump"]
+    pump.on()
+    pump.pin.reset_mock()
+
+    async def reload():
+        with patch.object(main, "build_button", side_effect=ValueError("pin")):
+            with pytest.raises(ValueError):
+                await main.apply_config(new_config)
+
+    asyncio.run(reload())
+    assert main.actuators["WaterPump"] is pump
+    # Every Pin is the same mock here: no pin was switched off or set up
+    pump.pin.value.assert_not_called()
+    pump.pin.init.assert_not_called()
+
+
+def test_backlog_replaced_while_draining_is_not_consumed(main):
+    for stamp in range(8):
+        main.backlog.append({}, stamp=stamp)
+    main.backlog.flush()
+    old = main.backlog
+
+    async def publish(topic, message, retain=False, qos=0):
+        # A config relayout reopens the same directory meanwhile
+        main.backlog = main.build_backlog(old.fields)
+        return True
+
+    with (
+        patch.object(main, "link_up", return_value=True),
+        patch.object(main.mqtt_mgr, "publish", publish),
+    ):
+        asyncio.run(main.backlog_step())
+    assert main.backlog.pending() == 8
+    count, rows, _ = main.backlog.read_rows(8)
+    assert [row[0] for row in rows] == list(range(8))
@@ -0,0 +1,16 @@
+import pytest  # type: ignore
+
+
+class FakeClock:
+    """A time.monotonic stand-in that only moves when a test sets `now`."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
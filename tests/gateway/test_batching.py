@@ -0,0 +1,103 @@
+import pytest  # type: ignore
+
+from gateway.batching import BatchWriter
+from gateway.ingest import IngestService
+from gateway.sinks import Sink, SQLiteSink
+from gateway.telemetry import Point
+
+
+class FailingSink(Sink):
+    def __init__(self, failures, error=OSError):
+        self.failures = failures
+        self.error = error
+        self.batches = []
+
+    def write(self, points):
+        if self.failures:
+            self.failures -= 1
+            raise self.error("sink unavailable")
+        self.batches.append(list(points))
+
+
+def make_points(n, device="dev1"):
+    return [Point(device, "sensor", "S", "m", i, None, i) for i in range(n)]
+
+
+@pytest.fixture
+def sink():
+    return SQLiteSink(":memory:")
+
+
+class TestBatchWriter:
+    def test_invalid_limits(self, sink):
+        with pytest.raises(ValueError):
+            BatchWriter(sink, max_points=0)
+
+    def test_due_on_size(self, sink, clock):
+        writer = BatchWriter(sink, max_points=10, max_delay=60, clock=clock)
+        writer.add(make_points(9))
+        assert not writer._due()
+        writer.add(make_points(1))
+        assert writer._due()
+
+    def test_due_on_time(self, sink, clock):
+        writer = BatchWriter(sink, max_points=10, max_delay=5, clock=clock)
+        writer.add(make_points(1))
+        clock.now = 4.9
+        assert not writer._due()
+        clock.now = 5.0
+        assert writer._due()
+
+    def test_flush_writes_bounded_batches(self):
+        sink = FailingSink(failures=0)
+        writer = BatchWriter(sink, max_points=4, max_delay=60)
+        writer.add(make_points(10))
+        writer.flush()
+        assert [len(b) for b in sink.batches] == [4, 4, 2]
+        assert writer.batches_written == 3
+        assert writer.pending() == 0
+
+    def test_failed_batch_is_retried(self):
+        sink = FailingSink(failures=1)
+        writer = BatchWriter(sink, max_points=4, max_delay=60)
+        writer.add(make_points(3))
+        writer.flush()
+        assert writer.pending() == 3
+        assert writer.write_errors == 1
+        writer.flush()
+        assert [p.value for p in sink.batches[0]] == [0, 1, 2]
+
+    def test_batch_failing_for_good_is_dropped(self):
+        sink = FailingSink(failures=1, error=TypeError)
+        writer = BatchWriter(sink, max_points=4, max_delay=60)
+        writer.add(make_points(3))
+        writer.flush()
+        writer.add(make_points(2))
+        writer.flush()
+        assert (writer.write_errors, writer.points_dropped) == (1, 3)
+        assert [p.value for p in sink.batches[0]] == [0, 1]
+
+    def test_pending_is_bounded(self):
+        writer = BatchWriter(FailingSink(0), max_points=2, max_pending=5)
+        writer.add(make_points(8))
+        assert writer.pending() == 5
+        assert writer.points_dropped == 3
+
+    def test_background_thread_writes_to_sqlite(self, sink):
+        writer = BatchWriter(sink, max_points=5, max_delay=0.05).start()
+        writer.add(make_points(12))
+        writer.close()
+        assert writer.points_written == 12
+
+
+class TestIngestService:
+    def test_handle_routes_points_to_writer(self, sink):
+        writer = BatchWriter(sink, max_points=100, max_delay=60)
+        service = IngestService(writer, clock_ns=lambda: 42)
+        payload = b'{"SoilSensor": {"moisture": {"value": 10, "unit": "percent"}}}'
+        service.handle("dev1/telemetry", payload)
+        service.handle("dev1/telemetry", b"garbage")
+        writer.flush()
+        assert sink.count() == 1
+        assert service.messages == 2
+        assert service.rejected == 1
@@ -0,0 +1,113 @@
+import json
+from array import array
+
+import pytest  # type: ignore
+
+from firmware.src.codec import HEADER_SIZE, STAMP_OFFSET, BinaryCodec, stamp
+from gateway.codec import SchemaRegistry, decode_binary, schema_id
+from gateway.telemetry import decode_message
+
+FIELDS = [
+    ("SoilSensor", "moisture", "percent"),
+    ("actuators", "WaterPump", None),
+]
+
+
+@pytest.fixture
+def codec():
+    return BinaryCodec(FIELDS)
+
+
+@pytest.fixture
+def registry(codec):
+    registry = SchemaRegistry()
+    registry.register("dev1", json.loads(json.dumps(codec.schema_document())))
+    return registry
+
+
+class TestSchemaRegistry:
+    def test_schema_id_matches_firmware(self, codec):
+        assert schema_id(FIELDS) == codec.schema_id
+
+    def test_mismatched_id_is_rejected(self):
+        with pytest.raises(ValueError, match="Schema id mismatch"):
+            SchemaRegistry().register("dev1", {"id": 1, "fields": FIELDS})
+
+    @pytest.mark.parametrize(
+        "fields",
+        [
+            5,
+            [["SoilSensor", "moisture"]],
+            [["SoilSensor", 5, "percent"]],
+            [["SoilSensor", "moisture", ["percent"]]],
+        ],
+    )
+    def test_malformed_announcement_is_rejected(self, fields):
+        registry = SchemaRegistry()
+        payload = json.dumps({"fields": fields}).encode()
+        with pytest.raises(ValueError, match="Invalid schema"):
+            decode_message("dev1/schema", payload, 0, schemas=registry)
+        assert registry._schemas == {}
+
+
+class TestDecodeBinary:
+    def test_round_trip(self, codec, registry):
+        values = array("f", [42.1, 1.0, float("nan"), 0.0, float("inf"), 1.0])
+        rows = [(10, values, 0), (20, values, 2), (30, values, 4)]
+        message = codec.encode(rows, 3)
+        document = decode_binary("dev1", bytes(message), registry)
+        assert document["fields"] == FIELDS
+        assert document["samples"] == [[10, 42.1, 1.0], [20, None, 0.0], [30, "=", 1.0]]
+
+    def test_sequence_and_publish_time(self, codec, registry):
+        message = codec.encode_payload({})
+        stamp(message, 41, 1_700_000_000_123)
+        document = decode_binary("dev1", bytes(message), registry)
+        assert (document["seq"], document["ts"]) == (41, 1_700_000_000_123)
+
+    def test_version_1_has_no_stamp(self, codec, registry):
+        message = bytearray(codec.encode_payload({}))
+        del message[STAMP_OFFSET:HEADER_SIZE]
+        message[1] = 1
+        document = decode_binary("dev1", bytes(message), registry)
+        assert "seq" not in document
+        assert len(document["samples"]) == 1
+
+    def test_unknown_version(self, codec, registry):
+        message = bytearray(codec.encode_payload({}))
+        message[1] = 9
+        with pytest.raises(ValueError, match="version 9"):
+            decode_binary("dev1", bytes(message), registry)
+
+    def test_unknown_schema(self, codec):
+        message = bytes(codec.encode_payload({}))
+        with pytest.raises(ValueError, match="Unknown schema"):
+            decode_binary("dev1", message, SchemaRegistry())
+
+    def test_truncated(self, codec, registry):
+        message = bytes(codec.encode_payload({}))
+        with pytest.raises(ValueError, match="expected"):
+            decode_binary("dev1", message[:-1], registry)
+
+    def test_decode_message_uses_announced_schema(self, codec):
+        registry = SchemaRegistry()
+        announcement = json.dumps(codec.schema_document()).encode()
+        assert decode_message("dev1/schema", announcement, 0, registry) == []
+
+        payload = {"SoilSensor": {"moisture": {"value": 40, "unit": "percent"}}}
+        message = bytes(codec.encode_payload(payload))
+        points = decode_message("dev1/telemetry", message, 10**9, registry)
+        assert [(p.source, p.value) for p in points] == [
+            ("SoilSensor", 40.0),
+            ("WaterPump", None),  # No state in the payload
+        ]
+
+    def test_smaller_than_json(self, codec):
+        payload = {
+            "SoilSensor": {"moisture": {"value": 40.5, "unit": "percent"}},
+            "actuators": {"WaterPump": "OFF"},
+        }
+        message = codec.encode_payload(payload)
+        # Both carry the sequence number and publish time of MqttManager
+        payload.update(seq=1234, ts=1_700_000_000_000)
+        assert len(message) < len(json.dumps(payload)) / 3
@@ -0,0 +1,130 @@
+import random
+
+import pytest  # type: ignore
+
+from gateway.delivery import WINDOW, DeliveryTracker, QuantileSketch, StreamStats
+
+
+def observe_all(sequence):
+    stats = StreamStats()
+    for seq in sequence:
+        stats.observe(seq)
+    return stats
+
+
+class TestStreamStats:
+    def test_in_order(self):
+        stats = observe_all(range(10))
+        assert (stats.received, stats.lost, stats.reordered) == (10, 0, 0)
+
+    def test_gap_is_lost(self):
+        stats = observe_all([0, 1, 4, 5])
+        assert stats.lost == 2
+
+    def test_late_message_is_reordered_not_lost(self):
+        stats = observe_all([0, 1, 3, 2, 4])
+        assert (stats.lost, stats.reordered, stats.duplicates) == (0, 1, 0)
+
+    def test_duplicate(self):
+        stats = observe_all([0, 1, 2, 1])
+        assert (stats.lost, stats.reordered, stats.duplicates) == (0, 0, 1)
+
+    def test_restart(self):
+        stats = observe_all([5, 6, 7, 0, 1])
+        assert stats.restarts == 1
+        assert (stats.lost, stats.highest) == (0, 1)
+
+    def test_far_behind_is_a_restart(self):
+        stats = observe_all([0, WINDOW + 10, 3])
+        assert stats.restarts == 1
+        assert stats.highest == 3
+
+    def test_restart_whose_first_message_is_lost(self):
+        stats = StreamStats()
+        for seq in range(41):
+            stats.observe(seq, 1_000 + seq)
+        for seq in (1, 2, 3):
+            stats.observe(seq, 5_000 + seq)
+        assert stats.restarts == 1
+        assert (stats.lost, stats.duplicates, stats.highest) == (1, 0, 3)
+
+    def test_retried_publish_is_a_duplicate(self):
+        stats = StreamStats()
+        for seq in range(5000):
+            stats.observe(seq, 1_000 + seq)
+        stats.observe(5000, 7_000)
+        stats.observe(5000, 9_000)  # Same seq, stamped again by the retry
+        assert (stats.restarts, stats.lost, stats.duplicates) == (0, 0, 1)
+
+    def test_late_message_and_duplicate_are_not_restarts(self):
+        stats = StreamStats()
+        for seq, ts in ((0, 1_000), (1, 1_001), (3, 1_003), (2, 1_002), (3, 1_003)):
+            stats.observe(seq, ts)
+        assert stats.restarts == 0
+        assert (stats.lost, stats.reordered, stats.duplicates) == (0, 1, 1)
+
+
+class TestQuantileSketch:
+    def test_relative_accuracy(self):
+        rng = random.Random(1)
+        values = [rng.lognormvariate(3, 1) for _ in range(20_000)]
+        sketch = QuantileSketch(alpha=0.01)
+        for value in values:
+            sketch.add(value)
+        ordered = sorted(values)
+        for q in (0.5, 0.95, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+        # Memory depends on the value range, not on the number of values
+        assert len(sketch.buckets) < 1_000
+
+    def test_negative_values_count_as_zero(self):
+        sketch = QuantileSketch()
+        for value in (-5, -1, 10):
+            sketch.add(value)
+        assert sketch.quantile(0.5) == 0.0
+        assert sketch.quantile(1.0) == pytest.approx(10, rel=0.01)
+
+    def test_empty(self):
+        assert QuantileSketch().quantile(0.5) is None
+
+    def test_merge(self):
+        first, second = QuantileSketch(), QuantileSketch()
+        for value in range(1, 51):
+            first.add(value)
+        for value in range(51, 101):
+            second.add(value)
+        first.merge(second)
+        assert first.count == 100
+        assert first.quantile(0.5) == pytest.approx(50, rel=0.02)
+        assert first.max == 100
+
+
+class TestDeliveryTracker:
+    def test_summary_per_device_and_fleet(self):
+        tracker = DeliveryTracker()
+        for seq in (0, 1, 3):
+            tracker.observe("dev1", "telemetry", seq, 1_000, 1_020_000_000)
+        tracker.observe("dev2", "telemetry", 0, 1_000, 1_040_000_000)
+
+        dev1 = tracker.summary("dev1")
+        assert (dev1["received"], dev1["lost"]) == (3, 1)
+        assert dev1["loss"] == pytest.approx(0.25)
+        assert dev1["p50_ms"] == pytest.approx(20, rel=0.01)
+
+        fleet = tracker.summary()
+        assert fleet["received"] == 4
+        assert fleet["max_ms"] == pytest.approx(40)
+
+    def test_unsynced_clock_has_no_latency(self):
+        tracker = DeliveryTracker()
+        tracker.observe("dev1", "data", 0, 0, 5_000_000_000)
+        summary = tracker.summary()
+        assert summary["received"] == 1
+        assert summary["p50_ms"] is None
+
+    def test_channels_are_separate_streams(self):
+        tracker = DeliveryTracker()
+        tracker.observe("dev1", "telemetry", 0, 0, 0)
+        tracker.observe("dev1", "data", 0, 0, 0)
+        assert tracker.summary()["restarts"] == 0
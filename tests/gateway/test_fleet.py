@@ -0,0 +1,156 @@
+import json
+
+import pytest  # type: ignore
+
+from gateway.batching import BatchWriter
+from gateway.fleet import FleetState
+from gateway.ingest import IngestService
+from gateway.sinks import SQLiteSink
+from gateway.telemetry import Point
+
+
+def points(device, value=1.0):
+    return [
+        Point(device, "sensor", "Soil", "moisture", value, "percent", 0),
+        Point(device, "actuator", "Pump", "state", 1, None, 0),
+    ]
+
+
+@pytest.fixture
+def changes():
+    return []
+
+
+@pytest.fixture
+def fleet(clock, changes):
+    return FleetState(
+        offline_after=60,
+        clock=clock,
+        on_change=lambda device, online: changes.append((device, online)),
+    )
+
+
+class TestFleetState:
+    def test_invalid_timeout(self):
+        with pytest.raises(ValueError):
+            FleetState(offline_after=0)
+
+    def test_first_message_registers_device(self, fleet, changes):
+        fleet.observe(points("a"))
+
+        state = fleet.get("a")
+        assert state.online and state.messages == 1
+        assert state.values == {("Soil", "moisture"): 1.0, ("Pump", "state"): 1}
+        assert changes == [("a", True)]
+        assert fleet.online == 1
+
+    def test_last_value_wins(self, fleet):
+        fleet.observe(points("a", 1.0) + points("a", 2.0))
+
+        assert fleet.get("a").values[("Soil", "moisture")] == 2.0
+
+    def test_metric_keys_are_shared_between_devices(self, fleet):
+        fleet.observe(points("a"))
+        fleet.observe(points("b"))
+
+        (key_a,) = (k for k in fleet.get("a").values if k[0] == "Soil")
+        (key_b,) = (k for k in fleet.get("b").values if k[0] == "Soil")
+        assert key_a is key_b
+
+    def test_empty_message_is_ignored(self, fleet):
+        fleet.observe([])
+        assert len(fleet) == 0
+
+    def test_silent_device_goes_offline(self, fleet, clock, changes):
+        fleet.observe(points("a"))
+        clock.now = 59
+        assert fleet.expire() == []
+
+        clock.now = 60
+        assert fleet.expire() == ["a"]
+        assert not fleet.get("a").online
+        assert fleet.online == 0
+        assert changes == [("a", True), ("a", False)]
+
+    def test_active_device_is_rescheduled_not_expired(self, fleet, clock):
+        fleet.observe(points("a"))
+        clock.now = 50
+        fleet.observe(points("a"))
+
+        clock.now = 60
+        assert fleet.expire() == []
+        assert fleet._deadlines == [(110, "a")]
+
+        clock.now = 110
+        assert fleet.expire() == ["a"]
+
+    def test_device_comes_back_online(self, fleet, clock, changes):
+        fleet.observe(points("a"))
+        clock.now = 100
+        fleet.expire()
+
+        fleet.observe(points("a"))
+
+        assert fleet.get("a").online
+        assert changes[-1] == ("a", True)
+        clock.now = 160
+        assert fleet.expire() == ["a"]
+
+    def test_heap_holds_at_most_one_entry_per_device(self, fleet, clock):
+        for step in range(100):
+            clock.now = step
+            for device in ("a", "b", "c"):
+                fleet.observe(points(device))
+            fleet.expire()
+
+        assert len(fleet._deadlines) == 3
+
+    def test_only_expired_devices_are_touched(self, fleet, clock):
+        for i in range(1000):
+            clock.now = i / 10
+            fleet.observe(points(f"dev{i}"))
+
+        clock.now = 60.05
+        assert fleet.expire() == ["dev0"]
+        assert fleet.online == 999
+
+
+def test_sparse_updates_rebuild_full_state():
+    writer = BatchWriter(SQLiteSink(":memory:"))
+    service = IngestService(writer, clock_ns=lambda: 10**18)
+    fields = [["Soil", "moisture", "percent"], ["actuators", "Pump", None]]
+
+    for samples in ([[100, 40.0, 0.0]], [[110, 41.5, "="]], [[120, "=", 1.0]]):
+        document = {"fields": fields, "samples": samples, "now": 120}
+        service.handle("dev1/telemetry", json.dumps(document).encode())
+
+    assert service.fleet.snapshot("dev1") == {
+        ("Soil", "moisture"): 41.5,
+        ("Pump", "state"): 1,
+    }
+    assert service.fleet.snapshot("dev2") is None
+
+
+def test_failed_reading_clears_the_last_value():
+    sink = SQLiteSink(":memory:")
+    writer = BatchWriter(sink)
+    service = IngestService(writer, clock_ns=lambda: 10**18)
+    fields = [["Soil", "moisture", "percent"], ["actuators", "Pump", None]]
+
+    for samples in ([[100, 40.0, 0.0]], [[110, None, "="]], [[120, "=", 1.0]]):
+        document = {"fields": fields, "samples": samples, "now": 120}
+        service.handle("dev1/telemetry", json.dumps(document).encode())
+
+    assert service.fleet.snapshot("dev1") == {("Pump", "state"): 1}
+    writer.flush()
+    assert sink.count() == 3
+
+
+def test_ingest_service_tracks_devices():
+    writer = BatchWriter(SQLiteSink(":memory:"))
+    service = IngestService(writer, clock_ns=lambda: 0)
+
+    service.handle("dev1/data", b'{"actuator": "Pump", "data": {"state": "ON"}}')
+    service.handle("dev2/schema", b'{"fields": []}')
+
+    assert list(service.fleet.devices) == ["dev1"]
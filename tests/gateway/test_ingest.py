@@ -0,0 +1,40 @@
+import json
+
+import pytest  # type: ignore
+
+from gateway.ingest import IngestService
+
+
+class Writer:
+    def __init__(self):
+        self.points = []
+
+    def add(self, points):
+        self.points += points
+
+
+@pytest.mark.parametrize(
+    "topic, payload, rejected",
+    [
+        ("dev1/telemetry", {"actuators": 5}, 1),
+        ("dev1/telemetry", {"actuators": {"WaterPump": ["ON"]}}, 0),  # Skipped
+        ("dev1/data", {"sensor": ["Soil"], "data": {"moisture": 1}}, 1),
+        ("dev1/data", {"actuator": {}, "data": {"state": "ON"}}, 1),
+        ("dev1/telemetry", [1, 2], 1),
+    ],
+)
+def test_malformed_messages_do_not_raise(topic, payload, rejected):
+    writer = Writer()
+    service = IngestService(writer, clock_ns=lambda: 10**9)
+    service.handle(topic, json.dumps(payload).encode())
+    assert service.rejected == rejected
+    assert writer.points == []
+
+
+def test_valid_message_after_a_malformed_one():
+    writer = Writer()
+    service = IngestService(writer, clock_ns=lambda: 10**9)
+    service.handle("dev1/telemetry", b'{"actuators": 5}')
+    service.handle("dev1/telemetry", b'{"actuators": {"WaterPump": "ON"}}')
+    assert service.rejected == 1
+    assert [p.source for p in writer.points] == ["WaterPump"]
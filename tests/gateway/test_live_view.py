@@ -0,0 +1,78 @@
+from gateway.live_view import LiveView, format_cells
+from gateway.telemetry import Point
+
+
+def sensor(device, source, value, metric="moisture"):
+    return Point(device, "sensor", source, metric, value, "percent", 0)
+
+
+def actuator(device, source, value):
+    return Point(device, "actuator", source, "state", value, None, 0)
+
+
+def make_view(page_size=10):
+    view = LiveView(page_size=page_size, min_frame_interval=0)
+    view.wait_for_frame(timeout=0)  # Consume the initial frame
+    return view
+
+
+class TestFormatCells:
+    def test_sensor(self):
+        assert format_cells(sensor("d", "Soil", 42.5)) == ("Soil", "Moisture", "42.5 %")
+
+    def test_actuator(self):
+        cells = format_cells(actuator("d", "Pump", 1))
+        assert cells[2] == "[bold green]ON[/bold green]"
+
+    def test_failed_reading(self):
+        cells = format_cells(sensor("d", "Soil", None))
+        assert cells == ("Soil", "Moisture", "[bold red]failed[/bold red]")
+
+
+class TestLiveView:
+    def test_no_frame_without_updates(self):
+        view = make_view()
+        assert view.wait_for_frame(timeout=0) is None
+
+    def test_unchanged_values_do_not_redraw(self):
+        view = make_view()
+        assert view.update([sensor("d1", "Soil", 40)]) == 1
+        assert view.wait_for_frame(timeout=0) is not None
+        assert view.update([sensor("d1", "Soil", 40)]) == 0
+        assert view.wait_for_frame(timeout=0) is None
+
+    def test_sensors_listed_before_actuators(self):
+        view = make_view()
+        view.update([actuator("d1", "Pump", 0), sensor("d1", "Soil", 40)])
+        frame = view.wait_for_frame(timeout=0)
+        assert [cells[0] for _, cells in frame["rows"]] == ["Soil", "Pump"]
+
+    def test_paging(self):
+        view = make_view(page_size=10)
+        view.update([sensor(f"d{i:03}", "Soil", i) for i in range(25)])
+        frame = view.wait_for_frame(timeout=0)
+        assert frame["pages"] == 3
+        assert len(frame["rows"]) == 10
+
+        view.next_page()
+        view.next_page()
+        view.next_page()  # Already on the last page
+        frame = view.wait_for_frame(timeout=0)
+        assert frame["page"] == 2
+        assert len(frame["rows"]) == 5
+
+    def test_change_off_page_does_not_redraw(self):
+        view = make_view(page_size=10)
+        view.update([sensor(f"d{i:03}", "Soil", i) for i in range(25)])
+        view.wait_for_frame(timeout=0)
+        view.update([sensor("d020", "Soil", 99)])
+        assert view.wait_for_frame(timeout=0) is None
+
+    def test_device_view(self):
+        view = make_view()
+        view.update([sensor("d1", "Soil", 1), sensor("d10", "Soil", 2)])
+        view.update([sensor("d2", "Soil", 3)])
+        view.show_device("d1")
+        frame = view.wait_for_frame(timeout=0)
+        assert [key[0] for key, _ in frame["rows"]] == ["d1"]
+        assert frame["devices"] == 3
@@ -0,0 +1,162 @@
+import json
+import random
+
+import pytest  # type: ignore
+
+from gateway.ingest import IngestService
+from gateway.rules import RulesEngine, WindowAggregate, load_rules
+from gateway.telemetry import Point
+
+
+def point(device, value, t, source="Soil", metric="moisture"):
+    return Point(device, "sensor", source, metric, value, "percent", int(t * 1e9))
+
+
+def rule(**changes):
+    spec = {
+        "name": "dry",
+        "zone": "A",
+        "source": "Soil",
+        "metric": "moisture",
+        "aggregate": "mean",
+        "window": 60,
+        "below": 30,
+        "then": [{"device": "t1", "actuator": "Pump", "command": "on"}],
+        "else": [{"device": "t1", "actuator": "Pump", "command": "off"}],
+    }
+    spec.update(changes)
+    return spec
+
+
+@pytest.fixture
+def sent():
+    return []
+
+
+def engine(sent, *rules):
+    document = {"zones": {"A": ["t1", "t2"]}, "rules": list(rules)}
+    return RulesEngine(document, lambda topic, command: sent.append((topic, command)))
+
+
+class TestWindowAggregate:
+    def test_matches_a_full_recomputation(self):
+        rng = random.Random(3)
+        aggregate = WindowAggregate(10)
+        history = []
+        t = 0.0
+        for _ in range(500):
+            t += rng.uniform(0, 2)
+            value = rng.uniform(0, 100)
+            aggregate.add(t, value)
+            history.append((t, value))
+            window = [v for s, v in history if s > t - 10]
+            assert aggregate.value("count") == len(window)
+            assert aggregate.value("mean") == pytest.approx(sum(window) / len(window))
+            assert aggregate.value("min") == min(window)
+            assert aggregate.value("max") == max(window)
+
+    def test_ewma_moves_towards_new_values(self):
+        aggregate = WindowAggregate(10)
+        aggregate.add(0, 0.0)
+        aggregate.add(10, 100.0)
+        assert aggregate.value("ewma") == pytest.approx(100 * (1 - 1 / 2.718281828))
+
+    def test_empty_window(self):
+        aggregate = WindowAggregate(10)
+        aggregate.add(0, 5.0)
+        aggregate.expire(20)
+        assert aggregate.value("count") == 0
+        assert aggregate.value("mean") is None
+
+    def test_late_samples_are_ignored(self):
+        aggregate = WindowAggregate(10)
+        aggregate.add(5, 1.0)
+        assert not aggregate.add(4, 100.0)
+        assert aggregate.value("max") == 1.0
+
+
+class TestRulesEngine:
+    def test_fires_on_edges_only(self, sent):
+        rules = engine(sent, rule())
+        rules.observe([point("t1", 20, 0)])
+        rules.observe([point("t1", 25, 1)])
+        assert sent == [("t1/actuators/Pump/action", "on")]
+        rules.observe([point("t1", 80, 2)])  # Mean 41.7
+        assert sent[-1] == ("t1/actuators/Pump/action", "off")
+        assert rules.fired == 2
+
+    def test_any_and_all(self, sent):
+        rules = engine(sent, rule(when="all"))
+        rules.observe([point("t1", 20, 0)])
+        assert sent == []
+        rules.observe([point("t2", 20, 0)])
+        assert sent == [("t1/actuators/Pump/action", "on")]
+
+    def test_window_slides(self, sent):
+        rules = engine(sent, rule(aggregate="min", window=10, below=10))
+        rules.observe([point("t1", 5, 0)])
+        rules.observe([point("t1", 50, 5)])
+        assert len(sent) == 1
+        rules.observe([point("t1", 50, 11)])  # The 5 left the window
+        assert sent[-1][1] == "off"
+
+    def test_cooldown(self, sent):
+        rules = engine(sent, rule(window=5, cooldown=100))
+        rules.observe([point("t1", 20, 0)])
+        rules.observe([point("t1", 90, 70)])
+        rules.observe([point("t1", 10, 80)])  # Holds again within the cooldown
+        assert [command for _, command in sent] == ["on", "off"]
+        rules.observe([point("t1", 10, 110)])
+        assert [command for _, command in sent] == ["on", "off", "on"]
+
+    def test_only_the_rules_of_a_series_are_checked(self, sent):
+        many = [rule(name=f"r{i}", devices=[f"d{i}"]) for i in range(1000)]
+        rules = engine(sent, *many)
+        rules.observe([point("d7", 10, 0)])
+        assert [r.name for r in rules.rules if r.active] == ["r7"]
+        assert len(rules.series) == 1000
+
+    def test_rules_share_aggregates(self, sent):
+        upper = rule(name="b", above=90)
+        del upper["below"]
+        rules = engine(sent, rule(name="a"), upper)
+        assert len(rules.series[("t1", "Soil", "moisture")]) == 1
+
+    def test_unrelated_points_are_ignored(self, sent):
+        rules = engine(sent, rule())
+        rules.observe([point("t9", 0, 0), point("t1", 0, 0, metric="humidity")])
+        assert sent == []
+
+    @pytest.mark.parametrize(
+        "spec, error",
+        [
+            (rule(zone="B"), "unknown zone B"),
+            (rule(aggregate="median"), "unknown aggregate"),
+            (rule(above=50), "exactly one of below/above"),
+            (rule(when="most"), "unknown quantifier"),
+            (rule(then=[{"device": "t1", "actuator": "P", "command": "x"}]), "command"),
+        ],
+    )
+    def test_invalid_rules(self, sent, spec, error):
+        with pytest.raises(ValueError, match=error):
+            engine(sent, spec)
+
+
+def test_load_rules(tmp_path, sent):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"zones": {"A": ["t1"]}, "rules": [rule()]}))
+    rules = load_rules(path, lambda topic, command: sent.append(command))
+    rules.observe([point("t1", 10, 0)])
+    assert sent == ["on"]
+
+
+def test_ingest_feeds_the_rules(sent):
+    class Writer:
+        def add(self, points):
+            pass
+
+    rules = engine(sent, rule(devices=["dev1"]))
+    service = IngestService(Writer(), clock_ns=lambda: 10**9, rules=rules)
+    payload = {"Soil": {"moisture": {"value": 12, "unit": "percent"}}}
+    service.handle("dev1/telemetry", json.dumps(payload).encode())
+    assert sent == [("t1/actuators/Pump/action", "on")]
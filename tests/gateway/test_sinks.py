@@ -0,0 +1,31 @@
+from gateway.sinks import InfluxLineSink, SQLiteSink, to_line_protocol
+from gateway.telemetry import Point
+
+
+class TestLineProtocol:
+    def test_sensor_point(self):
+        point = Point("dev1", "sensor", "SoilSensor", "moisture", 42.5, "percent", 7)
+        assert to_line_protocol(point) == (
+            "growhub,device=dev1,kind=sensor,source=SoilSensor,unit=percent "
+            "moisture=42.5 7"
+        )
+
+    def test_escaping(self):
+        point = Point("my dev", "actuator", "a,b=c", "state", 1, None, 7)
+        assert to_line_protocol(point) == (
+            r"growhub,device=my\ dev,kind=actuator,source=a\,b\=c state=1.0 7"
+        )
+
+    def test_batch_is_one_body(self):
+        sink = InfluxLineSink("http://influx:8086/", org="o", bucket="b")
+        points = [Point("d", "sensor", "s", "m", i, None, i) for i in range(3)]
+        assert sink.encode(points).count(b"\n") == 2
+        assert sink.write_url.startswith("http://influx:8086/api/v2/write?")
+
+
+class TestSQLiteSink:
+    def test_write_batch(self):
+        sink = SQLiteSink(":memory:")
+        sink.write([Point("d", "sensor", "s", "m", i, "percent", i) for i in range(3)])
+        assert sink.count() == 3
+        sink.close()
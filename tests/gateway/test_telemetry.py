@@ -0,0 +1,138 @@
+import json
+
+import pytest  # type: ignore
+
+from gateway.delivery import DeliveryTracker
+from gateway.telemetry import Point, decode_message, flatten_payload, parse_topic
+
+TELEMETRY = {
+    "SoilSensor": {"moisture": {"value": 42.5, "unit": "percent"}},
+    "ClimateSensor": {
+        "temperature": {"value": 21, "unit": "celsius"},
+        "humidity": {"value": 60, "unit": "percent"},
+    },
+    "actuators": {"WaterPump": "ON", "GrowLamp": "OFF"},
+}
+
+
+class TestParseTopic:
+    @pytest.mark.parametrize(
+        "topic, expected",
+        [
+            ("GrowHubClient/telemetry", ("GrowHubClient", "telemetry")),
+            ("GrowHubClient/data", ("GrowHubClient", "data")),
+            ("GrowHubClient/actuators/WaterPump/action", None),
+            ("growhub/test", None),
+            ("/telemetry", None),
+        ],
+    )
+    def test_parse_topic(self, topic, expected):
+        assert parse_topic(topic) == expected
+
+
+class TestFlattenPayload:
+    def test_telemetry(self):
+        points = flatten_payload("dev1", "telemetry", TELEMETRY, 123)
+        soil = Point("dev1", "sensor", "SoilSensor", "moisture", 42.5, "percent", 123)
+        assert soil in points
+        assert Point("dev1", "actuator", "WaterPump", "state", 1, None, 123) in points
+        assert Point("dev1", "actuator", "GrowLamp", "state", 0, None, 123) in points
+        assert len(points) == 5
+
+    def test_failed_sensor_is_skipped(self):
+        payload = {"ClimateSensor": None, "actuators": {}}
+        assert flatten_payload("dev1", "telemetry", payload, 1) == []
+
+    def test_data_sensor(self):
+        payload = {"sensor": "SoilSensor", "data": TELEMETRY["SoilSensor"]}
+        points = flatten_payload("dev1", "data", payload, 1)
+        assert [p.metric for p in points] == ["moisture"]
+
+    def test_data_actuator(self):
+        payload = {"actuator": "WaterPump", "data": {"state": "OFF"}}
+        points = flatten_payload("dev1", "data", payload, 1)
+        assert points == [Point("dev1", "actuator", "WaterPump", "state", 0, None, 1)]
+
+    def test_non_dict_payload(self):
+        with pytest.raises(ValueError, match="Unexpected payload type"):
+            flatten_payload("dev1", "telemetry", [1, 2], 1)
+
+
+class TestDecodeMessage:
+    def test_decode_json(self):
+        points = decode_message("dev1/telemetry", json.dumps(TELEMETRY).encode(), 5)
+        assert len(points) == 5
+        assert all(p.device == "dev1" for p in points)
+
+    def test_ignored_topic(self):
+        assert decode_message("growhub/test", b"hello", 5) == []
+
+    def test_invalid_json(self):
+        with pytest.raises(ValueError, match="Invalid JSON payload"):
+            decode_message("dev1/telemetry", b"{not json", 5)
+
+    def test_sequence_and_publish_time_are_tracked(self):
+        delivery = DeliveryTracker()
+        message = json.dumps({**TELEMETRY, "seq": 3, "ts": 1_000}).encode()
+        points = decode_message(
+            "dev1/telemetry", message, 1_250_000_000, None, delivery
+        )
+        assert len(points) == 5
+        stats = delivery.streams[("dev1", "telemetry")]
+        assert (stats.received, stats.highest) == (1, 3)
+        assert delivery.summary()["p50_ms"] == pytest.approx(250, rel=0.01)
+
+    def test_messages_without_sequence_are_not_tracked(self):
+        delivery = DeliveryTracker()
+        message = json.dumps(TELEMETRY).encode()
+        decode_message("dev1/telemetry", message, 5, None, delivery)
+        assert delivery.streams == {}
+
+
+class TestBatchedTelemetry:
+    BATCH = {
+        "fields": [
+            ["SoilSensor", "moisture", "percent"],
+            ["actuators", "WaterPump", None],
+        ],
+        "samples": [[100, 40.5, 1.0], [110, None, 0.0]],
+        "now": 120,
+    }
+
+    def test_points_are_placed_relative_to_receive_time(self):
+        points = flatten_payload("dev1", "telemetry", self.BATCH, 1_000 * 10**9)
+        t1, t2 = 980 * 10**9, 990 * 10**9
+        assert points == [
+            Point("dev1", "sensor", "SoilSensor", "moisture", 40.5, "percent", t1),
+            Point("dev1", "actuator", "WaterPump", "state", 1.0, None, t1),
+            Point("dev1", "sensor", "SoilSensor", "moisture", None, "percent", t2),
+            Point("dev1", "actuator", "WaterPump", "state", 0.0, None, t2),
+        ]
+
+    @pytest.mark.parametrize(
+        "changes",
+        [
+            {"samples": 5},
+            {"samples": [5]},
+            {"samples": [[]]},
+            {"samples": [["100", 1.0]]},
+            {"fields": 5},
+            {"fields": [["SoilSensor", "moisture"]]},
+            {"fields": [["SoilSensor", 5, "percent"], ["actuators", "Pump", None]]},
+            {"fields": [[["SoilSensor"], "moisture", None], ["a", "b", None]]},
+            {"fields": [["SoilSensor", "moisture", {}], ["a", "b", None]]},
+            {"now": "120"},
+        ],
+    )
+    def test_malformed_batch(self, changes):
+        with pytest.raises(ValueError, match="Batch"):
+            flatten_payload("dev1", "telemetry", dict(self.BATCH, **changes), 0)
+
+    def test_values_that_are_not_numbers_are_skipped(self):
+        batch = dict(self.BATCH, samples=[[100, "wet", [1]]])
+        assert flatten_payload("dev1", "telemetry", batch, 0) == []
+
+    def test_without_device_time(self):
+        batch = dict(self.BATCH, now=None)
+        points = flatten_payload("dev1", "telemetry", batch, 0)
+        assert points[0].timestamp_ns == 100 * 10**9
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark of MQTTClient.publish against an in-memory socket.
+
+Reports socket writes, time and transient heap use per publish for the
+single-buffer implementation and for the previous multi-write one.
+
+Usage: python3 tools/firmware/bench_mqtt_publish.py [--payload BYTES]
+"""
+
+import argparse
+import struct
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+# Repository root, so that the firmware package can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from firmware.lib.umqtt.simple import MQTTClient  # noqa: E402
+
+
+class FakeSocket:
+    """Counts writes; accepts MicroPython's write(buf, length) form."""
+
+    def __init__(self):
+        self.writes = 0
+        self.bytes = 0
+
+    def write(self, buf, length=None):
+        self.writes += 1
+        self.bytes += len(buf) if length is None else length
+        return length
+
+
+class LegacyClient(MQTTClient):
+    """publish() as shipped in umqtt.simple 1.7.0, for comparison."""
+
+    def _send_str(self, s):
+        self.sock.write(struct.pack("!H", len(s)))
+        self.sock.write(s)
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        pkt = bytearray(b"\x30\0\0\0")
+        pkt[0] |= qos << 1 | retain
+        sz = 2 + len(topic) + len(msg)
+        i = 1
+        while sz > 0x7F:
+            pkt[i] = (sz & 0x7F) | 0x80
+            sz >>= 7
+            i += 1
+        pkt[i] = sz
+        self.sock.write(pkt, i + 1)
+        self._send_str(topic)
+        self.sock.write(msg)
+
+
+def measure(client_class, topic, msg, runs):
+    client = client_class("bench", "localhost")
+    client.sock = FakeSocket()
+    client.publish(topic, msg)  # Warm up (buffer growth, topic cache)
+
+    client.sock = FakeSocket()
+    seconds = timeit.timeit(lambda: client.publish(topic, msg), number=runs) / runs
+    writes = client.sock.writes / runs
+
+    tracemalloc.start()
+    client.publish(topic, msg)
+    current, peak = tracemalloc.get_traced_memory()
+    before = tracemalloc.take_snapshot()
+    for _ in range(100):
+        client.publish(topic, msg)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, "lineno"))
+    return writes, seconds, peak - current, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--payload", type=int, default=156, help="Payload bytes")
+    parser.add_argument("--runs", type=int, default=20000)
+    args = parser.parse_args()
+
+    topic = "GrowHubClient/telemetry"
+    msg = bytes(args.payload)
+
+    print(f"{'client':<10}{'writes':>8}{'µs':>8}{'peak B':>8}{'retained':>10}")
+    for name, client_class in (("legacy", LegacyClient), ("buffered", MQTTClient)):
+        writes, seconds, peak, retained = measure(client_class, topic, msg, args.runs)
+        print(f"{name:<10}{writes:>8.1f}{seconds * 1e6:>8.2f}{peak:>8}{retained:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Benchmark the firmware hot paths on the host and compare with a baseline.
+
+The drivers run against mocked `machine`/`dht` modules, the same way the
+unit tests stub the hardware. CPython timings are not Pico timings, but a
+change that slows a path down here slows it down on the device too. Each
+result is also stored relative to a fixed pure-Python workload measured in
+the same run, and comparisons use that ratio, so that a busy or throttled
+machine is not reported as a regression.
+
+Usage: python3 tools/firmware/benchmark.py --save      # record the baseline
+       python3 tools/firmware/benchmark.py             # compare with it
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+from array import array
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Repository root, so that the firmware package can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+mock_machine = MagicMock()
+mock_dht = MagicMock()
+sys.modules["machine"] = mock_machine
+sys.modules["dht"] = mock_dht
+
+from firmware.constants import ALLOWED_ACTUATOR_ACTIONS  # noqa: E402
+from firmware.lib.umqtt.simple import MQTTClient  # noqa: E402
+from firmware.src.codec import make_codec  # noqa: E402
+from firmware.src.router import QUIET, CommandRouter  # noqa: E402
+from firmware.src.sensors.climate_sensor import ClimateSensor  # noqa: E402
+from firmware.src.sensors.soil_sensor import SoilSensor  # noqa: E402
+from firmware.src.telemetry_buffer import build_fields, fill_values  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "benchmark_baseline.json"
+
+
+class MemorySocket:
+    """In-memory socket: discards writes, replays `incoming` forever."""
+
+    def __init__(self, incoming=b""):
+        self.incoming = incoming
+        self.pos = 0
+
+    def write(self, buf, length=None):
+        return len(buf) if length is None else length
+
+    def read(self, n):
+        if self.pos >= len(self.incoming):
+            self.pos = 0
+        data = self.incoming[self.pos : self.pos + n]
+        self.pos += n
+        return data
+
+    def setblocking(self, flag):
+        pass
+
+
+class Actuator:
+    """Pin-free actuator, so the benchmark measures routing only."""
+
+    def __init__(self):
+        self.state = False
+
+    def on(self):
+        self.state = True
+
+    def off(self):
+        self.state = False
+
+    def toggle(self):
+        self.state = not self.state
+
+    def is_on(self):
+        return self.state
+
+
+def build_cases():
+    """Name -> zero-argument callable, one per hot path."""
+    mock_machine.ADC.return_value.read_u16.return_value = 35000
+    mock_dht.DHT11.return_value.temperature.return_value = 22
+    mock_dht.DHT11.return_value.humidity.return_value = 55
+    soil = SoilSensor(26, "SoilSensor", {"dry": 50000, "wet": 18000})
+    sensors = {"SoilSensor": soil, "ClimateSensor": ClimateSensor(15, "ClimateSensor")}
+    actuators = {"WaterPump": Actuator(), "GrowLamp": Actuator()}
+
+    def telemetry_payload():
+        payload = {sensor_id: sensor.read() for sensor_id, sensor in sensors.items()}
+        payload["actuators"] = {
+            act_id: "ON" if act.is_on() else "OFF" for act_id, act in actuators.items()
+        }
+        return payload
+
+    payload = telemetry_payload()
+    fields = build_fields(sensors, actuators)
+    binary = make_codec("binary", fields)
+    values = array("f", (0.0 for _ in fields))
+    fill_values(fields, payload, values, 0)
+
+    client = MQTTClient("bench", "localhost")
+    client.sock = MemorySocket()
+    message = json.dumps(payload).encode()
+
+    receiver = MQTTClient("bench", "localhost")
+    receiver.set_callback(lambda topic, msg: None)
+    topic = b"GrowHubClient/actuators/WaterPump/action"
+    receiver.sock = MemorySocket(
+        bytes((0x30, 2 + len(topic) + 6, 0, len(topic))) + topic + b"toggle"
+    )
+
+    router = CommandRouter("GrowHubClient", verbosity=QUIET)
+    router.add_actuators(actuators, ALLOWED_ACTUATOR_ACTIONS, lambda *args: None)
+    router.add_sensors(sensors, lambda sensor_id: None)
+
+    # json stands in for ujson, which only exists on MicroPython
+    return {
+        "telemetry_payload": telemetry_payload,
+        "json_encode": lambda: json.dumps(payload),
+        "binary_encode": lambda: binary.encode_payload(payload),
+        "binary_sample": lambda: binary.encode_sample(values, 0),
+        "mqtt_publish": lambda: client.publish("GrowHubClient/telemetry", message),
+        "mqtt_wait_msg": receiver.wait_msg,
+        "soil_conversion": lambda: soil.get_percentage_from_raw(35000),
+        "soil_read": soil.read,
+        "soil_measure_into": lambda: soil.measure_into(values, 0),
+        "command_dispatch": lambda: router.dispatch(topic, b"toggle"),
+        "unknown_topic": lambda: router.dispatch(b"GrowHubClient/nowhere", b"on"),
+    }
+
+
+def reference_workload():
+    total = 0
+    for i in range(200):
+        total += i * i
+    return total
+
+
+def run(selected, repeat, run_time=0.02):
+    """
+    Best time per call of each benchmark, in nanoseconds. Rounds go through
+    every benchmark in turn, so a burst of background load spoils one run of
+    each instead of every run of one.
+    """
+    cases = {"reference": reference_workload}
+    for name, function in build_cases().items():
+        if not selected or name in selected:
+            cases[name] = function
+
+    timers = {}
+    for name, function in cases.items():
+        timer = timeit.Timer(function)
+        number, seconds = timer.autorange()
+        timers[name] = (timer, max(1, int(number * run_time / seconds)))
+
+    best = dict.fromkeys(cases, float("inf"))
+    for _ in range(repeat):
+        for name, (timer, number) in timers.items():
+            best[name] = min(best[name], timer.timeit(number) / number * 1e9)
+    return {name: round(value, 1) for name, value in best.items()}
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table and return the names of regressed benchmarks."""
+    regressions = []
+    # How much slower this run's machine is than the baseline's
+    speed = results["reference"] / baseline["reference"]
+    print(f"Machine speed vs baseline: {1 / speed:.2f}x")
+    print(f"{'benchmark':<20}{'baseline ns':>12}{'now ns':>10}{'change':>9}")
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if name == "reference":
+            continue
+        if reference is None:
+            print(f"{name:<20}{'-':>12}{value:>10.1f}{'new':>9}")
+            continue
+        change = value / (reference * speed) - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<20}{reference:>12.1f}{value:>10.1f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("benchmarks", nargs="*", help="Only run these benchmarks")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Write the baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%)"
+    )
+    parser.add_argument("--repeat", type=int, default=25, help="Rounds")
+    args = parser.parse_args()
+
+    results = run(args.benchmarks, args.repeat)
+
+    if args.save:
+        document = {"python": platform.python_version(), "results": results}
+        args.baseline.write_text(json.dumps(document, indent=2) + "\n")
+        for name, value in results.items():
+            print(f"{name:<20}{value:>10.1f} ns")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --save first")
+        return 2
+    document = json.loads(args.baseline.read_text())
+    if document.get("python") != platform.python_version():
+        print(f"Warning: baseline recorded with Python {document.get('python')}")
+    regressions = compare(results, document["results"], args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
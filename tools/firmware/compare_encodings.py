@@ -0,0 +1,76 @@
+"""
+Compare wire size and encode time of the telemetry encodings on the host.
+
+The sensor drivers run against mocked `machine`/`dht` modules, the same way
+the unit tests stub the hardware.
+
+Usage: python3 tools/firmware/compare_encodings.py [--samples N]
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Repository root, so that the firmware package can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+mock_machine = MagicMock()
+mock_dht = MagicMock()
+sys.modules["machine"] = mock_machine
+sys.modules["dht"] = mock_dht
+
+from firmware.src.codec import make_codec  # noqa: E402
+from firmware.src.sensors.climate_sensor import ClimateSensor  # noqa: E402
+from firmware.src.sensors.soil_sensor import SoilSensor  # noqa: E402
+from firmware.src.telemetry_buffer import TelemetryBatcher, build_fields  # noqa: E402
+
+
+def build_payload(sensors, actuators):
+    payload = {sensor_id: sensor.read() for sensor_id, sensor in sensors.items()}
+    payload["actuators"] = {act_id: "OFF" for act_id in actuators}
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=6, help="Samples per batch")
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    mock_machine.ADC.return_value.read_u16.return_value = 35000
+    mock_dht.DHT11.return_value.temperature.return_value = 22
+    mock_dht.DHT11.return_value.humidity.return_value = 55
+    sensors = {
+        "SoilSensor": SoilSensor(26, "SoilSensor", {"dry": 50000, "wet": 18000}),
+        "ClimateSensor": ClimateSensor(15, "ClimateSensor"),
+    }
+    actuators = ["WaterPump", "GrowLamp"]
+    fields = build_fields(sensors, actuators)
+    payload = build_payload(sensors, actuators)
+
+    batcher = TelemetryBatcher(fields, batch_size=args.samples, flush_interval=60)
+    for stamp in range(args.samples):
+        batcher.add(payload, stamp=stamp)
+
+    print(f"{'encoding':<10}{'mode':<8}{'bytes':>8}{'encode µs':>12}")
+    for name in ("json", "binary"):
+        codec = make_codec(name, fields)
+        cases = {
+            "single": lambda c=codec: c.encode_payload(payload),
+            "batch": lambda c=codec: c.encode(batcher.rows(), args.samples),
+        }
+        for mode, encode in cases.items():
+            message = encode()
+            if isinstance(message, dict):
+                # MqttManager.publish serialises dictionaries with ujson.dumps
+                encode = lambda e=encode: json.dumps(e())  # noqa: E731
+                message = encode().encode()
+            seconds = timeit.timeit(encode, number=args.runs) / args.runs
+            print(f"{name:<10}{mode:<8}{len(message):>8}{seconds * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
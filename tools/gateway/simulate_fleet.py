@@ -0,0 +1,371 @@
+"""
+Run a fleet of virtual GrowHub devices against an MQTT broker.
+
+Each virtual device is built from firmware/config.json with the real sensor
+and actuator drivers (on stubbed `machine`/`dht` modules, as in the unit
+tests), the firmware's CommandRouter and telemetry codec, and its
+MqttManager on the asyncio MQTT client. A probe client subscribes to the
+devices' topics to measure the end-to-end latency of telemetry, from the
+publish time MqttManager stamps in each message, and the round trip of
+actuator commands.
+
+Usage: python3 tools/gateway/simulate_fleet.py --devices 200 --interval 1
+       python3 tools/gateway/simulate_fleet.py --devices 5000 --processes 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import types
+from collections import deque
+from multiprocessing import Pool
+from pathlib import Path
+
+# Repository root, so that the firmware package can be imported
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT))
+# MqttManager imports the MQTT clients as `lib.umqtt`, as on the device
+sys.path.insert(1, str(ROOT / "firmware"))
+
+
+class Pin:
+    IN, OUT, PULL_UP, IRQ_FALLING, IRQ_RISING = range(5)
+
+    def __init__(self, pin_id, mode=None, pull=None):
+        self.pin_id = pin_id
+        self._value = 1
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = int(bool(value))
+
+    def irq(self, trigger=None, handler=None):
+        pass
+
+
+class ADC:
+    """Slowly drifting soil moisture reading inside the default calibration."""
+
+    def __init__(self, pin):
+        self.level = random.randint(25000, 45000)
+
+    def read_u16(self):
+        self.level = min(45000, max(25000, self.level + random.randint(-200, 200)))
+        return self.level
+
+
+class DHT11:
+    def __init__(self, pin):
+        pass
+
+    def measure(self):
+        pass
+
+    def temperature(self):
+        return random.randint(18, 28)
+
+    def humidity(self):
+        return random.randint(40, 70)
+
+
+sys.modules["machine"] = types.SimpleNamespace(Pin=Pin, ADC=ADC)
+sys.modules["dht"] = types.SimpleNamespace(DHT11=DHT11)
+sys.modules["ujson"] = json
+
+from firmware.constants import ALLOWED_ACTUATOR_ACTIONS, STATE_MAP  # noqa: E402
+from firmware.lib.umqtt.aio import MQTTAsyncClient  # noqa: E402
+from firmware.src import actuators as actuator_module  # noqa: E402
+from firmware.src import mqtt_manager as mqtt_manager_module  # noqa: E402
+from firmware.src.clock import sync_epoch  # noqa: E402
+from firmware.src.codec import make_codec  # noqa: E402
+from firmware.src.mqtt_manager import MqttManager  # noqa: E402
+from firmware.src.router import QUIET, CommandRouter  # noqa: E402
+from firmware.src.sensors.sensor_classes import build_sensor  # noqa: E402
+from firmware.src.telemetry_buffer import build_fields  # noqa: E402
+from gateway.codec import HEADERS, is_binary  # noqa: E402
+
+# The drivers log every switch and the manager every connection; thousands
+# of devices would flood the terminal
+actuator_module.print = lambda *args, **kwargs: None
+mqtt_manager_module.print = lambda *args, **kwargs: None
+
+
+def percentiles(values, quantiles=(0.5, 0.95, 0.99)):
+    if not values:
+        return [None] * len(quantiles)
+    ordered = sorted(values)
+    return [ordered[int(q * (len(ordered) - 1))] for q in quantiles]
+
+
+def publish_time(msg):
+    """Epoch ms stamped by MqttManager.publish, None when the message has none."""
+    if is_binary(msg):
+        # Version 1 headers have no publish time
+        header = HEADERS[2]
+        if len(msg) < header.size or msg[1] != 2:
+            return None
+        return header.unpack_from(msg)[-1]
+    try:
+        document = json.loads(msg)
+    except ValueError:
+        return None
+    return document.get("ts") if isinstance(document, dict) else None
+
+
+class VirtualDevice:
+    """One simulated Pico: firmware drivers, router and codec on its own client."""
+
+    def __init__(self, client_id, config, args, stats):
+        self.client_id = client_id
+        self.args = args
+        self.stats = stats
+        self.sensors = {}
+        for item in config["sensors"]:
+            sensor = build_sensor(item)
+            if sensor:
+                self.sensors[item["id"]] = sensor
+        self.actuators = {
+            item["id"]: actuator_module.Actuator(item["pin"], item["id"])
+            for item in config["actuators"]
+        }
+        self.codec = make_codec(
+            args.encoding, build_fields(self.sensors, self.actuators)
+        )
+
+        self.router = CommandRouter(client_id, verbosity=QUIET)
+        self.router.add_actuators(
+            self.actuators, ALLOWED_ACTUATOR_ACTIONS, self.on_actuator_changed
+        )
+        self.router.add_sensors(self.sensors, self.on_sensor_read)
+        # Stamps each message with its sequence number and publish time
+        self.mqtt = MqttManager(
+            client_id, args.broker, args.user, args.password, port=args.port
+        )
+        self.mqtt.set_callback(self.router.dispatch)
+
+        # Command send times still expected by the probe, oldest first
+        self.commands_sent = deque()
+
+    async def connect(self):
+        if not await self.mqtt.connect():
+            raise OSError(f"{self.client_id} could not connect")
+        # Not retained, so the broker does not keep thousands of fake schemas
+        await self.publish("schema", self.codec.schema_document())
+
+    async def publish(self, channel, data):
+        """True once sent, like MqttManager.publish."""
+        return await self.mqtt.publish(f"{self.client_id}/{channel}", data)
+
+    def on_actuator_changed(self, actuator_id, actuator):
+        if random.random() < self.args.drop_commands:
+            # The probe shares this queue: forget the command so that later
+            # answers are still matched with the commands they answer
+            if self.commands_sent:
+                self.commands_sent.popleft()
+            return
+        state = STATE_MAP[actuator.is_on()]
+        asyncio.create_task(
+            self.respond({"actuator": actuator_id, "data": {"state": state}})
+        )
+
+    def on_sensor_read(self, sensor_id):
+        asyncio.create_task(
+            self.respond({"sensor": sensor_id, "data": self.sensors[sensor_id].read()})
+        )
+
+    async def respond(self, data):
+        if self.args.response_delay:
+            await asyncio.sleep(self.args.response_delay)
+        await self.publish("data", data)
+
+    async def run_telemetry(self, until):
+        interval = self.args.interval
+        jitter = self.args.jitter
+        # Spread the fleet over the first interval instead of a thundering herd
+        await asyncio.sleep(random.uniform(0, interval))
+        while time.monotonic() < until:
+            payload = {}
+            for sensor_id, sensor in self.sensors.items():
+                payload[sensor_id] = await sensor.read_async()
+            payload["actuators"] = {
+                act_id: STATE_MAP[act.is_on()] for act_id, act in self.actuators.items()
+            }
+            if await self.publish("telemetry", self.codec.encode_payload(payload)):
+                self.stats["sent"] += 1
+            else:
+                self.stats["errors"] += 1
+            await asyncio.sleep(interval * random.uniform(1 - jitter, 1 + jitter))
+
+
+class Probe:
+    """Subscriber timing the messages of one worker's devices."""
+
+    def __init__(self, name, devices, args, stats):
+        self.devices = {device.client_id.encode(): device for device in devices}
+        self.args = args
+        self.stats = stats
+        self.latencies = []
+        self.round_trips = []
+        self.client = MQTTAsyncClient(
+            name, args.broker, args.port, args.user, args.password
+        )
+        self.client.set_callback(self.on_message)
+
+    async def connect(self):
+        await self.client.connect()
+        await asyncio.gather(
+            *(
+                self.client.subscribe(f"{client_id.decode()}/{channel}")
+                for client_id in self.devices
+                for channel in ("telemetry", "data")
+            )
+        )
+
+    def on_message(self, topic, msg):
+        now = time.monotonic()
+        client_id, _, channel = topic.rpartition(b"/")
+        device = self.devices.get(client_id)
+        if device is None:
+            return
+        if channel == b"telemetry":
+            self.stats["received"] += 1
+            # Matched by the message's own stamp: a lost or late message
+            # does not shift the latency of the ones after it
+            ts = publish_time(msg)
+            if ts:
+                self.latencies.append(time.time_ns() / 1e9 - ts / 1000)
+        elif channel == b"data":
+            self.stats["responses"] += 1
+            if device.commands_sent:
+                self.round_trips.append(now - device.commands_sent.popleft())
+
+    async def run_commands(self, until):
+        rate = self.args.command_rate * len(self.devices)
+        if rate <= 0:
+            return
+        devices = list(self.devices.values())
+        while time.monotonic() < until:
+            await asyncio.sleep(random.expovariate(rate))
+            device = random.choice(devices)
+            actuator_id = random.choice(list(device.actuators))
+            device.commands_sent.append(time.monotonic())
+            await self.client.publish(
+                f"{device.client_id}/actuators/{actuator_id}/action", b"toggle"
+            )
+            self.stats["commands"] += 1
+
+
+async def run_fleet(worker, client_ids, args):
+    config = json.loads(Path(args.config).read_text())
+    sync_epoch()  # The host clock is synced: messages get a publish time
+    stats = dict.fromkeys(("sent", "received", "errors", "commands", "responses"), 0)
+    devices = [VirtualDevice(cid, config, args, stats) for cid in client_ids]
+    probe = Probe(f"{args.prefix}probe-{worker}", devices, args, stats)
+    await probe.connect()
+
+    # Bounded connection rate, so the broker is not hit by every CONNECT at once
+    gate = asyncio.Semaphore(50)
+
+    async def connect(device):
+        async with gate:
+            await device.connect()
+
+    await asyncio.gather(*(connect(device) for device in devices))
+
+    until = time.monotonic() + args.duration
+    await asyncio.gather(
+        probe.run_commands(until),
+        *(device.run_telemetry(until) for device in devices),
+    )
+    # Let in-flight messages arrive before disconnecting
+    await asyncio.sleep(1)
+
+    for device in devices:
+        await device.mqtt.client.disconnect()
+    await probe.client.disconnect()
+    return stats, probe.latencies, probe.round_trips
+
+
+def run_worker(worker, client_ids, args):
+    return asyncio.run(run_fleet(worker, client_ids, args))
+
+
+def report(args, results):
+    totals = {}
+    latencies = []
+    round_trips = []
+    for stats, worker_latencies, worker_round_trips in results:
+        for key, value in stats.items():
+            totals[key] = totals.get(key, 0) + value
+        latencies += worker_latencies
+        round_trips += worker_round_trips
+
+    # Rates include the first interval, over which device start times are spread
+    elapsed = args.duration
+    target = args.devices / args.interval
+    print(f"Devices: {args.devices} in {args.processes} process(es), {elapsed:.0f} s")
+    print(
+        f"Telemetry: {totals['sent'] / elapsed:.1f} msg/s sent "
+        f"(target {target:.1f}), {totals['received'] / elapsed:.1f} msg/s received, "
+        f"{totals['sent'] - totals['received']} lost, {totals['errors']} errors"
+    )
+    for label, values in (("latency", latencies), ("command RTT", round_trips)):
+        if values:
+            p50, p95, p99 = (v * 1000 for v in percentiles(values))
+            print(
+                f"{label}: p50 {p50:.1f} ms, p95 {p95:.1f} ms, "
+                f"p99 {p99:.1f} ms, max {max(values) * 1000:.1f} ms"
+            )
+    if totals["commands"]:
+        print(f"Commands: {totals['commands']} sent, {totals['responses']} answered")
+
+
+def main():
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv(dotenv_path=ROOT / "gateway" / ".env")
+    except ImportError:
+        pass
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=60, help="Seconds")
+    parser.add_argument("--interval", type=float, default=10, help="Telemetry period")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Fraction of period")
+    parser.add_argument("--encoding", choices=("json", "binary"), default="binary")
+    parser.add_argument(
+        "--command-rate", type=float, default=0.0, help="Commands/s per device"
+    )
+    parser.add_argument("--response-delay", type=float, default=0.0, help="Seconds")
+    parser.add_argument(
+        "--drop-commands", type=float, default=0.0, help="Unanswered fraction"
+    )
+    parser.add_argument("--prefix", default="sim-", help="Client id prefix")
+    parser.add_argument("--config", default=str(ROOT / "firmware" / "config.json"))
+    parser.add_argument("--broker", default=os.getenv("MQTT_BROKER", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MQTT_PORT", 1883)))
+    parser.add_argument("--user", default=os.getenv("MQTT_USER"))
+    parser.add_argument("--password", default=os.getenv("MQTT_PASSWORD"))
+    args = parser.parse_args()
+
+    client_ids = [f"{args.prefix}{i:05d}" for i in range(args.devices)]
+    shares = [client_ids[k :: args.processes] for k in range(args.processes)]
+    if args.processes == 1:
+        results = [run_worker(0, shares[0], args)]
+    else:
+        with Pool(args.processes) as pool:
+            results = pool.starmap(
+                run_worker, [(k, share, args) for k, share in enumerate(shares)]
+            )
+    report(args, results)
+
+
+if __name__ == "__main__":
+    main()